@@ -11,6 +11,7 @@ from sqlalchemy.engine.base import Engine
 from tqdm import tqdm
 
 from crypto_sentiment_demo_app.crawler.processor import TitleProcessor
+from crypto_sentiment_demo_app.database.schema import metadata
 from crypto_sentiment_demo_app.utils import (
     get_db_connection_engine,
     get_logger,
@@ -21,6 +22,25 @@ from crypto_sentiment_demo_app.utils import (
 logger = get_logger(Path(__file__).name)
 
 
+def upsert_into_table(df: pd.DataFrame, engine: Engine, table_name: str):
+    """
+    Upserts a DataFrame indexed by the primary key into one of the tables of the shared schema.
+    Column types come from the schema, so pangres neither infers them nor creates or inspects the table.
+
+    :param df: a pandas DataFrame with the index and columns named after the table columns
+    :param engine: SQLAlchemy engine to connect to a database
+    :param table_name: table name in `crypto_sentiment_demo_app/database/schema.py`
+    :return: None
+    """
+    columns = metadata.tables[table_name].columns
+    dtype = {name: columns[name].type for name in [*df.index.names, *df.columns]}
+
+    # pandas `to_sql` doesn't yet support updating records ("upsert")
+    # https://github.com/pandas-dev/pandas/issues/15988
+    # hence using Pangres upsert https://github.com/ThibTrip/pangres/wiki/Upsert
+    pangres.upsert(df=df, con=engine, table_name=table_name, if_row_exists="update", create_table=False, dtype=dtype)
+
+
 class Crawler:
     def __init__(self, sqlalchemy_engine: Engine, path_to_rss_feeds: str, processor: TitleProcessor):
         """
@@ -99,12 +119,7 @@ class Crawler:
         :param table_name: table name to write data to
         :return: None
         """
-
-        # pandas `to_sql` doesn't yet support updating records ("upsert")
-        # https://github.com/pandas-dev/pandas/issues/15988
-        # hence using Pangres upsert https://github.com/ThibTrip/pangres/wiki/Upsert
-
-        pangres.upsert(df=df, con=self.sqlalchemy_engine, table_name=table_name, if_row_exists="update")
+        upsert_into_table(df=df, engine=self.sqlalchemy_engine, table_name=table_name)
 
     @staticmethod
     def __get_rss_urls(path_to_rss_feed_list: str) -> List[str]:
@@ -129,12 +144,9 @@ class Crawler:
         """
 
         # write news title IDs to a table for predictions
-        # pandas `to_sql` doesn't yet support updating records ("upsert")
-        # https://github.com/pandas-dev/pandas/issues/15988
-        # hence using Pangres upsert https://github.com/ThibTrip/pangres/wiki/Upsert
         df[index_name] = df.index
         # index can not be ignored, hence a workaround with an empty list of columns
-        pangres.upsert(df=df[[]], con=self.sqlalchemy_engine, table_name=table_name, if_row_exists="update")
+        upsert_into_table(df=df[[]], engine=self.sqlalchemy_engine, table_name=table_name)
 
     def run(
         self,
@@ -1,23 +1,78 @@
+import datetime
 import os
-from typing import Optional
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_health import health
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+from starlette.background import BackgroundTask
 
+from crypto_sentiment_demo_app.data_provider.cache import (
+    NotificationListener,
+    create_response_cache,
+)
 from crypto_sentiment_demo_app.data_provider.db_connector import DBConnection
+from crypto_sentiment_demo_app.data_provider.export import (
+    EXPORT_MEDIA_TYPES,
+    ExportStream,
+    encode_export,
+)
+from crypto_sentiment_demo_app.data_provider.hot_window import create_hot_window
+from crypto_sentiment_demo_app.data_provider.news_stream import PredictionsBroadcaster
 from crypto_sentiment_demo_app.data_provider.schemas import (
     AveragePerDaysPositiveScore,
+    ExportFormat,
+    NewsFeedPage,
     NewsTitles,
     PositiveScore,
+    SentimentTimeSeries,
 )
+from crypto_sentiment_demo_app.utils import get_db_connection_engine, load_config_params
 
 host = os.environ.get("HOST")
 
 if host is None:
     raise ValueError("Environment variable HOST should be defined!")
 
-db = DBConnection()
+params = load_config_params()
+
+# every export holds a pooled connection for its whole duration, outside of the query executor,
+# so the pool has a connection reserved for each of them
+max_concurrent_exports = params["data_provider"]["export"]["max_concurrent_exports"]
+db = DBConnection(params["data_provider"]["database"], reserved_connections=max_concurrent_exports)
+response_cache = create_response_cache(params)
+# answers served from the hot window while it's refreshed may predate the latest invalidation
+hot_window = create_hot_window(
+    params, db, on_stale_reads=response_cache.invalidate if response_cache is not None else None
+)
+# dashboard queries about recent news are answered from memory if the hot window is enabled
+recent = hot_window if hot_window is not None else db
+export_slots = threading.BoundedSemaphore(max_concurrent_exports)
+broadcaster = PredictionsBroadcaster(db, **params["data_provider"]["news_stream"])
+
+
+def on_predictions_updated() -> None:
+    """Called by the listener thread whenever the scorer commits new predictions and after every reconnection."""
+    if response_cache is not None:
+        response_cache.invalidate()
+    if hot_window is not None:
+        hot_window.notify()
+    broadcaster.notify()
+
+
+# a single listener serves all stream clients, it holds its connection for good,
+# so it's opened outside of the pool serving the queries
+predictions_listener = NotificationListener(
+    get_db_connection_engine(poolclass=NullPool),
+    params["database"]["predictions_notify_channel"],
+    on_predictions_updated,
+)
+
 app = FastAPI()
 
 origins = [
@@ -39,46 +94,203 @@ app.add_middleware(
 app.add_api_route("/health", health([db.is_connection_alive]))
 
 
+def cached(endpoint: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Cache responses of the endpoint until new predictions are written, if the response cache is enabled."""
+    return response_cache.cached(endpoint) if response_cache is not None else endpoint
+
+
+@app.on_event("startup")
+async def start_predictions_listener():
+    await broadcaster.start()
+    predictions_listener.start()
+    if hot_window is not None:
+        db.executor.submit(hot_window.warm_up)
+
+
 @app.on_event("shutdown")
-def db_close_connection():
+async def db_close_connection():
+    predictions_listener.stop()
+    await broadcaster.stop()
     db.close_connection()
 
 
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(OperationalError)
+async def database_unavailable(request: Request, exc: Exception) -> JSONResponse:
+    """Responds with 503 if no pooled connection got free in time, a query timed out or the database is down."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is unavailable or overloaded"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.get("/db/pool/stats")
+def get_db_pool_stats() -> Dict[str, Any]:
+    """Gets connection pool occupancy and the number of queries in flight."""
+    return db.pool_stats()
+
+
+@app.get("/cache/stats")
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Gets response cache counters and whether it's notified of new predictions."""
+    if response_cache is None:
+        return {"enabled": False}
+
+    return {"enabled": True, "listening": predictions_listener.is_listening, **response_cache.stats()}
+
+
+@app.get("/hot_window/stats")
+def get_hot_window_stats() -> Dict[str, Any]:
+    """Gets the size of the in-memory window of recent news and the number of queries it answered."""
+    if hot_window is None:
+        return {"enabled": False}
+
+    return {"enabled": True, **hot_window.stats()}
+
+
 @app.get("/positive_score/average_last_hours", response_model=PositiveScore)
+@cached
 async def avg_positive_last_n_hours(n: int = 24):
     """Returns average positive score for news from last n hours."""
-    result = db.calc_avg_positive_last_n_hours_model_predictions(n)
+    result = await db.run(recent.calc_avg_positive_last_n_hours_model_predictions, n)
     return result
 
 
 @app.get("/positive_score/average_per_days", response_model=AveragePerDaysPositiveScore)
+@cached
 async def avg_positive_per_days(start_date: str = "2022-05-01", end_date: str = "2022-05-08"):
     """
     Returns average per day positive score for news from
     (start_date <= news_publication_date <= end_date) period.
     Date format: %yyyy%-%mm%-%dd%.
     """
-    result = db.calc_avg_per_day_positive_model_predictions(start_date, end_date)
+    result = await db.run(recent.calc_avg_per_day_positive_model_predictions, start_date, end_date)
     return result
 
 
 @app.get("/positive_score/average_for_period", response_model=PositiveScore)
+@cached
 async def avg_positive_for_period(start_date: str = "2022-05-01", end_date: str = "2022-05-08"):
     """
     Returns average positive score for news from
     (start_date <= news_publication_date <= end_date) period.
     Date format: %yyyy%-%mm%-%dd%.
     """
-    result = db.calc_avg_for_period_positive_model_predictions(start_date, end_date)
+    result = await db.run(db.calc_avg_for_period_positive_model_predictions, start_date, end_date)
     return result
 
 
+@app.get("/positive_score/time_series", response_model=SentimentTimeSeries)
+@cached
+async def positive_score_time_series(start: datetime.datetime, end: datetime.datetime, bucket: str = "5m"):
+    """
+    Returns average positive score, number of scored news and class distribution
+    per time bucket for news published in the [start, end) range of ISO 8601 timestamps, oldest first.
+    Bucket size is a number of minutes, hours or days, e.g. "5m", "15m", "1h", "1d", in multiples of 5 minutes.
+    Buckets are aligned to multiples of their size since the Unix epoch, those without scored news are omitted.
+    """
+    try:
+        return await db.run(
+            db.get_sentiment_time_series, bucket, start, end, params["data_provider"]["time_series"]["max_buckets"]
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
 @app.get("/news/top_k_news_titles", response_model=NewsTitles)
+@cached
 async def top_k_news_titles(k: int = 10, class_name: Optional[str] = None):
     """
     Returns top-k latest model scored news filtered by class.
     Class name can be "positive", "neutral", "negative".
     If class_name is not specified the filter won't be applied.
     """
-    result = db.get_top_k_news_titles(k, class_name)
+    result = await db.run(recent.get_top_k_news_titles, k, class_name)
     return result
+
+
+@app.get("/news/stream")
+async def news_stream():
+    """
+    Streams newly scored news and the updated rolling index as server-sent events
+    as soon as the model scorer commits them. Every "predictions" event carries
+    the latest scored news and the average positive score of news from the last hours.
+    """
+    subscription = broadcaster.subscribe()
+    if subscription is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many open streams")
+
+    return StreamingResponse(
+        broadcaster.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/news/stream/stats")
+def get_news_stream_stats() -> Dict[str, Any]:
+    """Gets the number of stream subscribers and published events."""
+    return {"listening": predictions_listener.is_listening, **broadcaster.stats()}
+
+
+@app.get("/news/feed", response_model=NewsFeedPage)
+@cached
+async def news_feed(
+    limit: int = Query(20, ge=1, le=100), class_name: Optional[str] = None, cursor: Optional[str] = None
+):
+    """
+    Returns a page of latest model scored news filtered by class, newest first.
+    Pass `next_cursor` of the response as `cursor` to get the next page,
+    every page costs the same however deep the client scrolls.
+    Class name can be "positive", "neutral", "negative".
+    If class_name is not specified the filter won't be applied.
+    """
+    try:
+        return await db.run(db.get_news_feed_page, limit, class_name, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@app.get("/news/export")
+def export_news(
+    start_date: str = "2022-05-01",
+    end_date: str = "2022-05-08",
+    class_name: Optional[str] = None,
+    export_format: ExportFormat = Query(ExportFormat.arrow, alias="format"),
+):
+    """
+    Exports model scored news from (start_date <= news_publication_date <= end_date) period
+    with all predicted scores as an Arrow IPC stream or a Parquet file, oldest first.
+    Date format: %yyyy%-%mm%-%dd%.
+    Rows are read and encoded in chunks, so that exports of millions of news take bounded memory.
+    Class name can be "positive", "neutral", "negative".
+    If class_name is not specified the filter won't be applied.
+    """
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many exports in progress")
+
+    try:
+        chunks = db.iter_news_export(start_date, end_date, class_name, params["data_provider"]["export"]["chunk_size"])
+    except ValueError as exc:
+        export_slots.release()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    encoded = encode_export(chunks, export_format.value)
+    filename = f"news_{start_date}_{end_date}.{export_format.value}"
+
+    def finish_export() -> None:
+        # the connection goes back to the pool and the slot is freed together
+        try:
+            encoded.close()
+            chunks.close()
+        finally:
+            export_slots.release()
+
+    body = ExportStream(encoded, on_close=finish_export)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format.value],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        # runs once the response is sent or the client is gone
+        background=BackgroundTask(body.close),
+    )
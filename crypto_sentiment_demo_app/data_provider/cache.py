@@ -0,0 +1,185 @@
+"""In-process response cache of the data provider invalidated on new model predictions."""
+import functools
+import select
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.engine.base import Engine
+
+from crypto_sentiment_demo_app.utils import get_logger
+
+logger = get_logger(Path(__file__).name)
+
+
+class ResponseCache:
+    """LRU cache of endpoint responses with TTL expiration and version-based invalidation.
+
+    Every invalidation bumps the cache version and drops all entries. A response computed
+    while an invalidation happened is returned but not stored, since it may already be stale.
+
+    :param ttl_seconds: time-to-live of a cached response, also bounds staleness if an invalidation is missed
+    :param max_entries: maximum number of cached responses
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return whether the response is cached and the response itself."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key: Hashable, value: Any, version: int) -> None:
+        """Store a response computed at the given cache version, unless the cache was invalidated since."""
+        with self._lock:
+            if version != self.version:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop all cached responses."""
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def cached(self, endpoint: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Decorate an async endpoint to cache its responses by endpoint name and parameters."""
+
+        @functools.wraps(endpoint)
+        async def wrapper(**params: Any) -> Any:
+            key = (endpoint.__name__, *sorted(params.items()))
+            found, value = self.get(key)
+            if found:
+                return value
+
+            version = self.version
+            value = await endpoint(**params)
+            self.put(key, value, version)
+
+            return value
+
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class NotificationListener(threading.Thread):
+    """Background thread calling a function on every Postgres NOTIFY on a channel.
+
+    The listening connection is discarded instead of being returned to the engine pool. The function is
+    also called after every (re)connection, since notifications sent while not listening are lost.
+
+    :param engine: SQLAlchemy engine of the Postgres database
+    :param channel: channel to LISTEN on
+    :param on_notify: function to call
+    :param reconnect_seconds: delay before reconnecting after a connection error
+    :param poll_seconds: how often to check whether the listener was stopped
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        channel: str,
+        on_notify: Callable[[], None],
+        reconnect_seconds: float = 5.0,
+        poll_seconds: float = 1.0,
+    ) -> None:
+        super().__init__(name=f"listen-{channel}", daemon=True)
+        self.engine = engine
+        self.channel = channel
+        self.on_notify = on_notify
+        self.reconnect_seconds = reconnect_seconds
+        self.poll_seconds = poll_seconds
+
+        self.is_listening = False
+        self._stopped = threading.Event()
+
+    def _listen(self) -> None:
+        pooled_connection = self.engine.raw_connection()
+        connection = pooled_connection.dbapi_connection
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+
+            self.is_listening = True
+            self.on_notify()
+            logger.info(f"Listening for notifications on channel {self.channel}")
+
+            while not self._stopped.is_set():
+                if not select.select([connection], [], [], self.poll_seconds)[0]:
+                    continue
+                connection.poll()
+                if connection.notifies:
+                    connection.notifies.clear()
+                    self.on_notify()
+        finally:
+            self.is_listening = False
+            # a connection left listening in autocommit mode must not go back to the pool
+            pooled_connection.invalidate()
+            pooled_connection.close()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception as exc:
+                logger.warning(f"Lost connection listening on channel {self.channel}: {exc}")
+            self._stopped.wait(self.reconnect_seconds)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def create_response_cache(params: Dict[str, Any]) -> Optional[ResponseCache]:
+    """Create response cache based on the `data_provider.response_cache` config, None if it's disabled."""
+    cache_params = dict(params["data_provider"]["response_cache"])
+
+    if not cache_params.pop("enabled"):
+        return None
+
+    return ResponseCache(**cache_params)
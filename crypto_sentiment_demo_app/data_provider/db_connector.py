@@ -1,12 +1,93 @@
+import asyncio
+import base64
+import binascii
 import datetime
-from typing import Optional
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 import sqlalchemy as db
+from sqlalchemy.engine.base import Engine
 from sqlalchemy.exc import SQLAlchemyError
 
 from crypto_sentiment_demo_app.data_provider.schemas import ClassesMapping
+from crypto_sentiment_demo_app.database import schema
+from crypto_sentiment_demo_app.database.rollups import ROLLUP_TABLES
 from crypto_sentiment_demo_app.utils import get_db_connection_engine
 
+T = TypeVar("T")
+
+BUCKET_SIZE_UNITS = {"m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def encode_feed_cursor(pub_time: datetime.datetime, title_id: int) -> str:
+    """Encodes the position of the last title of a news feed page into an opaque cursor."""
+    payload = json.dumps([pub_time.isoformat(), title_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_feed_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """
+    Decodes a news feed cursor into the publication time and id of the last title of the previous page.
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        pub_time, title_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.datetime.fromisoformat(pub_time), int(title_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def parse_bucket_size(bucket: str) -> int:
+    """
+    Parses a time series bucket size like "5m", "15m", "1h" or "1d" into seconds.
+    :raises ValueError: if the size is malformed or isn't a multiple of the finest rollup bucket
+    """
+    count, unit = bucket[:-1], bucket[-1:]
+    if not count.isdigit() or unit not in BUCKET_SIZE_UNITS or int(count) == 0:
+        raise ValueError(f"Invalid bucket size: {bucket}, expected a number followed by m, h or d")
+
+    bucket_seconds = int(count) * BUCKET_SIZE_UNITS[unit]
+    finest_seconds = min(ROLLUP_TABLES.values())
+    if bucket_seconds % finest_seconds:
+        raise ValueError(f"Bucket size must be a multiple of {finest_seconds // 60} minutes")
+    return bucket_seconds
+
+
+def parse_date_range(start_date: str, end_date: str) -> Tuple[datetime.datetime, datetime.datetime]:
+    """
+    Converts an inclusive date range into a half-open timestamp range [start, end + 1 day).
+    :raises ValueError: if a date is malformed
+    """
+    start = datetime.datetime.fromisoformat(start_date)
+    end = datetime.datetime.fromisoformat(end_date) + datetime.timedelta(days=1)
+    return start, end
+
+
+def _to_naive_utc(timestamp: datetime.datetime) -> datetime.datetime:
+    """Converts a timezone-aware timestamp to naive UTC, the way publication times are stored."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _floor_to_bucket(timestamp: datetime.datetime, bucket_seconds: int) -> datetime.datetime:
+    """Returns the start of the epoch-aligned bucket a naive UTC timestamp falls into."""
+    epoch = int(timestamp.replace(tzinfo=datetime.timezone.utc).timestamp())
+    return datetime.datetime.utcfromtimestamp(epoch - epoch % bucket_seconds)
+
 
 class DBConnection:
     """
@@ -17,23 +98,38 @@ class DBConnection:
     Attributes
     ----------
     engine : sqlalchemy.engine.base.Engine
-        SQLAlchemy Engine
-    conn : sqlalchemy.engine.base.Connection
-        SQLAlchemy Connection
+        SQLAlchemy Engine with a pool of connections, one is checked out per query,
+        created on first use
+    executor : concurrent.futures.ThreadPoolExecutor
+        threadpool running blocking queries off the event loop, with a thread per pooled connection
+        except the reserved ones
+    reserved_connections : int
+        pooled connections on top of the executor threads, held outside of it, e.g. by streamed exports
     metadata : sqlalchemy.sql.schema.MetaData
-        Metadata of our PostgreSQL database
+        Metadata of our PostgreSQL database, see crypto_sentiment_demo_app/database/schema.py
     news_titles : sqlalchemy.sql.schema.Table
         news_titles table representation
     model_predictions : sqlalchemy.sql.schema.Table
         model_predictions table representation
+    rollup_tables : Dict[int, sqlalchemy.sql.schema.Table]
+        sentiment rollup table representations by their bucket size in seconds,
+        see crypto_sentiment_demo_app/database/rollups.py
+    sentiment_rollup_daily : sqlalchemy.sql.schema.Table
+        daily sentiment rollup table representation
 
     Methods
     -------
+    run(func, *args):
+        Runs a blocking query method on the executor without blocking the event loop.
+
+    pool_stats():
+        Returns connection pool occupancy and the number of queries in flight.
+
     close_connection():
         Fully closing all database connections.
 
-    _create_table_obj(table_name):
-        Creates table representation.
+    _create_engine():
+        Creates the engine with the configured pool size and timeouts.
 
     _construct_query_template(selectables, class_name):
         Returns query boilerplate with selected columns
@@ -42,12 +138,51 @@ class DBConnection:
     _filter_by_predicted_class(query, class_name)
         Filters news by predicted class.
 
+    _filter_by_pub_time(query, start, end):
+        Filters news published in the half-open [start, end) range.
+
     _execute_and_fetchall(query):
         Executes query and fetches the result.
 
+    _iter_partitions(query, chunk_size):
+        Executes query with a server-side cursor and yields chunks of its rows.
+
+    top_k_news_titles_query(k, class_name):
+        Builds the query of top-k latest model scored news.
+
     get_top_k_news_titles(k, class_name):
         Returns top-k latest model scored news.
 
+    avg_positive_last_n_hours_query(n_hours):
+        Builds the query of average positive score for news from last n hours.
+
+    news_feed_query(limit, class_name, after):
+        Builds the query of a news feed page following the (pub_time, title_id) keyset.
+
+    get_news_feed_page(limit, class_name, cursor):
+        Returns a page of latest model scored news and the cursor of the next page.
+
+    news_export_query(start, end, class_name):
+        Builds the query of scored news published in the [start, end) range with all predicted scores.
+
+    iter_news_export(start_date, end_date, class_name, chunk_size):
+        Yields chunks of scored news rows read with a server-side cursor.
+
+    news_scored_after_query(scored_after, limit):
+        Builds the query of latest news scored after the given time.
+
+    get_news_scored_after(scored_after, limit):
+        Returns latest news scored after the given time and the time the latest of them was scored.
+
+    get_last_scored_at():
+        Returns the time the latest news was scored.
+
+    recent_predictions_query(start, scored_after):
+        Builds the query of predictions of news published since start, optionally only those scored after a time.
+
+    get_recent_predictions(start, scored_after):
+        Returns predictions of news published since start, optionally only those scored after a time.
+
     calc_avg_positive_last_n_hours_model_predictions(n_hours):
         Returns average positive score for news from last n hours.
 
@@ -60,15 +195,59 @@ class DBConnection:
         Returns average positive score for news from
         (start_date <= news_publication_date <= end_date) period.
         Date format: %yyyy%-%mm%-%dd%.
+
+    sentiment_time_series_query(bucket_seconds, start, end):
+        Builds the query of per-bucket sums merged from the coarsest rollup dividing the bucket size.
+
+    get_sentiment_time_series(bucket, start, end, max_buckets):
+        Returns average positive score, number of scored news and class distribution per time bucket.
     """
 
-    def __init__(self):
-        """Constructs all the necessary attributes."""
-        self.engine = get_db_connection_engine()
-        self.conn = self.engine.connect()
-        self.metadata = db.MetaData()
-        self.news_titles = self._create_table_obj("news_titles")
-        self.model_predictions = self._create_table_obj("model_predictions")
+    def __init__(self, database_cfg: Dict[str, Any], reserved_connections: int = 0):
+        """
+        Constructs all the necessary attributes.
+        :param database_cfg: `data_provider.database` config with pool size and timeouts
+        :param reserved_connections: overflow connections added to the pool for connections held
+            outside of the executor, so that they never starve the queries run on it
+        """
+        self.database_cfg = database_cfg
+        self.reserved_connections = reserved_connections
+        self.max_workers = database_cfg["pool_size"] + database_cfg["max_overflow"]
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._queries_in_flight = 0
+        self.metadata = schema.metadata
+        self.news_titles = schema.news_titles
+        self.model_predictions = schema.model_predictions
+        self.rollup_tables = {
+            bucket_seconds: schema.metadata.tables[table_name] for table_name, bucket_seconds in ROLLUP_TABLES.items()
+        }
+        self.sentiment_rollup_daily = schema.sentiment_rollup_daily
+
+    @property
+    def engine(self) -> Engine:
+        """Engine of the connection pool, created on first use, so that nothing connects before the first query."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._create_engine()
+        return self._engine
+
+    def _create_engine(self) -> Engine:
+        """Creates the engine with the pool size and timeouts of the `data_provider.database` config."""
+        database_cfg = self.database_cfg
+        return get_db_connection_engine(
+            pool_size=database_cfg["pool_size"],
+            max_overflow=database_cfg["max_overflow"] + self.reserved_connections,
+            pool_timeout=database_cfg["pool_timeout_seconds"],
+            pool_recycle=database_cfg["pool_recycle_seconds"],
+            pool_pre_ping=database_cfg["pool_pre_ping"],
+            connect_args={
+                "connect_timeout": database_cfg["connect_timeout_seconds"],
+                "options": f"-c statement_timeout={database_cfg['statement_timeout_ms']}",
+            },
+        )
 
     def is_connection_alive(self) -> bool:
         test_query = db.select(db.text("1"))
@@ -78,14 +257,34 @@ class DBConnection:
         except SQLAlchemyError:
             return False
 
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Runs a blocking query method on the executor without blocking the event loop."""
+        with self._lock:
+            self._queries_in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            with self._lock:
+                self._queries_in_flight -= 1
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Returns connection pool occupancy and the number of queries in flight."""
+        pool = self.engine.pool
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_workers": self.max_workers,
+            "reserved_connections": self.reserved_connections,
+            "queries_in_flight": self._queries_in_flight,
+        }
+
     def close_connection(self):
         """Fully closing all database connections."""
-        self.conn.close()
-        self.engine.dispose()
-
-    def _create_table_obj(self, table_name: str) -> db.sql.schema.Table:
-        """Creates table representation."""
-        return db.Table(table_name, self.metadata, autoload=True, autoload_with=self.engine)
+        self.executor.shutdown(wait=False)
+        if self._engine is not None:
+            self._engine.dispose()
 
     def _construct_query_template(
         self, selectables: list, class_name: Optional[str] = None
@@ -109,50 +308,233 @@ class DBConnection:
         if class_name in ClassesMapping.__members__:
             class_filter = predicted_class == ClassesMapping[class_name].value
         else:
-            class_filter = predicted_class != None
+            class_filter = predicted_class.isnot(None)
         return query.filter(class_filter)
 
+    def _filter_by_pub_time(
+        self,
+        query: db.sql.selectable.Select,
+        start: datetime.datetime,
+        end: Optional[datetime.datetime] = None,
+    ) -> db.sql.selectable.Select:
+        """
+        Filters news published in the half-open [start, end) range.
+        The bare column is compared, so that the range is served by the pub_time index.
+        """
+        pub_time = self.news_titles.c.pub_time
+        query = query.where(pub_time >= start)
+        return query.where(pub_time < end) if end is not None else query
+
     def _execute_and_fetchall(self, query: db.sql.selectable.Select) -> list:
-        """Executes query and fetches the result."""
-        result = self.conn.execute(query)
-        return result.fetchall()
+        """Executes query on a connection checked out from the pool and fetches the result."""
+        with self.engine.connect() as conn:
+            return conn.execute(query).fetchall()
+
+    def top_k_news_titles_query(self, k: int, class_name: Optional[str] = None) -> db.sql.selectable.Select:
+        """
+        Builds the query of top-k latest model scored news.
+        The order matches the (pub_time, title_id) index, which is scanned backwards
+        until k titles of the class are found instead of sorting the whole join.
+        """
+        selectables = [
+            self.news_titles.c.title,
+            self.news_titles.c.source,
+            self.news_titles.c.pub_time,
+            self.model_predictions.c.positive,
+        ]
+        query_template = self._construct_query_template(selectables, class_name)
+        return (
+            query_template.where(self.news_titles.c.pub_time.isnot(None))
+            .order_by(self.news_titles.c.pub_time.desc(), self.news_titles.c.title_id.desc())
+            .limit(k)
+        )
 
     def get_top_k_news_titles(self, k: int, class_name: Optional[str] = None) -> list:
         """Returns top-k latest model scored news."""
+        return self._execute_and_fetchall(self.top_k_news_titles_query(k, class_name))
+
+    def news_feed_query(
+        self, limit: int, class_name: Optional[str] = None, after: Optional[Tuple[datetime.datetime, int]] = None
+    ) -> db.sql.selectable.Select:
+        """
+        Builds the query of a news feed page following the (pub_time, title_id) keyset.
+        The row comparison seeks straight to the position in the (pub_time, title_id) index,
+        so that a page costs the same however deep it is, unlike OFFSET or ever larger k.
+        """
         selectables = [
+            self.news_titles.c.title_id,
             self.news_titles.c.title,
             self.news_titles.c.source,
             self.news_titles.c.pub_time,
             self.model_predictions.c.positive,
         ]
-        query_template = self._construct_query_template(selectables, class_name)
-        query = query_template.order_by(self.news_titles.c.pub_time.desc()).limit(k)
-        return self._execute_and_fetchall(query)
+        keyset = db.tuple_(self.news_titles.c.pub_time, self.news_titles.c.title_id)
+        query = self._construct_query_template(selectables, class_name).where(self.news_titles.c.pub_time.isnot(None))
+        if after is not None:
+            query = query.where(keyset < db.tuple_(*after))
+        return query.order_by(self.news_titles.c.pub_time.desc(), self.news_titles.c.title_id.desc()).limit(limit)
 
-    def calc_avg_positive_last_n_hours_model_predictions(self, n_hours: int) -> Optional[float]:
-        """Returns average positive score for news from last n hours."""
+    def get_news_feed_page(
+        self, limit: int, class_name: Optional[str] = None, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns a page of latest model scored news and the cursor of the next page.
+        :raises ValueError: if the cursor is malformed
+        """
+        after = decode_feed_cursor(cursor) if cursor is not None else None
+        # one extra row tells whether there is a next page
+        rows = self._execute_and_fetchall(self.news_feed_query(limit + 1, class_name, after))
+        items = [dict(row._mapping) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_feed_cursor(items[-1]["pub_time"], items[-1]["title_id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    def news_export_query(
+        self, start: datetime.datetime, end: datetime.datetime, class_name: Optional[str] = None
+    ) -> db.sql.selectable.Select:
+        """
+        Builds the query of scored news published in the [start, end) range with all predicted scores.
+        Rows come in the order of the (pub_time, title_id) index, so that they're streamed without sorting.
+        """
+        selectables = [
+            self.news_titles.c.title_id,
+            self.news_titles.c.title,
+            self.news_titles.c.source,
+            self.news_titles.c.pub_time,
+            self.model_predictions.c.negative,
+            self.model_predictions.c.neutral,
+            self.model_predictions.c.positive,
+            self.model_predictions.c.predicted_class,
+        ]
+        query = self._filter_by_pub_time(self._construct_query_template(selectables, class_name), start, end)
+        return query.order_by(self.news_titles.c.pub_time, self.news_titles.c.title_id)
+
+    def iter_news_export(
+        self, start_date: str, end_date: str, class_name: Optional[str], chunk_size: int
+    ) -> Iterator[Sequence[Sequence[Any]]]:
+        """
+        Yields chunks of scored news rows for the (start_date <= news_publication_date <= end_date) period.
+        Date format: %yyyy%-%mm%-%dd%.
+        :raises ValueError: if a date is malformed, before anything is read
+        """
+        start, end = parse_date_range(start_date, end_date)
+        return self._iter_partitions(self.news_export_query(start, end, class_name), chunk_size)
+
+    def _iter_partitions(self, query: db.sql.selectable.Select, chunk_size: int) -> Iterator[Sequence[Sequence[Any]]]:
+        """
+        Executes query with a server-side cursor and yields chunks of its rows as plain tuples, so that
+        only a chunk is held in memory however many rows there are. Rows skip SQLAlchemy result processing,
+        which costs as much as fetching them for millions of rows. A pooled connection is held until
+        the generator is exhausted or closed.
+        """
+        compiled = query.compile(dialect=self.engine.dialect)
+        with self.engine.connect() as conn:
+            # the whole result is fetched, so plan for the total time rather than for the first rows
+            conn.exec_driver_sql("SET LOCAL cursor_tuple_fraction = 1.0")
+            with conn.connection.cursor(name="partitions") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(str(compiled), compiled.params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+
+    def news_scored_after_query(
+        self, scored_after: Optional[datetime.datetime], limit: int
+    ) -> db.sql.selectable.Select:
+        """
+        Builds the query of latest news scored after the given time, or ever scored if it's None.
+        Served by the scored_at index, so it's cheap however many news were scored before.
+        """
+        scored_at = self.model_predictions.c.scored_at
+        selectables = [
+            self.news_titles.c.title_id,
+            self.news_titles.c.title,
+            self.news_titles.c.source,
+            self.news_titles.c.pub_time,
+            self.model_predictions.c.positive,
+            scored_at,
+        ]
+        query = self._construct_query_template(selectables)
+        query = query.where(scored_at > scored_after if scored_after is not None else scored_at.isnot(None))
+        return query.order_by(scored_at.desc(), self.news_titles.c.title_id.desc()).limit(limit)
+
+    def get_news_scored_after(
+        self, scored_after: Optional[datetime.datetime], limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[datetime.datetime]]:
+        """Returns at most limit latest news scored after the given time and the time the latest of them was scored."""
+        rows = self._execute_and_fetchall(self.news_scored_after_query(scored_after, limit))
+        items = [dict(row._mapping) for row in rows]
+        last_scored_at = items[0]["scored_at"] if items else scored_after
+        for item in items:
+            del item["scored_at"]
+        return items, last_scored_at
+
+    def get_last_scored_at(self) -> Optional[datetime.datetime]:
+        """Returns the time the latest news was scored, None if no news has a scoring time."""
+        return self._execute_and_fetchall(db.select([db.func.max(self.model_predictions.c.scored_at)]))[0][0]
+
+    def recent_predictions_query(
+        self, start: datetime.datetime, scored_after: Optional[datetime.datetime] = None
+    ) -> db.sql.selectable.Select:
+        """
+        Builds the query of predictions of news published since start,
+        only of those scored after scored_after if it's given.
+        """
+        selectables = [
+            self.news_titles.c.title_id,
+            self.news_titles.c.title,
+            self.news_titles.c.source,
+            self.news_titles.c.pub_time,
+            self.model_predictions.c.negative,
+            self.model_predictions.c.neutral,
+            self.model_predictions.c.positive,
+            self.model_predictions.c.predicted_class,
+        ]
+        query = self._filter_by_pub_time(self._construct_query_template(selectables), start)
+        if scored_after is not None:
+            query = query.where(self.model_predictions.c.scored_at > scored_after)
+        return query
+
+    def get_recent_predictions(
+        self, start: datetime.datetime, scored_after: Optional[datetime.datetime] = None
+    ) -> list:
+        """
+        Returns predictions of news published since start,
+        only of those scored after scored_after if it's given.
+        """
+        return self._execute_and_fetchall(self.recent_predictions_query(start, scored_after))
+
+    def avg_positive_last_n_hours_query(self, n_hours: int) -> db.sql.selectable.Select:
+        """Builds the query of average positive score for news from last n hours."""
         datetime_mark = datetime.datetime.now() - datetime.timedelta(hours=n_hours)
         selectables = [db.func.avg(self.model_predictions.c.positive)]
         query_template = self._construct_query_template(selectables)
-        query = query_template.where(self.news_titles.c.pub_time >= datetime_mark)
-        return self._execute_and_fetchall(query)[0][0]
+        return self._filter_by_pub_time(query_template, datetime_mark)
+
+    def calc_avg_positive_last_n_hours_model_predictions(self, n_hours: int) -> Optional[float]:
+        """Returns average positive score for news from last n hours."""
+        return self._execute_and_fetchall(self.avg_positive_last_n_hours_query(n_hours))[0][0]
 
     def calc_avg_per_day_positive_model_predictions(self, start_date: str, end_date: str) -> list:
         """
         Returns average per day positive score for news from
         (start_date <= news_publication_date <= end_date) period.
         Date format: %yyyy%-%mm%-%dd%.
+        Reads O(days) rows of the daily rollup table instead of joining all titles of the period.
         """
-        pub_date_col = db.cast(self.news_titles.c.pub_time, db.Date)
+        rollup = self.sentiment_rollup_daily
+        start, end = parse_date_range(start_date, end_date)
         selectables = [
-            pub_date_col.label("pub_date"),
-            db.func.avg(self.model_predictions.c.positive).label("avg_positive"),
+            db.cast(rollup.c.bucket_start, db.Date).label("pub_date"),
+            (rollup.c.positive_sum / rollup.c.n_scored).label("avg_positive"),
         ]
-        query_template = self._construct_query_template(selectables)
         query = (
-            query_template.filter(pub_date_col.between(start_date, end_date))
-            .group_by(pub_date_col)
-            .order_by(pub_date_col.desc())
+            db.select(selectables)
+            .where(rollup.c.bucket_start >= start, rollup.c.bucket_start < end, rollup.c.n_scored > 0)
+            .order_by(rollup.c.bucket_start.desc())
         )
         return self._execute_and_fetchall(query)
 
@@ -161,9 +543,75 @@ class DBConnection:
         Returns average positive score for news from
         (start_date <= news_publication_date <= end_date) period.
         Date format: %yyyy%-%mm%-%dd%.
+        Reads O(days) rows of the daily rollup table instead of joining all titles of the period.
         """
-        pub_date_col = db.cast(self.news_titles.c.pub_time, db.Date)
-        selectables = [db.func.avg(self.model_predictions.c.positive).label("avg_positive")]
-        query_template = self._construct_query_template(selectables)
-        query = query_template.filter(pub_date_col.between(start_date, end_date))
+        rollup = self.sentiment_rollup_daily
+        start, end = parse_date_range(start_date, end_date)
+        avg_positive = db.func.sum(rollup.c.positive_sum) / db.func.nullif(db.func.sum(rollup.c.n_scored), 0)
+        query = db.select([avg_positive.label("avg_positive")]).where(
+            rollup.c.bucket_start >= start, rollup.c.bucket_start < end
+        )
         return self._execute_and_fetchall(query)[0][0]
+
+    def sentiment_time_series_query(
+        self, bucket_seconds: int, start: datetime.datetime, end: datetime.datetime
+    ) -> db.sql.selectable.Select:
+        """
+        Builds the query of per-bucket sums merged from the coarsest rollup dividing the bucket size.
+        Rollup buckets are epoch-aligned, so every one of them falls into exactly one requested bucket
+        and a month of 5-minute buckets is a range scan of ~9k rollup rows.
+        """
+        rollup = self.rollup_tables[max(size for size in self.rollup_tables if bucket_seconds % size == 0)]
+        epoch = db.extract("epoch", rollup.c.bucket_start)
+        bucket_start = db.func.timezone(
+            "UTC", db.func.to_timestamp(db.func.floor(epoch / bucket_seconds) * bucket_seconds)
+        ).label("bucket_start")
+        n_scored = db.func.sum(rollup.c.n_scored)
+        selectables = [
+            bucket_start,
+            n_scored.label("n_scored"),
+            db.func.sum(rollup.c.positive_sum).label("positive_sum"),
+            *(db.func.sum(rollup.c[f"n_{cls.name}"]).label(f"n_{cls.name}") for cls in ClassesMapping),
+        ]
+        return (
+            db.select(selectables)
+            .where(rollup.c.bucket_start >= start, rollup.c.bucket_start < end)
+            .group_by(bucket_start)
+            .having(n_scored > 0)
+            .order_by(bucket_start)
+        )
+
+    def get_sentiment_time_series(
+        self, bucket: str, start: datetime.datetime, end: datetime.datetime, max_buckets: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns average positive score, number of scored news and class distribution per time bucket.
+        The range is widened to whole buckets, buckets without scored news are omitted.
+        :raises ValueError: if the bucket size is invalid or the range is empty or spans more than max_buckets buckets
+        """
+        bucket_seconds = parse_bucket_size(bucket)
+        start = _floor_to_bucket(_to_naive_utc(start), bucket_seconds)
+        end = _to_naive_utc(end)
+        if end <= start:
+            raise ValueError("End of the range must be after its start")
+
+        n_buckets = math.ceil((end - start).total_seconds() / bucket_seconds)
+        if n_buckets > max_buckets:
+            raise ValueError(f"Range spans {n_buckets} buckets, at most {max_buckets} are allowed")
+        end = start + datetime.timedelta(seconds=n_buckets * bucket_seconds)
+
+        series = []
+        for row in self._execute_and_fetchall(self.sentiment_time_series_query(bucket_seconds, start, end)):
+            class_counts = {cls.name: row._mapping[f"n_{cls.name}"] for cls in ClassesMapping}
+            n_classified = sum(class_counts.values())
+            series.append(
+                {
+                    "bucket_start": row.bucket_start,
+                    "n_scored": row.n_scored,
+                    "avg_positive": row.positive_sum / row.n_scored,
+                    "class_distribution": {
+                        name: count / n_classified if n_classified else 0.0 for name, count in class_counts.items()
+                    },
+                }
+            )
+        return series
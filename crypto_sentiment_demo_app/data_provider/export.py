@@ -0,0 +1,157 @@
+"""Columnar bulk export of scored news as an Arrow IPC stream or a Parquet file.
+
+Chunks of rows read with a server-side cursor are converted to Arrow record batches
+and written out as soon as they're encoded, so that memory use of an export is bounded
+by the chunk size rather than by the number of exported rows.
+"""
+import io
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from crypto_sentiment_demo_app.utils import get_logger
+
+logger = get_logger(Path(__file__).name)
+
+# columns of DBConnection.news_export_query
+EXPORT_SCHEMA = pa.schema(
+    [
+        ("title_id", pa.int64()),
+        ("title", pa.string()),
+        ("source", pa.string()),
+        ("pub_time", pa.timestamp("us")),
+        ("negative", pa.float64()),
+        ("neutral", pa.float64()),
+        ("positive", pa.float64()),
+        ("predicted_class", pa.int8()),
+    ]
+)
+
+# export format -> media type of the response
+EXPORT_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting written bytes until they're drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def rows_to_record_batch(rows: Sequence[Sequence[Any]]) -> pa.RecordBatch:
+    """Convert a chunk of export rows to a record batch of the export schema."""
+    columns = list(zip(*rows)) if rows else [[] for _ in EXPORT_SCHEMA]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, EXPORT_SCHEMA)], schema=EXPORT_SCHEMA
+    )
+
+
+def encode_export(chunks: Iterable[Sequence[Sequence[Any]]], export_format: str) -> Iterator[bytes]:
+    """Encode chunks of export rows in the given format, yielding the encoded bytes of every chunk.
+
+    Every chunk becomes an Arrow record batch or a Parquet row group.
+
+    :param chunks: chunks of rows with the columns of the export schema
+    :param export_format: "arrow" for an Arrow IPC stream or "parquet"
+    :raises ValueError: on the first iteration, if the format is unknown
+    :return: iterator over the encoded bytes
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unknown export format: {export_format}, expected one of {', '.join(EXPORT_MEDIA_TYPES)}")
+
+    sink = _ChunkSink()
+    if export_format == "arrow":
+        writer = pa.ipc.new_stream(sink, EXPORT_SCHEMA)
+    else:
+        writer = pq.ParquetWriter(sink, EXPORT_SCHEMA)
+
+    with writer:
+        for rows in chunks:
+            batch = rows_to_record_batch(rows)
+            if export_format == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch]))
+            yield sink.drain()
+
+    # end of stream marker or Parquet footer
+    yield sink.drain()
+
+
+class ExportStream:
+    """Iterator over encoded export bytes that can be closed from any thread.
+
+    Starlette reads the response body on threadpool threads and runs the background task as soon as
+    the client is gone, possibly while a chunk is still being read. A generator can't be closed while
+    another thread runs it, so in that case the close is left to the iterating thread, which runs it
+    right after the chunk is read, before reading the next partition.
+
+    :param body: iterator over the encoded bytes
+    :param on_close: function releasing the export resources, called exactly once
+    """
+
+    def __init__(self, body: Iterator[bytes], on_close: Callable[[], None]) -> None:
+        self.body = body
+        self.on_close = on_close
+
+        self._lock = threading.Lock()
+        self._reading = False
+        self._closing = False
+        self._closed = False
+
+    def __iter__(self) -> "ExportStream":
+        return self
+
+    def __next__(self) -> bytes:
+        with self._lock:
+            if self._closing:
+                raise StopIteration
+            self._reading = True
+
+        try:
+            return next(self.body)
+        finally:
+            with self._lock:
+                self._reading = False
+                close_now = self._closing and not self._closed
+                self._closed = self._closed or close_now
+            if close_now:
+                try:
+                    self.on_close()
+                except Exception:
+                    logger.exception("Failed to close the export after the client was gone")
+
+    def close(self) -> None:
+        """Release the export resources now, or once the chunk being read is done."""
+        with self._lock:
+            self._closing = True
+            if self._reading or self._closed:
+                return
+            self._closed = True
+
+        self.on_close()
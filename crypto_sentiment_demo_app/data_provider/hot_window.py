@@ -0,0 +1,313 @@
+"""In-memory columnar window of recently published scored news serving the dashboard queries."""
+import datetime
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from crypto_sentiment_demo_app.data_provider.db_connector import (
+    DBConnection,
+    parse_date_range,
+)
+from crypto_sentiment_demo_app.data_provider.schemas import ClassesMapping
+from crypto_sentiment_demo_app.utils import get_logger
+
+logger = get_logger(Path(__file__).name)
+
+
+class WindowColumns(NamedTuple):
+    """Columns of the window rows sorted by (pub_time, title_id)."""
+
+    title_id: np.ndarray  # int64
+    pub_time: np.ndarray  # datetime64[us]
+    predicted_class: np.ndarray  # int8
+    probabilities: np.ndarray  # (n, 3) float32 negative, neutral and positive scores
+    source: np.ndarray  # int32 index into the interned sources
+    title: np.ndarray  # object
+    positive_cumsum: np.ndarray  # float64 running sum of positive scores, for averages over any range of rows
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self)
+
+    def positive_sum(self, first: int, last: int) -> float:
+        """Sum of positive scores of rows [first, last)."""
+        if last <= first:
+            return 0.0
+        return float(self.positive_cumsum[last - 1] - self.positive_cumsum[first] + self.probabilities[first, 2])
+
+
+class HotWindow:
+    """Recently published scored news kept in NumPy arrays, answering queries about them from memory.
+
+    The window holds all scored news published since midnight `days` days ago. It's loaded on the first query
+    and then refreshed incrementally: only predictions scored after the latest scoring time seen so far
+    are fetched and merged in, replacing re-scored titles, and titles that slid out of the window are dropped.
+    A refresh happens on the first query after `notify` is called, e.g. whenever the scorer commits,
+    or after `refresh_seconds` without notifications. Only that query waits for the refresh, queries
+    arriving meanwhile are answered from the previous snapshot of the window, or from SQL while it's
+    being loaded, so that they don't hold the query threads waiting. Queries reaching past the start
+    of the window or needing more titles than it holds fall through to SQL. Answers from the previous
+    snapshot may predate predictions the response cache was already invalidated for, so `on_stale_reads`
+    is called once the refresh is done, e.g. to invalidate the cache again.
+
+    The query methods have the same names and results as those of DBConnection, except that scores are float32.
+
+    :param db: data provider database connection, also answering queries outside of the window
+    :param days: number of whole days before today the window covers
+    :param refresh_seconds: maximum time between refreshes
+    :param on_stale_reads: called after a refresh during which queries were answered from the previous snapshot
+    """
+
+    def __init__(
+        self,
+        db: DBConnection,
+        days: int,
+        refresh_seconds: float,
+        on_stale_reads: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.db = db
+        self.days = days
+        self.refresh_seconds = refresh_seconds
+        self.on_stale_reads = on_stale_reads
+
+        # columns and start of the window, replaced at once, so that queries never mix up two refreshes
+        self.snapshot: Optional[Tuple[WindowColumns, datetime.datetime]] = None
+        self.last_scored_at: Optional[datetime.datetime] = None
+        self.sources: List[Optional[str]] = []
+        self._source_codes: Dict[Optional[str], int] = {}
+        # notifications received and those the window was last refreshed after
+        self._notifications = 0
+        self._refreshed_notifications = 0
+        self._last_refresh = 0.0
+        self._stale_reads = False
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.fallbacks = 0
+
+    @property
+    def columns(self) -> Optional[WindowColumns]:
+        return self.snapshot[0] if self.snapshot is not None else None
+
+    @property
+    def start(self) -> Optional[datetime.datetime]:
+        return self.snapshot[1] if self.snapshot is not None else None
+
+    def notify(self) -> None:
+        """Mark the window stale, it's refreshed on the next query. Safe to call from any thread."""
+        self._notifications += 1
+
+    def _window_start(self) -> datetime.datetime:
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        return today - datetime.timedelta(days=self.days)
+
+    def _to_columns(self, rows: Sequence[Sequence[Any]]) -> WindowColumns:
+        """Convert rows of DBConnection.recent_predictions_query to columns sorted by (pub_time, title_id)."""
+        for row in rows:
+            if row[2] not in self._source_codes:
+                self._source_codes[row[2]] = len(self.sources)
+                self.sources.append(row[2])
+
+        title_id = np.array([row[0] for row in rows], dtype=np.int64)
+        pub_time = np.array([row[3] for row in rows], dtype="datetime64[us]")
+        probabilities = np.array([row[4:7] for row in rows], dtype=np.float32).reshape(-1, 3)
+        order = np.lexsort((title_id, pub_time))
+        return WindowColumns(
+            title_id=title_id[order],
+            pub_time=pub_time[order],
+            predicted_class=np.array([row[7] for row in rows], dtype=np.int8)[order],
+            probabilities=probabilities[order],
+            source=np.array([self._source_codes[row[2]] for row in rows], dtype=np.int32)[order],
+            title=np.array([row[1] for row in rows], dtype=object)[order],
+            positive_cumsum=np.cumsum(probabilities[order, 2], dtype=np.float64),
+        )
+
+    @staticmethod
+    def _merge(columns: WindowColumns, new: WindowColumns) -> WindowColumns:
+        """Merge new rows into the window, replacing rows of the same titles.
+
+        Only the tail of the window published since the earliest new title is merged and sorted again,
+        which is a small part of the window for freshly crawled news. A title keeps its publication time
+        when it's re-scored, so the row it replaces is in the tail too.
+        """
+        if not len(new.title_id):
+            return columns
+
+        first = int(np.searchsorted(columns.pub_time, new.pub_time[0]))
+        kept = ~np.isin(columns.title_id[first:], new.title_id)
+        tail = [np.concatenate([old[first:][kept], added]) for old, added in zip(columns[:-1], new[:-1])]
+        order = np.lexsort((tail[0], tail[1]))
+        head_sum = columns.positive_cumsum[first - 1] if first else 0.0
+        tail_cumsum = head_sum + np.cumsum(tail[3][order, 2], dtype=np.float64)
+
+        return WindowColumns(
+            *(np.concatenate([old[:first], column[order]]) for old, column in zip(columns[:-1], tail)),
+            positive_cumsum=np.concatenate([columns.positive_cumsum[:first], tail_cumsum]),
+        )
+
+    def refresh(self) -> None:
+        """Load the window or merge predictions scored since the last refresh into it."""
+        start = self._window_start()
+        # the window stays stale until the refresh succeeds, notifications arriving meanwhile trigger another one
+        notifications = self._notifications
+        # read before the predictions, so that those scored meanwhile are fetched again by the next refresh
+        last_scored_at = self.db.get_last_scored_at()
+
+        if self.columns is None:
+            columns = self._to_columns(self.db.get_recent_predictions(start))
+            logger.info(f"Loaded {len(columns.title_id)} news published since {start} into the hot window")
+        else:
+            # titles scored before scoring times were recorded have none and are loaded with the window
+            scored_after = self.last_scored_at or datetime.datetime.min
+            columns = self._merge(self.columns, self._to_columns(self.db.get_recent_predictions(start, scored_after)))
+
+        first = int(np.searchsorted(columns.pub_time, np.datetime64(start, "us")))
+        self.snapshot = WindowColumns(*(column[first:] for column in columns)), start
+        self.last_scored_at = last_scored_at
+        self._refreshed_notifications, self._last_refresh = notifications, time.monotonic()
+
+    def _is_stale(self) -> bool:
+        return (
+            self.snapshot is None
+            or self._notifications != self._refreshed_notifications
+            or time.monotonic() - self._last_refresh > self.refresh_seconds
+        )
+
+    def _fresh_columns(self) -> Optional[Tuple[WindowColumns, datetime.datetime]]:
+        """Return the window columns and start, refreshing them first if they're stale.
+
+        :return: the previous snapshot if another thread is refreshing it, None if it's being loaded
+        """
+        if not self._is_stale():
+            return self.snapshot
+
+        if not self._refresh_lock.acquire(blocking=False):
+            # flagged before reading the snapshot, so that the refresh either sees the flag or already replaced it
+            self._stale_reads = True
+            return self.snapshot
+
+        try:
+            if self._is_stale():
+                self.refresh()
+            stale_reads, self._stale_reads = self._stale_reads, False
+        finally:
+            self._refresh_lock.release()
+        if stale_reads and self.on_stale_reads is not None:
+            self.on_stale_reads()
+        return self.snapshot
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+
+    def warm_up(self) -> None:
+        """Load the window ahead of the first query."""
+        try:
+            self._fresh_columns()
+        except Exception as exc:
+            logger.warning(f"Failed to load the hot window, it's loaded on the first query: {exc}")
+
+    def get_top_k_news_titles(self, k: int, class_name: Optional[str] = None) -> list:
+        """Returns top-k latest model scored news."""
+        snapshot = self._fresh_columns()
+        if snapshot is None:
+            self._count(hit=False)
+            return self.db.get_top_k_news_titles(k, class_name)
+
+        columns, _ = snapshot
+        n_rows = len(columns.title_id)
+        if class_name in ClassesMapping.__members__:
+            # scan back from the latest titles in growing blocks until k titles of the class are found
+            class_id, block_size = ClassesMapping[class_name].value, 4 * k
+            while True:
+                block_start = max(n_rows - block_size, 0)
+                indices = block_start + np.flatnonzero(columns.predicted_class[block_start:] == class_id)
+                if len(indices) >= k or block_start == 0:
+                    break
+                block_size *= 4
+        else:
+            indices = np.arange(n_rows)
+
+        if len(indices) < k:
+            self._count(hit=False)
+            return self.db.get_top_k_news_titles(k, class_name)
+
+        self._count(hit=True)
+        latest = indices[len(indices) - k :][::-1]
+        return [
+            {"title": title, "source": self.sources[source], "pub_time": pub_time, "positive": positive}
+            for title, source, pub_time, positive in zip(
+                columns.title[latest].tolist(),
+                columns.source[latest].tolist(),
+                columns.pub_time[latest].tolist(),
+                columns.probabilities[latest, 2].tolist(),
+            )
+        ]
+
+    def calc_avg_positive_last_n_hours_model_predictions(self, n_hours: int) -> Optional[float]:
+        """Returns average positive score for news from last n hours."""
+        snapshot = self._fresh_columns()
+        datetime_mark = datetime.datetime.now() - datetime.timedelta(hours=n_hours)
+        if snapshot is None or datetime_mark < snapshot[1]:
+            self._count(hit=False)
+            return self.db.calc_avg_positive_last_n_hours_model_predictions(n_hours)
+
+        self._count(hit=True)
+        columns, _ = snapshot
+        n_rows = len(columns.title_id)
+        first = int(np.searchsorted(columns.pub_time, np.datetime64(datetime_mark, "us")))
+        return columns.positive_sum(first, n_rows) / (n_rows - first) if first < n_rows else None
+
+    def calc_avg_per_day_positive_model_predictions(self, start_date: str, end_date: str) -> list:
+        """
+        Returns average per day positive score for news from
+        (start_date <= news_publication_date <= end_date) period.
+        Date format: %yyyy%-%mm%-%dd%.
+        """
+        start, end = parse_date_range(start_date, end_date)
+        snapshot = self._fresh_columns()
+        if snapshot is None or start < snapshot[1]:
+            self._count(hit=False)
+            return self.db.calc_avg_per_day_positive_model_predictions(start_date, end_date)
+
+        self._count(hit=True)
+        columns, _ = snapshot
+        day_starts = np.arange(np.datetime64(start.date()), np.datetime64(end.date()) + 1)
+        bounds = np.searchsorted(columns.pub_time, day_starts.astype("datetime64[us]")).tolist()
+        return [
+            {"pub_date": pub_date, "avg_positive": columns.positive_sum(first, last) / (last - first)}
+            for pub_date, first, last in reversed(list(zip(day_starts[:-1].tolist(), bounds[:-1], bounds[1:])))
+            if last > first
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the window size, coverage and the number of queries answered from memory."""
+        columns, start = self.snapshot or (None, None)
+        return {
+            "rows": len(columns.title_id) if columns is not None else 0,
+            "nbytes": columns.nbytes if columns is not None else 0,
+            "start": start,
+            "last_scored_at": self.last_scored_at,
+            "sources": len(self.sources),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def create_hot_window(
+    params: Dict[str, Any], db: DBConnection, on_stale_reads: Optional[Callable[[], None]] = None
+) -> Optional[HotWindow]:
+    """Create hot window based on the `data_provider.hot_window` config, None if it's disabled."""
+    window_params = dict(params["data_provider"]["hot_window"])
+
+    if not window_params.pop("enabled"):
+        return None
+
+    return HotWindow(db, **window_params, on_stale_reads=on_stale_reads)
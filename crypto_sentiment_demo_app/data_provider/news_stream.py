@@ -0,0 +1,175 @@
+"""Server-sent events stream of newly scored news fanned out from a single database listener."""
+import asyncio
+import datetime
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from crypto_sentiment_demo_app.data_provider.db_connector import DBConnection
+from crypto_sentiment_demo_app.utils import get_logger
+
+logger = get_logger(Path(__file__).name)
+
+
+class Subscription:
+    """Queue of encoded events of a single stream client.
+
+    :param max_queued_events: number of events the client may lag behind before it's disconnected
+    """
+
+    def __init__(self, max_queued_events: int) -> None:
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queued_events)
+        self.lagging = False
+
+
+class PredictionsBroadcaster:
+    """Pushes newly scored news and the rolling sentiment index to every stream subscriber.
+
+    The NOTIFY listener thread calls `notify` whenever the model scorer commits new predictions.
+    Notifications are coalesced and every one of them costs two queries, titles scored after
+    the latest one seen and the rolling index, whatever the number of subscribers. The event is
+    encoded once and put into the queue of every subscriber. A subscriber whose queue is full is
+    dropped once it's drained, so that a slow client can't hold events of the others; browsers
+    reconnect to an event stream by themselves.
+
+    :param db: data provider database connection
+    :param max_titles_per_event: number of latest scored news pushed per event, older ones are skipped
+        and the event is flagged as truncated, so that clients may reload the full feed
+    :param rolling_index_hours: the rolling index is the average positive score of news from that many last hours
+    :param max_queued_events: number of events a subscriber may lag behind before it's disconnected
+    :param max_subscribers: maximum number of open streams
+    :param keepalive_seconds: idle streams get a comment line this often, so that proxies keep them open
+    :param retry_ms: delay before a disconnected client reconnects
+    """
+
+    def __init__(
+        self,
+        db: DBConnection,
+        max_titles_per_event: int,
+        rolling_index_hours: int,
+        max_queued_events: int,
+        max_subscribers: int,
+        keepalive_seconds: float,
+        retry_ms: int,
+    ) -> None:
+        self.db = db
+        self.max_titles_per_event = max_titles_per_event
+        self.rolling_index_hours = rolling_index_hours
+        self.max_queued_events = max_queued_events
+        self.max_subscribers = max_subscribers
+        self.keepalive_seconds = keepalive_seconds
+        self.retry_ms = retry_ms
+
+        self.subscriptions: Set[Subscription] = set()
+        self.last_scored_at: Optional[datetime.datetime] = None
+        self._synced = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        self.events_published = 0
+        self.lagging_disconnects = 0
+
+    async def start(self) -> None:
+        """Start refreshing on notifications, call it on the event loop serving the streams."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Schedule a refresh, safe to call from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.wait()
+            # notifications arriving during the refresh are served by the next one
+            self._wakeup.clear()
+            try:
+                await self.refresh()
+            except Exception as exc:
+                logger.warning(f"Failed to refresh the news stream: {exc}")
+
+    async def refresh(self) -> None:
+        """Publish news scored since the last refresh and the rolling index.
+
+        The first refresh only remembers when the latest news was scored. The listener calls `notify`
+        after every reconnection, so news scored while it wasn't listening are published then.
+        """
+        if not self._synced:
+            self.last_scored_at = await self.db.run(self.db.get_last_scored_at)
+            self._synced = True
+            return
+
+        # one title more than pushed tells whether older ones are skipped
+        titles, self.last_scored_at = await self.db.run(
+            self.db.get_news_scored_after, self.last_scored_at, self.max_titles_per_event + 1
+        )
+        if not titles:
+            return
+        truncated = len(titles) > self.max_titles_per_event
+
+        avg_positive = await self.db.run(
+            self.db.calc_avg_positive_last_n_hours_model_predictions, self.rolling_index_hours
+        )
+        self.publish(
+            "predictions",
+            {
+                "titles": titles[: self.max_titles_per_event],
+                "truncated": truncated,
+                "avg_positive_last_hours": avg_positive,
+                "n_hours": self.rolling_index_hours,
+            },
+        )
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """Encode the event once and queue it for every subscriber."""
+        message = f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+        for subscription in list(self.subscriptions):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscription.lagging = True
+                self.subscriptions.discard(subscription)
+                self.lagging_disconnects += 1
+        self.events_published += 1
+
+    def subscribe(self) -> Optional[Subscription]:
+        """Register a new stream client, None if there are too many of them."""
+        if len(self.subscriptions) >= self.max_subscribers:
+            return None
+
+        subscription = Subscription(self.max_queued_events)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        """Yield the encoded events of a subscriber until it's disconnected or falls behind."""
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            while not (subscription.lagging and subscription.queue.empty()):
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.subscriptions.discard(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of subscribers and published events."""
+        return {
+            "subscribers": len(self.subscriptions),
+            "max_subscribers": self.max_subscribers,
+            "events_published": self.events_published,
+            "lagging_disconnects": self.lagging_disconnects,
+            "last_scored_at": self.last_scored_at,
+        }
@@ -1,6 +1,6 @@
 import datetime
 from enum import Enum
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -20,6 +20,11 @@ class NewsTitles(BaseModel):
     __root__: List[NewsTitle]
 
 
+class NewsFeedPage(BaseModel):
+    items: List[NewsTitle]
+    next_cursor: Optional[str]  # pass it to get the next page, null on the last page
+
+
 class AveragePerDayPositiveScore(BaseModel):
     pub_date: datetime.date
     avg_positive: PositiveScore
@@ -29,7 +34,23 @@ class AveragePerDaysPositiveScore(BaseModel):
     __root__: List[AveragePerDayPositiveScore]
 
 
+class SentimentBucket(BaseModel):
+    bucket_start: datetime.datetime
+    n_scored: int
+    avg_positive: PositiveScore
+    class_distribution: Dict[str, float]  # share of news of every predicted class
+
+
+class SentimentTimeSeries(BaseModel):
+    __root__: List[SentimentBucket]
+
+
 class ClassesMapping(Enum):
     negative = 0
     neutral = 1
     positive = 2
+
+
+class ExportFormat(str, Enum):
+    arrow = "arrow"
+    parquet = "parquet"
@@ -0,0 +1,71 @@
+"""Apply pending SQL migrations from `crypto_sentiment_demo_app/database/migrations` in the order of their names.
+
+Applied migrations are recorded in the `schema_migrations` table, each one runs in its own transaction.
+The base tables are created by `docker_postgres_init.sql` when the database container is initialized.
+
+Run with:
+
+    python -m crypto_sentiment_demo_app.database.migrate
+"""
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Engine
+
+from crypto_sentiment_demo_app.utils import get_db_connection_engine, get_logger
+
+logger = get_logger(Path(__file__).name)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# key of the advisory lock serializing concurrently started migration runners
+MIGRATIONS_LOCK_ID = 8432
+
+
+def apply_migrations(engine: Engine, migrations_dir: Path = MIGRATIONS_DIR) -> List[str]:
+    """Apply migrations that haven't been applied yet.
+
+    :param engine: SQLAlchemy engine of the Postgres database
+    :param migrations_dir: directory with `<version>_<description>.sql` files
+    :return: names of the applied migrations
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+        conn.execute(
+            text(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name VARCHAR(255) PRIMARY KEY,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                )
+                """
+            )
+        )
+
+    applied = []
+    for path in sorted(migrations_dir.glob("*.sql")):
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+            already_applied = conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE name = :name"), {"name": path.stem}
+            ).first()
+            if already_applied:
+                continue
+
+            conn.exec_driver_sql(path.read_text())
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": path.stem})
+
+        logger.info(f"Applied migration {path.stem}")
+        applied.append(path.stem)
+
+    return applied
+
+
+def main():
+    applied = apply_migrations(get_db_connection_engine())
+    logger.info(f"Applied {len(applied)} migrations, the database schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
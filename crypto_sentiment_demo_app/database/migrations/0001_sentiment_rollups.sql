@@ -0,0 +1,33 @@
+-- Hourly and daily sentiment rollups of scored titles by publication time,
+-- kept up to date by the model scorer in the same transaction it writes predictions in.
+CREATE TABLE sentiment_rollup_hourly (
+    bucket_start TIMESTAMP PRIMARY KEY,
+    n_scored INTEGER NOT NULL,
+    positive_sum DOUBLE PRECISION NOT NULL,
+    n_negative INTEGER NOT NULL,
+    n_neutral INTEGER NOT NULL,
+    n_positive INTEGER NOT NULL
+);
+CREATE TABLE sentiment_rollup_daily (LIKE sentiment_rollup_hourly INCLUDING ALL);
+
+INSERT INTO sentiment_rollup_hourly
+SELECT date_trunc('hour', nt.pub_time),
+       COUNT(mp.positive),
+       COALESCE(SUM(mp.positive), 0),
+       COUNT(*) FILTER (WHERE mp.predicted_class = 0),
+       COUNT(*) FILTER (WHERE mp.predicted_class = 1),
+       COUNT(*) FILTER (WHERE mp.predicted_class = 2)
+FROM   news_titles nt
+       JOIN model_predictions mp ON mp.title_id = nt.title_id
+WHERE  nt.pub_time IS NOT NULL
+GROUP  BY 1;
+
+INSERT INTO sentiment_rollup_daily
+SELECT date_trunc('day', bucket_start),
+       SUM(n_scored),
+       SUM(positive_sum),
+       SUM(n_negative),
+       SUM(n_neutral),
+       SUM(n_positive)
+FROM   sentiment_rollup_hourly
+GROUP  BY 1;
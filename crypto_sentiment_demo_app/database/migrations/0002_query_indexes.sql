@@ -0,0 +1,6 @@
+-- Index-backed latest news and publication time range queries of the data provider,
+-- the title_id column keeps the order of titles published at the same time stable.
+CREATE INDEX IF NOT EXISTS news_titles_pub_time_idx ON news_titles (pub_time, title_id);
+
+-- Lookups of titles by predicted class, including the unscored titles the model scorer picks up.
+CREATE INDEX IF NOT EXISTS model_predictions_predicted_class_idx ON model_predictions (predicted_class, title_id);
@@ -0,0 +1,14 @@
+-- 5-minute sentiment rollup of scored titles, coarser time series are merged from it on read.
+CREATE TABLE sentiment_rollup_5min (LIKE sentiment_rollup_hourly INCLUDING ALL);
+
+INSERT INTO sentiment_rollup_5min
+SELECT timezone('UTC', to_timestamp(floor(extract(epoch FROM nt.pub_time) / 300) * 300)),
+       COUNT(mp.positive),
+       COALESCE(SUM(mp.positive), 0),
+       COUNT(*) FILTER (WHERE mp.predicted_class = 0),
+       COUNT(*) FILTER (WHERE mp.predicted_class = 1),
+       COUNT(*) FILTER (WHERE mp.predicted_class = 2)
+FROM   news_titles nt
+       JOIN model_predictions mp ON mp.title_id = nt.title_id
+WHERE  nt.pub_time IS NOT NULL
+GROUP  BY 1;
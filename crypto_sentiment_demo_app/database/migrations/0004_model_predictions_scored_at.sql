@@ -0,0 +1,5 @@
+-- Time the model scorer wrote the predictions of a title, in UTC. The data provider streams
+-- titles scored after the latest one it has seen, titles scored before this migration keep NULL.
+ALTER TABLE model_predictions ADD COLUMN IF NOT EXISTS scored_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS model_predictions_scored_at_idx ON model_predictions (scored_at);
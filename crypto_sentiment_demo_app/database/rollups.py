@@ -0,0 +1,116 @@
+"""5-minute, hourly and daily sentiment rollups of scored titles.
+
+Each rollup table holds, per publication time bucket, the number of scored titles, the sum of their
+positive scores and the number of titles of every predicted class, so that averages and class
+distributions over a range are computed from O(buckets) rows instead of joining O(titles) rows.
+Buckets are aligned to multiples of their size since the Unix epoch, so coarser time series
+are merged from finer buckets on read.
+
+The model scorer refreshes the buckets of the titles it scores in its write transaction.
+Rebuild all rollups from scratch with:
+
+    python -m crypto_sentiment_demo_app.database.rollups
+"""
+from pathlib import Path
+from typing import Dict, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from crypto_sentiment_demo_app.utils import get_db_connection_engine, get_logger
+
+logger = get_logger(Path(__file__).name)
+
+# rollup table -> size of its buckets in seconds, from the finest to the coarsest
+ROLLUP_TABLES: Dict[str, int] = {
+    "sentiment_rollup_5min": 5 * 60,
+    "sentiment_rollup_hourly": 60 * 60,
+    "sentiment_rollup_daily": 24 * 60 * 60,
+}
+
+
+def bucket_start_sql(column: str, bucket_seconds: int) -> str:
+    """SQL expression of the start of the bucket a timestamp column falls into."""
+    return f"timezone('UTC', to_timestamp(floor(extract(epoch FROM {column}) / {bucket_seconds}) * {bucket_seconds}))"
+
+
+AGGREGATES = """
+       COUNT(mp.positive) AS n_scored,
+       COALESCE(SUM(mp.positive), 0) AS positive_sum,
+       COUNT(*) FILTER (WHERE mp.predicted_class = 0) AS n_negative,
+       COUNT(*) FILTER (WHERE mp.predicted_class = 1) AS n_neutral,
+       COUNT(*) FILTER (WHERE mp.predicted_class = 2) AS n_positive
+"""
+
+UPSERT = """
+ON CONFLICT (bucket_start)
+DO UPDATE SET n_scored=excluded.n_scored,
+              positive_sum=excluded.positive_sum,
+              n_negative=excluded.n_negative,
+              n_neutral=excluded.n_neutral,
+              n_positive=excluded.n_positive
+"""
+
+
+def refresh_rollups(conn: Connection, title_ids: Sequence[int]) -> None:
+    """Recompute the rollup buckets the given titles fall into.
+
+    Buckets are recomputed from the base tables rather than incremented, so that re-scored titles
+    aren't counted twice. Call it in the transaction that writes the predictions.
+
+    :param conn: connection with an open transaction
+    :param title_ids: ids of the titles whose predictions were written
+    """
+    for table_name, bucket_seconds in ROLLUP_TABLES.items():
+        query = text(
+            f"""
+            WITH buckets AS (
+                SELECT DISTINCT {bucket_start_sql("pub_time", bucket_seconds)} AS bucket_start
+                FROM   news_titles
+                WHERE  title_id = ANY(:title_ids) AND pub_time IS NOT NULL
+            )
+            INSERT INTO {table_name} (bucket_start, n_scored, positive_sum, n_negative, n_neutral, n_positive)
+            SELECT b.bucket_start, {AGGREGATES}
+            FROM   buckets b
+                   JOIN news_titles nt ON nt.pub_time >= b.bucket_start
+                                      AND nt.pub_time < b.bucket_start + make_interval(secs => {bucket_seconds})
+                   JOIN model_predictions mp ON mp.title_id = nt.title_id
+            GROUP  BY b.bucket_start
+            {UPSERT}
+            """
+        )
+        conn.execute(query, {"title_ids": [int(title_id) for title_id in title_ids]})
+
+
+def rebuild_rollups(conn: Connection) -> None:
+    """Recompute all rollup buckets from the base tables.
+
+    :param conn: connection with an open transaction
+    """
+    for table_name, bucket_seconds in ROLLUP_TABLES.items():
+        conn.execute(text(f"TRUNCATE {table_name}"))
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO {table_name} (bucket_start, n_scored, positive_sum, n_negative, n_neutral, n_positive)
+                SELECT {bucket_start_sql("nt.pub_time", bucket_seconds)} AS bucket_start, {AGGREGATES}
+                FROM   news_titles nt
+                       JOIN model_predictions mp ON mp.title_id = nt.title_id
+                WHERE  nt.pub_time IS NOT NULL
+                GROUP  BY 1
+                """
+            )
+        )
+
+
+def main():
+    engine = get_db_connection_engine()
+
+    with engine.begin() as conn:
+        rebuild_rollups(conn)
+
+    logger.info(f"Rebuilt rollup tables {', '.join(ROLLUP_TABLES)}")
+
+
+if __name__ == "__main__":
+    main()
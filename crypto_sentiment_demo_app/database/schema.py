@@ -0,0 +1,73 @@
+"""Table definitions shared by the crawler, the model scorer and the data provider.
+
+They mirror docker_postgres_init.sql with all migrations applied, so that services build their queries
+without reflecting the tables from the database on startup. Keep them in sync when adding a migration,
+tests/data_provider/test_schema.py compares them with a migrated database.
+"""
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    false,
+)
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+
+metadata = MetaData()
+
+news_titles = Table(
+    "news_titles",
+    metadata,
+    Column("title_id", BigInteger, primary_key=True, autoincrement=False),
+    Column("title", String(511), nullable=False),
+    Column("source", String(255)),
+    Column("pub_time", DateTime),
+    Index("news_titles_pub_time_idx", "pub_time", "title_id"),
+)
+
+model_predictions = Table(
+    "model_predictions",
+    metadata,
+    Column("title_id", BigInteger, primary_key=True, autoincrement=False),
+    Column("negative", DOUBLE_PRECISION),
+    Column("neutral", DOUBLE_PRECISION),
+    Column("positive", DOUBLE_PRECISION),
+    Column("predicted_class", Integer),
+    Column("is_annotating", Boolean, server_default=false()),
+    # naive UTC time the prediction was written at
+    Column("scored_at", DateTime),
+    Index("model_predictions_predicted_class_idx", "predicted_class", "title_id"),
+    Index("model_predictions_scored_at_idx", "scored_at"),
+)
+
+labeled_news_titles = Table(
+    "labeled_news_titles",
+    metadata,
+    Column("title_id", BigInteger, primary_key=True, autoincrement=False),
+    Column("label", Integer),
+    Column("annot_time", DateTime),
+)
+
+
+def _rollup_table(name: str) -> Table:
+    """Sentiment rollup table, see crypto_sentiment_demo_app/database/rollups.py."""
+    return Table(
+        name,
+        metadata,
+        Column("bucket_start", DateTime, primary_key=True),
+        Column("n_scored", Integer, nullable=False),
+        Column("positive_sum", DOUBLE_PRECISION, nullable=False),
+        Column("n_negative", Integer, nullable=False),
+        Column("n_neutral", Integer, nullable=False),
+        Column("n_positive", Integer, nullable=False),
+    )
+
+
+sentiment_rollup_5min = _rollup_table("sentiment_rollup_5min")
+sentiment_rollup_hourly = _rollup_table("sentiment_rollup_hourly")
+sentiment_rollup_daily = _rollup_table("sentiment_rollup_daily")
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 import click
 import pandas as pd
@@ -8,7 +9,6 @@ from sqlalchemy.exc import ProgrammingError
 
 from crypto_sentiment_demo_app.utils import get_db_connection_engine, get_logger
 
-engine = get_db_connection_engine()
 logger = get_logger(Path(__file__).name)
 
 
@@ -16,16 +16,20 @@ logger = get_logger(Path(__file__).name)
 @click.option("--path_to_csv", help="Path to a CSV file to write to a database.")
 @click.option("--table_name", help="Table name to write data into.")
 @click.option("--index_col_name", default="title_id", help="Index column name")
-def write_df_to_db(path_to_csv: str, table_name: str, engine: Engine = engine, index_col_name: str = "title_id"):
+def write_df_to_db(
+    path_to_csv: str, table_name: str, engine: Optional[Engine] = None, index_col_name: str = "title_id"
+):
     """
     Writes scraped content into a table.
     This is a naive implementation: columns in the CSV file must match table columns in `table_name` exactly.
 
     :param path_to_csv: Path to a CSV file to write to a database
     :param table_name: table name to write data into
-    :param engine: connection engine object
+    :param engine: connection engine object, the project database by default
     :return: None
     """
+    if engine is None:
+        engine = get_db_connection_engine()
 
     # pandas `to_sql` doesn't yet support updating records ("upsert")
     # https://github.com/pandas-dev/pandas/issues/15988
@@ -0,0 +1,91 @@
+"""Admin endpoints managing hosted models."""
+import os
+import secrets
+from typing import Any, Dict, Optional, Union
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import BaseModel, confloat
+
+from .manager import ModelManager
+
+
+class LoadModelRequest(BaseModel):
+    model: str
+    version: Union[str, int] = "latest"
+
+
+class PrimaryModelRequest(BaseModel):
+    key: str
+
+
+class ShadowModelRequest(BaseModel):
+    key: Optional[str] = None
+    fraction: confloat(ge=0.0, le=1.0) = 0.1  # type: ignore
+
+
+def check_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Require the X-Admin-Token header to match ADMIN_TOKEN environment variable, disabled if it's unset."""
+    admin_token = os.environ.get("ADMIN_TOKEN")
+
+    if not admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled, ADMIN_TOKEN is not set"
+        )
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+def create_admin_router(manager: ModelManager) -> APIRouter:
+    """Create router with endpoints to load, swap, shadow and unload models hosted by the manager."""
+    router = APIRouter(prefix="/admin", dependencies=[Depends(check_admin_token)])
+
+    @router.get("/models")
+    def get_models() -> Dict[str, Any]:
+        """Get hosted models with their states, timings and memory, and the primary/shadow routing."""
+        return manager.status()
+
+    @router.post("/models", status_code=status.HTTP_202_ACCEPTED)
+    def load_model(request: LoadModelRequest) -> Dict[str, Any]:
+        """Start loading a model in background next to the hosted ones."""
+        try:
+            return manager.load(request.model, request.version).status()
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    @router.delete("/models/{key}")
+    def unload_model(key: str) -> Dict[str, Any]:
+        """Stop hosting a model."""
+        try:
+            manager.unload(key)
+        except KeyError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Model {key} is not hosted")
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+        return manager.status()
+
+    @router.post("/primary")
+    def set_primary_model(request: PrimaryModelRequest) -> Dict[str, Any]:
+        """Atomically route all new requests to another hosted and ready model."""
+        try:
+            manager.set_primary(request.key)
+        except KeyError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Model {request.key} is not hosted")
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+        return manager.status()
+
+    @router.post("/shadow")
+    def set_shadow_model(request: ShadowModelRequest) -> Dict[str, Any]:
+        """Re-score a fraction of traffic with a hosted model, pass a null key to disable shadow scoring."""
+        try:
+            manager.set_shadow(request.key, request.fraction)
+        except KeyError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Model {request.key} is not hosted")
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+        return manager.status()
+
+    return router
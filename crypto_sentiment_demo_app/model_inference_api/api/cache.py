@@ -0,0 +1,161 @@
+"""In-process prediction cache for the model inference API."""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from crypto_sentiment_demo_app.models.inference import IModelInference
+
+
+class PredictionCache:
+    """LRU cache of model predictions with TTL expiration and a memory bound.
+
+    Keys are hashes of the exact input text together with the model name and version,
+    so predictions of different models never mix. Binding a new model version drops all
+    entries computed by the previous one. Texts aren't normalized, since any transform the models
+    don't apply themselves could map titles scored differently to the same entry.
+
+    :param max_entries: maximum number of cached predictions
+    :param max_memory_mb: approximate memory bound for cached keys and values, in megabytes
+    :param ttl_seconds: time-to-live of a cached prediction, in seconds
+    """
+
+    def __init__(self, max_entries: int, max_memory_mb: float, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_key: Optional[Tuple[str, str]] = None
+        self._current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, text: str, model_name: str, model_version: str) -> str:
+        """Hash the text together with the model name and version, lone surrogates of malformed JSON included."""
+        payload = "\x00".join((model_name, model_version, text))
+        return hashlib.blake2b(payload.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+    def bind_model(self, model_name: str, model_version: str) -> None:
+        """Drop all cached predictions if the model differs from the one the cache was filled with."""
+        model_key = (model_name, model_version)
+        with self._lock:
+            if self._model_key == model_key:
+                return
+            if self._model_key is not None:
+                self.invalidations += 1
+            self._model_key = model_key
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached prediction or None if it's missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, value = entry
+            if expires_at < now:
+                del self._entries[key]
+                self._current_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a prediction evicting least recently used ones if the cache is full."""
+        size = self._estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._current_bytes -= old_entry[1]
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._current_bytes += size
+
+            while len(self._entries) > self.max_entries or self._current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached predictions."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_name": self._model_key[0] if self._model_key else None,
+                "model_version": self._model_key[1] if self._model_key else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_bytes": self._current_bytes,
+                "max_memory_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    @staticmethod
+    def _estimate_size(key: str, value: Dict[str, Any]) -> int:
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        for item_key, item_value in value.items():
+            size += sys.getsizeof(item_key) + sys.getsizeof(item_value)
+        return size
+
+
+def predict_with_cache(model: IModelInference, cache: Optional[PredictionCache], texts: List[str]) -> List[Dict]:
+    """Predict a batch of texts running the model only on the texts missing in the cache.
+
+    :param model: loaded inference model
+    :param cache: prediction cache, if None the model is called directly
+    :param texts: input texts
+    :return: list of predictions in the same order as the input texts
+    """
+    if cache is None:
+        return model.predict_batch(texts)
+
+    cache.bind_model(model.model_name, model.model_version)
+
+    keys = [cache.make_key(text, model.model_name, model.model_version) for text in texts]
+    predictions: List[Optional[Dict]] = [cache.get(key) for key in keys]
+
+    # duplicated texts within the batch are scored once
+    missing: Dict[str, str] = {}
+    for key, text, prediction in zip(keys, texts, predictions):
+        if prediction is None and key not in missing:
+            missing[key] = text
+
+    if missing:
+        computed = dict(zip(missing.keys(), model.predict_batch(list(missing.values()))))
+        for key, prediction in computed.items():
+            cache.put(key, prediction)
+        predictions = [
+            prediction if prediction is not None else computed[key] for key, prediction in zip(keys, predictions)
+        ]
+
+    return [dict(prediction) for prediction in predictions]
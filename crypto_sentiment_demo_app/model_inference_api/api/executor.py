@@ -0,0 +1,156 @@
+"""Dedicated inference executor with bounded admission."""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the admission queue of the inference executor is full."""
+
+
+class InferenceQueueTimeout(Exception):
+    """Raised when a request waited in the queue longer than allowed and was dropped without running."""
+
+
+class InferenceExecutor:
+    """Runs model inference on a fixed number of worker threads with a bounded queue in front of them.
+
+    Requests above `max_workers + max_queue_size` in flight are rejected right away instead of
+    piling up, and requests that waited in the queue longer than `queue_timeout_seconds`
+    are dropped before running, since their clients have most likely given up.
+
+    :param max_workers: number of threads running inference, keep it small so that
+        they don't compete with onnxruntime intra-op threads
+    :param max_queue_size: number of requests allowed to wait for a free worker
+    :param queue_timeout_seconds: maximum time a request may wait for a worker
+    :param retry_after_seconds: Retry-After value suggested to rejected clients
+    :param stats_window: number of latest requests wait time percentiles are computed over
+    :param wait_observer: function called with the queue wait time of every request
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_size: int,
+        queue_timeout_seconds: float,
+        retry_after_seconds: int = 1,
+        stats_window: int = 1000,
+        wait_observer: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.wait_observer = wait_observer
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._wait_seconds: Deque[float] = deque(maxlen=stats_window)
+
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.failed = 0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue_size:
+                self.rejected += 1
+                raise InferenceQueueFull(f"{self._in_flight} inference requests in flight")
+            self._in_flight += 1
+
+    def _run(self, func: Callable[..., T], submitted_at: float, *args: Any) -> T:
+        wait_seconds = time.perf_counter() - submitted_at
+        if self.wait_observer is not None:
+            self.wait_observer(wait_seconds)
+
+        with self._lock:
+            self._wait_seconds.append(wait_seconds)
+            if wait_seconds > self.queue_timeout_seconds:
+                self.timed_out += 1
+                raise InferenceQueueTimeout(f"Request waited {wait_seconds:.2f} s for an inference worker")
+            self._running += 1
+
+        try:
+            result = func(*args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+
+        with self._lock:
+            self.completed += 1
+
+        return result
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run `func(*args)` on an inference worker without blocking the event loop.
+
+        :raises InferenceQueueFull: if the queue is full, the request is rejected right away
+        :raises InferenceQueueTimeout: if the request waited for a worker for too long
+        :return: result of the function
+        """
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def submit(self, func: Callable[..., T], *args: Any) -> "Future[T]":
+        """Queue `func(*args)` for an inference worker, for callers that don't await the result.
+
+        :raises InferenceQueueFull: if the queue is full, the request is rejected right away
+        :return: future of the result, failing with InferenceQueueTimeout if it waited for a worker for too long
+        """
+        self._admit()
+
+        try:
+            future = self._executor.submit(self._run, func, time.perf_counter(), *args)
+        except BaseException:
+            self._release()
+            raise
+
+        # released once the work is done rather than when the caller stops waiting, since a cancelled
+        # request keeps its worker busy or stays queued, and admission must count it until then
+        future.add_done_callback(self._release)
+
+        return future
+
+    def _release(self, future: Optional["Future[Any]"] = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait time percentiles over the latest requests and counters."""
+        with self._lock:
+            wait_seconds = np.asarray(self._wait_seconds)
+            in_flight, running = self._in_flight, self._running
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": in_flight,
+            "running": running,
+            "queue_depth": in_flight - running,
+            "wait_seconds": {
+                "mean": float(wait_seconds.mean()) if wait_seconds.size else 0.0,
+                "p50": float(np.percentile(wait_seconds, 50)) if wait_seconds.size else 0.0,
+                "p95": float(np.percentile(wait_seconds, 95)) if wait_seconds.size else 0.0,
+                "max": float(wait_seconds.max()) if wait_seconds.size else 0.0,
+            },
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
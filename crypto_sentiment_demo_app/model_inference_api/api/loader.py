@@ -0,0 +1,136 @@
+"""Background model loading with readiness tracking."""
+import threading
+import time
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from crypto_sentiment_demo_app.models.inference import (
+    IModelInference,
+    InferenceRegistry,
+)
+from crypto_sentiment_demo_app.utils import get_logger, get_rss_bytes
+
+logger = get_logger(Path(__file__).name)
+
+
+def load_model(params: Dict[str, Any]) -> IModelInference:
+    """Load model from models registry based on the passed params.
+
+    :param params: config
+    :return: model with ModelEngine interface
+    """
+    model_params = deepcopy(params)
+    model_choice = model_params["hydra"]["runtime"]["choices"]["model"]
+    del model_params["hydra"]
+
+    model = InferenceRegistry.get_model(model_choice, model_params)
+
+    return model
+
+
+class ModelLoader:
+    """Loads and warms up a model in a background thread.
+
+    The loader goes through the "pending" -> "loading" -> "warming" -> "ready" states,
+    or ends up in the "failed" state if loading raises.
+
+    Memory taken by the model is estimated as the process RSS growth while loading it,
+    which is approximate if several models are loaded at the same time.
+
+    :param params: config composed with hydra runtime choices
+    :param key: name the model is hosted under, defaults to the model choice
+    :param phase_observer: function the loaded model reports its inference phase durations to
+    """
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        key: Optional[str] = None,
+        phase_observer: Optional[Callable[[str, str, float], None]] = None,
+    ) -> None:
+        self.params = params
+        self.phase_observer = phase_observer
+        self.model_choice: str = params["hydra"]["runtime"]["choices"]["model"]
+        self.key = key or self.model_choice
+
+        self.state = "pending"
+        self.model: Optional[IModelInference] = None
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.rss_delta_bytes: Optional[int] = None
+
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        """Start loading the model in a daemon thread, does nothing if it was already started."""
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self.load, name=f"model-loader-{self.key}", daemon=True)
+        self._thread.start()
+
+    def load(self) -> None:
+        """Load and warm up the model, blocks until it's done."""
+        self._started_at = time.time()
+        t0 = time.perf_counter()
+        rss_before = get_rss_bytes()
+
+        try:
+            self.state = "loading"
+            model = load_model(self.params)
+            self.timings["load_seconds"] = time.perf_counter() - t0
+
+            # warmup runs are not reported
+            model.phase_observer = None
+
+            self.state = "warming"
+            t1 = time.perf_counter()
+            model.warmup()
+            self.timings["warmup_seconds"] = time.perf_counter() - t1
+
+            self.rss_delta_bytes = get_rss_bytes() - rss_before
+            model.phase_observer = self.phase_observer
+            self.model = model
+            self.state = "ready"
+            self.timings["total_seconds"] = time.perf_counter() - t0
+
+            logger.info(f"Model '{self.key}' is ready in {self.timings['total_seconds']:.1f} s")
+
+        except Exception as exc:
+            self.error = repr(exc)
+            self.state = "failed"
+            logger.exception(f"Failed to load model '{self.key}'")
+
+        finally:
+            self._finished_at = time.time()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for background loading to finish."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Return loading state with timings."""
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = (self._finished_at or time.time()) - self._started_at
+
+        return {
+            "key": self.key,
+            "state": self.state,
+            "model": self.model_choice,
+            "model_name": self.model.model_name if self.model else None,
+            "model_version": self.model.model_version if self.model else None,
+            "started_at": self._started_at,
+            "elapsed_seconds": elapsed,
+            "timings": dict(self.timings),
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "error": self.error,
+        }
@@ -0,0 +1,268 @@
+"""Hosting of several models with hot swap of the primary one and shadow scoring."""
+import functools
+import random
+import re
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, cast
+
+import numpy as np
+
+from crypto_sentiment_demo_app.models.inference import (
+    IModelInference,
+    InferenceRegistry,
+)
+from crypto_sentiment_demo_app.utils import get_logger, load_config_params
+
+from .executor import InferenceExecutor, InferenceQueueFull, InferenceQueueTimeout
+from .loader import ModelLoader
+
+logger = get_logger(Path(__file__).name)
+
+# MLflow registry versions a model can be loaded with, they end up in hydra overrides and cache paths
+MODEL_VERSION_PATTERN = re.compile(r"latest|[1-9][0-9]*")
+
+
+def get_model_key(model_choice: str, model_version: Any) -> str:
+    """Name a hosted model by its config choice and requested version, e.g. "bert:latest"."""
+    return f"{model_choice}:{model_version}"
+
+
+class ShadowStats:
+    """Counters of the primary vs shadow model comparison."""
+
+    def __init__(self) -> None:
+        self.compared = 0
+        self.disagreed = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "compared": self.compared,
+            "disagreed": self.disagreed,
+            "disagreement_rate": self.disagreed / self.compared if self.compared else 0.0,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+
+class ModelManager:
+    """Hosts several models side by side and routes traffic to the primary one.
+
+    The primary model is swapped atomically: requests in flight finish with the model they started with.
+    A fraction of traffic can be re-scored by a shadow model on the inference executor, taking at most
+    `shadow_queue_size` of its slots and skipped when it's full, so that shadow scoring never rejects
+    requests nor competes with them for threads outside of the executor. The disagreement of predicted
+    classes with the primary model is logged and counted.
+
+    :param params: config composed with hydra runtime choices, defines the initial primary model
+    :param executor: inference executor running the shadow scoring
+    :param overrides: hydra overrides the config was composed with, applied to models loaded later too
+    :param phase_observer: function hosted models report their inference phase durations to
+    """
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        executor: InferenceExecutor,
+        overrides: Optional[List[str]] = None,
+        phase_observer: Optional[Callable[[str, str, float], None]] = None,
+    ) -> None:
+        self.params = params
+        self.executor = executor
+        self.overrides = overrides or []
+        self.phase_observer = phase_observer
+        self.class_names: List[str] = params["data"]["class_names"]
+        self.hosting_cfg: Dict[str, Any] = params["inference_api"]["hosting"]
+
+        self._lock = threading.Lock()
+        self._loaders: Dict[str, ModelLoader] = {}
+
+        primary_key = get_model_key(params["hydra"]["runtime"]["choices"]["model"], params["model"]["version"])
+        self._loaders[primary_key] = ModelLoader(params, key=primary_key, phase_observer=phase_observer)
+        self._primary_key = primary_key
+
+        self._shadow_key: Optional[str] = None
+        self._shadow_fraction = 0.0
+        self.shadow_stats = ShadowStats()
+        self._shadow_pending = 0
+        self._shadow_lock = threading.Lock()
+
+    @property
+    def primary(self) -> ModelLoader:
+        return self._loaders[self._primary_key]
+
+    def start(self) -> None:
+        """Start loading the primary model and the preloaded ones."""
+        self.primary.start()
+
+        for model_cfg in self.hosting_cfg["preload_models"]:
+            self.load(model_cfg["model"], model_cfg["version"])
+
+    def load(self, model_choice: str, model_version: Any = "latest") -> ModelLoader:
+        """Start loading a model in background next to the already hosted ones.
+
+        :param model_choice: model config name, one of the InferenceRegistry models
+        :param model_version: MLflow registry version, "latest" or a version number
+        :raises ValueError: if the model or the version is unknown
+        :return: loader tracking the model state
+        """
+        if model_choice not in InferenceRegistry.registry:
+            raise ValueError(f"Unknown model {model_choice!r}, available: {sorted(InferenceRegistry.registry)}")
+        if not MODEL_VERSION_PATTERN.fullmatch(str(model_version)):
+            raise ValueError(f"Invalid model version {model_version!r}, expected 'latest' or a version number")
+
+        key = get_model_key(model_choice, model_version)
+
+        with self._lock:
+            if key in self._loaders and self._loaders[key].state != "failed":
+                return self._loaders[key]
+
+            # later overrides win, so the model ones replace those of the process config
+            overrides = [*self.overrides, f"model={model_choice}", f"model.version={model_version}"]
+            params = load_config_params(return_hydra_config=True, overrides=overrides)
+            loader = ModelLoader(params, key=key, phase_observer=self.phase_observer)
+            self._loaders[key] = loader
+
+        loader.start()
+        return loader
+
+    def unload(self, key: str) -> None:
+        """Stop hosting a model.
+
+        :raises KeyError: if the model is not hosted
+        :raises ValueError: if the model is the primary one
+        """
+        with self._lock:
+            if key not in self._loaders:
+                raise KeyError(key)
+            if key == self._primary_key:
+                raise ValueError(f"Model {key} is the primary one, swap it first")
+            if key == self._shadow_key:
+                self._shadow_key = None
+            del self._loaders[key]
+
+    def set_primary(self, key: str) -> None:
+        """Atomically route all new requests to another hosted model.
+
+        :raises KeyError: if the model is not hosted
+        :raises ValueError: if the model is not ready yet
+        """
+        with self._lock:
+            if key not in self._loaders:
+                raise KeyError(key)
+            if not self._loaders[key].is_ready:
+                raise ValueError(f"Model {key} is not ready, current state: {self._loaders[key].state}")
+
+            previous_key, self._primary_key = self._primary_key, key
+            if self._shadow_key == key:
+                self._shadow_key = None
+
+        logger.info(f"Primary model swapped from {previous_key} to {key}")
+
+    def set_shadow(self, key: Optional[str], fraction: float = 0.0) -> None:
+        """Re-score a fraction of traffic with another hosted model, pass None to disable shadow scoring.
+
+        :raises KeyError: if the model is not hosted
+        :raises ValueError: if the model is the primary one
+        """
+        with self._lock:
+            if key is not None and key not in self._loaders:
+                raise KeyError(key)
+            if key is not None and key == self._primary_key:
+                raise ValueError(f"Model {key} is the primary one")
+
+            self._shadow_key = key
+            self._shadow_fraction = fraction if key is not None else 0.0
+            self.shadow_stats = ShadowStats()
+
+    def maybe_shadow_score(
+        self, texts: List[str], primary_predictions: List[Dict[str, Any]], primary_key: str
+    ) -> None:
+        """Submit a sample of requests for shadow scoring, doesn't block the caller.
+
+        :param texts: texts of the request
+        :param primary_predictions: predictions the request was served with
+        :param primary_key: key of the model that served the request, captured when it was dispatched,
+            since the primary model may have been swapped since
+        """
+        shadow_key, fraction = self._shadow_key, self._shadow_fraction
+        if shadow_key is None or random.random() >= fraction:
+            return
+
+        loader = self._loaders.get(shadow_key)
+        if loader is None or not loader.is_ready:
+            return
+
+        stats = self.shadow_stats
+        with self._shadow_lock:
+            if self._shadow_pending >= self.hosting_cfg["shadow_queue_size"]:
+                stats.skipped += 1
+                return
+            self._shadow_pending += 1
+
+        # copied, since the caller goes on adding fields to the predictions it responds with
+        primary_predictions = [dict(prediction) for prediction in primary_predictions]
+        try:
+            future = self.executor.submit(cast(IModelInference, loader.model).predict_batch, texts)
+        except InferenceQueueFull:
+            with self._shadow_lock:
+                self._shadow_pending -= 1
+                stats.skipped += 1
+            return
+
+        future.add_done_callback(
+            functools.partial(self._compare_shadow_predictions, stats, loader.key, primary_predictions, primary_key)
+        )
+
+    def _compare_shadow_predictions(
+        self,
+        stats: ShadowStats,
+        shadow_key: str,
+        primary_predictions: List[Dict[str, Any]],
+        primary_key: str,
+        future: "Future[List[Dict[str, Any]]]",
+    ) -> None:
+        """Count and log the disagreement once the shadow predictions are computed, on the inference worker."""
+        try:
+            shadow_classes = self._predicted_classes(future.result())
+            disagreed = int((self._predicted_classes(primary_predictions) != shadow_classes).sum())
+
+            with self._shadow_lock:
+                stats.compared += len(primary_predictions)
+                stats.disagreed += disagreed
+                disagreement_rate = stats.disagreed / stats.compared
+
+            if disagreed:
+                logger.info(
+                    f"Shadow model {shadow_key} disagreed with {primary_key} "
+                    f"on {disagreed}/{len(primary_predictions)} titles, "
+                    f"disagreement rate so far: {disagreement_rate:.3f}"
+                )
+        except InferenceQueueTimeout:
+            with self._shadow_lock:
+                stats.skipped += 1
+        except Exception:
+            with self._shadow_lock:
+                stats.failed += 1
+            logger.exception(f"Shadow scoring with {shadow_key} failed")
+        finally:
+            with self._shadow_lock:
+                self._shadow_pending -= 1
+
+    def _predicted_classes(self, predictions: List[Dict[str, Any]]) -> np.ndarray:
+        probs = np.asarray([[float(pred[name]) for name in self.class_names] for pred in predictions])
+        return probs.argmax(axis=1)
+
+    def status(self) -> Dict[str, Any]:
+        """Return hosted models with their states and memory, primary and shadow routing."""
+        loaders = list(self._loaders.values())
+
+        return {
+            "primary": self._primary_key,
+            "shadow": {"model": self._shadow_key, "fraction": self._shadow_fraction, **self.shadow_stats.as_dict()},
+            "models": [loader.status() for loader in loaders],
+            "total_rss_delta_bytes": sum(loader.rss_delta_bytes or 0 for loader in loaders),
+        }
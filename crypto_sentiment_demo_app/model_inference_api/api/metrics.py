@@ -0,0 +1,152 @@
+"""Prometheus metrics of the model inference API.
+
+In the pre-forked serving mode, set the PROMETHEUS_MULTIPROC_DIR environment variable
+to an empty directory, so that /metrics aggregates the metrics of all workers.
+"""
+import os
+import time
+from typing import Any, Callable, Collection, Dict, List, Tuple
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# latencies from 100 us to 10 s
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+INFERENCE_PHASE_SECONDS = Histogram(
+    "inference_phase_seconds",
+    "Duration of request processing phases: validation, queue_wait, tokenization, session_run, "
+    "postprocessing and serialization",
+    ["model", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "inference_request_seconds", "End-to-end duration of inference requests", ["endpoint"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_TOTAL = Counter("inference_requests", "Number of inference requests", ["endpoint", "status_code"])
+BATCH_SIZE = Histogram(
+    "inference_batch_size", "Number of titles per request", ["endpoint"], buckets=BATCH_SIZE_BUCKETS
+)
+
+# gauges of the pre-forked mode with the stats function and field they're set from, see `register_gauges`
+MULTIPROCESS_GAUGES: List[Tuple[Gauge, Callable[[], Dict[str, Any]], str]] = []
+
+
+def observe_phase(model_name: str, phase: str, seconds: float) -> None:
+    """Record duration of a request processing phase."""
+    INFERENCE_PHASE_SECONDS.labels(model_name, phase).observe(seconds)
+
+
+def observe_request(endpoint: str, status_code: int, seconds: float) -> None:
+    """Record an inference request with its status code and duration."""
+    REQUESTS_TOTAL.labels(endpoint, str(status_code)).inc()
+    REQUEST_SECONDS.labels(endpoint).observe(seconds)
+
+
+def observe_batch_size(endpoint: str, batch_size: int) -> None:
+    """Record number of titles in a request."""
+    BATCH_SIZE.labels(endpoint).observe(batch_size)
+
+
+def register_gauges(name_prefix: str, get_stats: Callable[[], Dict[str, Any]], **descriptions: str) -> None:
+    """Expose numeric fields of a stats dictionary as gauges.
+
+    In a single process the gauges are computed at scrape time. With PROMETHEUS_MULTIPROC_DIR set,
+    only values written to the metric files are aggregated, so every worker sets its gauges explicitly
+    in `refresh_gauges`, after each tracked request and on scrapes, and /metrics sums the values of live workers.
+
+    :param name_prefix: prefix of the gauge names
+    :param get_stats: function returning the stats, e.g. `InferenceExecutor.stats`
+    :param descriptions: stats fields to expose with their descriptions
+    """
+    for field, description in descriptions.items():
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            gauge = Gauge(f"{name_prefix}_{field}", description, multiprocess_mode="livesum")
+            MULTIPROCESS_GAUGES.append((gauge, get_stats, field))
+        else:
+            Gauge(f"{name_prefix}_{field}", description).set_function(lambda field=field: get_stats()[field])
+
+
+def refresh_gauges() -> None:
+    """Set the gauges of the pre-forked mode to the current stats of this worker."""
+    stats: Dict[int, Dict[str, Any]] = {}
+    for gauge, get_stats, field in MULTIPROCESS_GAUGES:
+        if id(get_stats) not in stats:
+            stats[id(get_stats)] = get_stats()
+        gauge.set(stats[id(get_stats)][field])
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware counting requests to the given endpoints and timing them.
+
+    The receipt time is saved to `request.state.received_at`, so that handlers can measure
+    how long request parsing and validation took. A plain ASGI middleware is used instead of
+    the `@app.middleware` decorator, as the latter adds noticeable per-request overhead.
+
+    :param app: ASGI app
+    :param endpoints: paths of the endpoints to track
+    """
+
+    def __init__(self, app, endpoints: Collection[str]) -> None:
+        self.app = app
+        self.endpoints = set(endpoints)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.endpoints:
+            await self.app(scope, receive, send)
+            return
+
+        received_at = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = received_at
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            observe_request(scope["path"], status_code, time.perf_counter() - received_at)
+            refresh_gauges()
+
+
+def metrics_response() -> Response:
+    """Render all metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        refresh_gauges()
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,45 +1,104 @@
+import asyncio
+import json
 import os
+import tempfile
 from copy import deepcopy
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict
+from time import perf_counter
+from typing import IO, Any, AsyncIterator, Callable, Dict, List, Optional, TypeVar, cast
 
-from fastapi import FastAPI, HTTPException, status
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 
-from crypto_sentiment_demo_app.models.inference import (
-    IModelInference,
-    InferenceRegistry,
-)
+from crypto_sentiment_demo_app.models.inference import IModelInference
 from crypto_sentiment_demo_app.utils import get_logger, load_config_params
 
-from .news import News
+from .admin import create_admin_router
+from .cache import PredictionCache, predict_with_cache
+from .executor import InferenceExecutor, InferenceQueueFull, InferenceQueueTimeout
+from .loader import ModelLoader
+from .manager import ModelManager
+from .metrics import (
+    RequestMetricsMiddleware,
+    metrics_response,
+    observe_batch_size,
+    observe_phase,
+    register_gauges,
+)
+from .news import News, NewsBatch, create_prediction_schema
 
 logger = get_logger(Path(__file__).name)
 
+T = TypeVar("T")
+
 host = os.environ.get("HOST")
 
 if host is None:
     raise ValueError("Environment variable HOST should be defined!")
 
 
-def load_model(params: Dict[str, Any]) -> IModelInference:
-    """Load model from models registry based on the passed params.
+def create_prediction_cache(params: Dict[str, Any]) -> Optional[PredictionCache]:
+    """Create prediction cache based on the passed params.
 
     :param params: config
-    :return: model with ModelEngine interface
+    :return: prediction cache or None if it's disabled
     """
-    model_params = deepcopy(params)
-    model_choice = model_params["hydra"]["runtime"]["choices"]["model"]
-    del model_params["hydra"]
+    cache_params = deepcopy(params["inference_api"]["prediction_cache"])
+
+    if not cache_params.pop("enabled"):
+        return None
 
-    model = InferenceRegistry.get_model(model_choice, model_params)
+    return PredictionCache(**cache_params)
 
-    return model
 
+def format_predictions(
+    predictions: List[Dict[str, float]], class_names: List[str], model_version: str
+) -> List[Dict[str, Any]]:
+    """Add the predicted class index and the model version to predicted probabilities.
+
+    :param predictions: dictionaries mapping class names to predicted probabilities
+    :param class_names: class names in the order of the model outputs
+    :param model_version: version of the model the predictions were computed with
+    :return: predictions extended in place with "predicted_class" and "model_version" fields
+    """
+    class_indices = range(len(class_names))
+
+    for prediction in predictions:
+        prediction["predicted_class"] = max(class_indices, key=lambda i: prediction[class_names[i]])
+        prediction["model_version"] = model_version
 
-params = load_config_params(return_hydra_config=True)
+    return predictions
+
+
+# space-separated hydra overrides, e.g. CONFIG_OVERRIDES="model=tf_idf inference_api.prediction_cache.enabled=False"
+config_overrides = os.environ.get("CONFIG_OVERRIDES", "").split()
+params = load_config_params(return_hydra_config=True, overrides=config_overrides)
+
+# inference runs on its own small threadpool instead of the Starlette one used by sync handlers
+inference_executor = InferenceExecutor(
+    **params["inference_api"]["executor"],
+    wait_observer=lambda seconds: observe_phase(model_manager.primary.params["model"]["name"], "queue_wait", seconds),
+)
+
+# models are loaded in background on startup, so that the server accepts connections right away
+model_manager = ModelManager(
+    params, executor=inference_executor, overrides=config_overrides, phase_observer=observe_phase
+)
 
-model: IModelInference = load_model(params)
+prediction_cache: Optional[PredictionCache] = create_prediction_cache(params)
+
+# response schemas are built once and used for docs only, responses are serialized with orjson without validation
+Prediction = create_prediction_schema(params["data"]["class_names"])
+register_gauges(
+    "inference_executor",
+    inference_executor.stats,
+    in_flight="Inference requests admitted to the executor",
+    queue_depth="Inference requests waiting for a worker",
+)
 
 app = FastAPI()
 
@@ -59,36 +118,118 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(RequestMetricsMiddleware, endpoints=["/classify", "/classify_batch", "/classify_stream"])
+
+app.include_router(create_admin_router(model_manager))
+
+
+@app.on_event("startup")
+def start_model_loading():
+    model_manager.start()
+
+
+@app.on_event("shutdown")
+def stop_inference_executor():
+    inference_executor.shutdown()
+
+
+def get_model_loader() -> ModelLoader:
+    """Return the loader of the primary model or respond with 503 while it's not ready."""
+    model_loader = model_manager.primary
+
+    if not model_loader.is_ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model is not ready, current state: {model_loader.state}",
+            headers={"Retry-After": "5"},
+        )
 
-@app.get("/health", status_code=status.HTTP_200_OK)
-def is_model_loaded() -> bool:
-    """Check whether model was loaded.
+    return model_loader
+
+
+def get_model() -> IModelInference:
+    """Return the primary model or respond with 503 while it's not ready."""
+    return cast(IModelInference, get_model_loader().model)
+
+
+async def run_inference(func: Callable[..., T], *args: Any) -> T:
+    """Run inference on the dedicated executor, respond with 429/503 if it's overloaded."""
+    retry_after = {"Retry-After": str(inference_executor.retry_after_seconds)}
+
+    try:
+        return await inference_executor.run(func, *args)
+    except InferenceQueueFull as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers=retry_after)
+    except InferenceQueueTimeout as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc), headers=retry_after)
+
+
+def observe_validation(request: Request, model: IModelInference) -> None:
+    """Record time from the request receipt to the handler call, spent on body parsing and validation."""
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is not None:
+        observe_phase(model.model_name, "validation", perf_counter() - received_at)
+
+
+def serialize_response(content: Any, model: IModelInference) -> ORJSONResponse:
+    """Serialize the response with orjson and record the serialization time."""
+    t0 = perf_counter()
+    response = ORJSONResponse(content)
+    observe_phase(model.model_name, "serialization", perf_counter() - t0)
+
+    return response
+
+
+@app.get("/health/live", status_code=status.HTTP_200_OK)
+def is_alive() -> Dict[str, str]:
+    """Liveness probe: the server process is up and handles requests."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def is_ready() -> JSONResponse:
+    """Readiness probe: the primary model is loaded and warmed up.
+
+    :return: loading state with timings, with the 503 status code until the model is ready
+    """
+    model_loader = model_manager.primary
+    status_code = status.HTTP_200_OK if model_loader.is_ready else status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return JSONResponse(content=model_loader.status(), status_code=status_code)
+
+
+@app.get("/health")
+def is_model_loaded() -> JSONResponse:
+    """Check whether model was loaded and warmed up.
 
     Need this to force other services wait until model will be loaded.
     """
-    return model is not None
+    return is_ready()
 
 
 @app.get("/")
 def get_classifier_details() -> Dict[str, Any]:
-    """Gets classifier's name and model version by reading it from the config file.
+    """Gets primary classifier's name and model version.
 
     :return: Classifier's name and model version
     """
-    logger.info(f"model_params: {params.keys()}")
+    model_loader = model_manager.primary
+    model_params = model_loader.params["model"]
+
     return {
-        "name": params["model"]["name"],
-        "model_version": params["model"]["version"],
+        "name": model_params["name"],
+        "model_version": model_loader.model.model_version if model_loader.model else model_params["version"],
     }
 
 
-@app.post("/classify", status_code=200)
-def classify_content(input_data: News) -> Dict[str, str]:
+@app.post("/classify", status_code=200, response_model=Prediction, response_class=ORJSONResponse)
+async def classify_content(input_data: News, request: Request) -> ORJSONResponse:
     """Get the input data and return model prediction.
 
     :param input_data: input News object structured as {text_field_name: text_field_value},
         e.g. {"title": "BTC drops by 10% this Friday"}
-    :return: a Response with a dictionary mapping class names to predicted probabilities
+    :return: a Response with a dictionary mapping class names to predicted probabilities,
+        with the predicted class index and the model version
     """
     text_field_name: str = params["data"]["text_field_name"]
 
@@ -100,6 +241,186 @@ def classify_content(input_data: News) -> Dict[str, str]:
             detail=f"Item {text_field_name} not found, input items: {data_dict.keys()}",
         )
 
-    response_dict = model.predict(data_dict.get(text_field_name, ""))
+    # the model is captured once, so that a swap during the request doesn't mix models up
+    model_loader = get_model_loader()
+    model = cast(IModelInference, model_loader.model)
+    observe_validation(request, model)
+    observe_batch_size("/classify", 1)
+
+    texts = [data_dict.get(text_field_name, "")]
+    predictions = await run_inference(predict_with_cache, model, prediction_cache, texts)
+    model_manager.maybe_shadow_score(texts, predictions, model_loader.key)
+
+    return serialize_response(
+        format_predictions(predictions, params["data"]["class_names"], model.model_version)[0], model
+    )
+
+
+@app.post("/classify_batch", status_code=200, response_model=List[Prediction], response_class=ORJSONResponse)
+async def classify_content_batch(input_data: NewsBatch, request: Request) -> ORJSONResponse:
+    """Get a batch of titles and return model predictions computed with a single model run.
+
+    :param input_data: input NewsBatch object structured as {"titles": [title_1, title_2, ...]}
+    :return: a Response with a list of dictionaries mapping class names to predicted probabilities,
+        with the predicted class index and the model version, in the same order as the input titles
+    """
+    max_batch_size: int = params["inference_api"]["max_batch_size"]
+
+    if len(input_data.titles) > max_batch_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size {len(input_data.titles)} exceeds the limit of {max_batch_size} titles",
+        )
+
+    model_loader = get_model_loader()
+    model = cast(IModelInference, model_loader.model)
+    observe_validation(request, model)
+    observe_batch_size("/classify_batch", len(input_data.titles))
+
+    predictions = await run_inference(predict_with_cache, model, prediction_cache, input_data.titles)
+    model_manager.maybe_shadow_score(input_data.titles, predictions, model_loader.key)
+
+    return serialize_response(
+        format_predictions(predictions, params["data"]["class_names"], model.model_version), model
+    )
+
+
+def parse_stream_line(line: bytes, text_field_name: str) -> Dict[str, Any]:
+    """Parse an NDJSON line, either {text_field_name: title, "id": optional id} or a bare JSON string.
+
+    :raises ValueError: if the line isn't valid JSON or has no title
+    :return: dictionary with the title and optional id
+    """
+    item = json.loads(line)
+
+    if isinstance(item, str):
+        return {"title": item}
+    if isinstance(item, dict) and isinstance(item.get(text_field_name), str):
+        return {"title": item[text_field_name], "id": item.get("id")}
+
+    raise ValueError(f"Expected a JSON string or an object with a string '{text_field_name}' field")
+
+
+async def predict_stream_batch(model: IModelInference, items: List[Dict[str, Any]]) -> bytes:
+    """Score a micro-batch of parsed lines and serialize the predictions and parsing errors to NDJSON.
+
+    Unlike interactive requests, stream batches wait for a free inference worker instead of being rejected,
+    and bypass the prediction cache, so that bulk historical titles don't evict hot entries.
+    """
+    scored_items = [item for item in items if "error" not in item]
+    titles = [item["title"] for item in scored_items]
+    observe_batch_size("/classify_stream", len(titles))
+
+    while True:
+        try:
+            predictions = await inference_executor.run(model.predict_batch, titles)
+            break
+        except (InferenceQueueFull, InferenceQueueTimeout):
+            await asyncio.sleep(inference_executor.retry_after_seconds)
+
+    predictions = format_predictions(predictions, params["data"]["class_names"], model.model_version)
+    for item, prediction in zip(scored_items, predictions):
+        item["prediction"] = prediction
+
+    return b"".join(
+        orjson.dumps(
+            {"line": item["line"], "error": item["error"]}
+            if "error" in item
+            else {"line": item["line"], "id": item.get("id"), **item["prediction"]}
+        )
+        + b"\n"
+        for item in items
+    )
+
+
+def read_lines(lines: IO[bytes], max_lines: int) -> List[bytes]:
+    """Read up to `max_lines` lines, an empty list means the end of the file."""
+    return list(islice(lines, max_lines))
+
+
+async def stream_predictions(model: IModelInference, lines: IO[bytes]) -> AsyncIterator[bytes]:
+    """Read NDJSON lines and yield NDJSON predictions as each micro-batch is scored.
+
+    Lines that can't be parsed produce {"line": line_number, "error": message} records.
+    The spooled upload may be on disk, so lines are read on the Starlette threadpool.
+    """
+    stream_cfg = params["inference_api"]["stream"]
+    text_field_name: str = params["data"]["text_field_name"]
+    batch: List[Dict[str, Any]] = []
+    line_number = 0
+
+    try:
+        while True:
+            raw_lines = await run_in_threadpool(read_lines, lines, stream_cfg["micro_batch_size"])
+            if not raw_lines:
+                break
+
+            for line in raw_lines:
+                line_number += 1
+                if not line.strip():
+                    continue
+
+                try:
+                    batch.append({"line": line_number, **parse_stream_line(line, text_field_name)})
+                except ValueError as exc:
+                    batch.append({"line": line_number, "error": str(exc)})
+
+                if len(batch) == stream_cfg["micro_batch_size"]:
+                    yield await predict_stream_batch(model, batch)
+                    batch = []
+
+        if batch:
+            yield await predict_stream_batch(model, batch)
+    finally:
+        await run_in_threadpool(lines.close)
+
+
+@app.post("/classify_stream")
+async def classify_content_stream(request: Request) -> StreamingResponse:
+    """Classify newline-delimited JSON titles of any size, streaming back NDJSON predictions.
+
+    Every input line is either {"title": title, "id": optional id} or a bare JSON string.
+    The upload is spooled to a temporary file, which stays in memory up to `spool_max_memory_mb`,
+    then titles are scored in micro-batches of `micro_batch_size`, and predictions of every
+    micro-batch are sent as soon as it's scored, so memory use doesn't depend on the input size.
+    Spooling the upload first keeps clients that send the whole body before reading
+    the response from deadlocking on large inputs.
+
+    :param request: request with the NDJSON body
+    :return: a streaming Response with one {"line", "id", class probabilities, "predicted_class",
+        "model_version"} JSON object per input line, in the input order
+    """
+    model = get_model()
+    stream_cfg = params["inference_api"]["stream"]
+
+    upload = tempfile.SpooledTemporaryFile(max_size=stream_cfg["spool_max_memory_mb"] * 1024 * 1024)
+    # writes past `spool_max_memory_mb` go to disk, so they run on the Starlette threadpool
+    async for chunk in request.stream():
+        await run_in_threadpool(upload.write, chunk)
+    await run_in_threadpool(upload.seek, 0)
+
+    return StreamingResponse(stream_predictions(model, upload), media_type="application/x-ndjson")
+
+
+@app.get("/cache/stats")
+def get_prediction_cache_stats() -> Dict[str, Any]:
+    """Get prediction cache hit/miss counters and occupancy.
+
+    :return: cache statistics, {"enabled": False} if the cache is disabled
+    """
+    if prediction_cache is None:
+        return {"enabled": False}
+
+    return {"enabled": True, **prediction_cache.stats()}
+
+
+@app.get("/executor/stats")
+def get_inference_executor_stats() -> Dict[str, Any]:
+    """Get inference queue depth, wait time percentiles and rejection counters."""
+    return inference_executor.stats()
+
 
-    return response_dict
+@app.get("/metrics")
+def get_metrics() -> Response:
+    """Get request counts, batch sizes, per-phase and per-model latency histograms in the Prometheus format."""
+    return metrics_response()
@@ -1,6 +1,23 @@
 """Pydantic data wrapper to check input types."""
-from pydantic import BaseModel
+from typing import List, Type
+
+from pydantic import BaseModel, create_model
 
 
 class News(BaseModel):
     title: str
+
+
+class NewsBatch(BaseModel):
+    titles: List[str]
+
+
+def create_prediction_schema(class_names: List[str]) -> Type[BaseModel]:
+    """Create response schema with a probability field per class, the predicted class index and the model version.
+
+    :param class_names: class names in the order of the model outputs
+    :return: pydantic model of a single prediction
+    """
+    class_fields = {class_name: (float, ...) for class_name in class_names}
+
+    return create_model("Prediction", **class_fields, predicted_class=(int, ...), model_version=(str, ...))
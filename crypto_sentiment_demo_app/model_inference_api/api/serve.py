@@ -0,0 +1,278 @@
+"""Pre-forked multi-process serving of the model inference API.
+
+The parent process imports the app, resolves the model, moves its weights to a memory-mapped
+external data file and binds the socket, then forks the workers. Each worker creates its own
+onnxruntime session from the same weights file, so weights are shared through the page cache
+instead of being copied to every process, and pins its onnxruntime threads so that
+workers x inference threads (`inference_api.executor.max_workers`) x onnxruntime threads = cores.
+The parent restarts workers that die and periodically reports per-worker memory and the aggregate throughput.
+
+Run with:
+
+    python -m crypto_sentiment_demo_app.model_inference_api.api.serve
+"""
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import uvicorn
+from prometheus_client import multiprocess
+
+from crypto_sentiment_demo_app.models.inference.base import resolve_model_path
+from crypto_sentiment_demo_app.models.inference.onnx_session import (
+    externalize_weights,
+    map_weights,
+)
+from crypto_sentiment_demo_app.utils import get_logger
+
+from . import model as api
+
+logger = get_logger(Path(__file__).name)
+
+
+def read_process_memory(pid: int) -> Dict[str, int]:
+    """Read resident, proportional (shared pages split between processes) and anonymous memory of a process.
+
+    :param pid: process id
+    :return: memory in bytes by type, empty if it can't be read
+    """
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, *values = line.split()
+                if key in ("Rss:", "Pss:", "Anonymous:"):
+                    memory[f"{key[:-1].lower()}_bytes"] = int(values[0]) * 1024
+    except OSError:
+        pass
+
+    return memory
+
+
+def write_json_atomically(path: Path, data: Dict[str, Any]) -> None:
+    """Write JSON to a temporary file renamed over the target, so that readers never see a partial file."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
+
+
+def prepare_shared_model(params: Dict[str, Any], threads_per_worker: int, shared_weights_dir: str) -> Optional[Any]:
+    """Resolve the primary model once before forking and configure the workers to share its weights.
+
+    The resolved registry version is pinned in the config, so that all workers load the same model.
+
+    :param params: app config, the model loader reads it on worker startup
+    :param threads_per_worker: onnxruntime intra-op threads of every session run
+    :param shared_weights_dir: directory for the model copy with external weights
+    :return: mapping of the weights file, keep it open to hold the weights in the page cache
+    """
+    model_cfg = params["model"]
+    session_cfg = model_cfg["onnx_config"].setdefault("session_options", {})
+    session_cfg.update(
+        intra_op_num_threads=threads_per_worker,
+        inter_op_num_threads=1,
+        shared_weights_dir=shared_weights_dir,
+    )
+
+    model_path, model_version = resolve_model_path(model_cfg, params["model_artifact_cache"])
+    if model_version.startswith("local:"):
+        model_cfg["path_to_model"] = str(model_path)
+    else:
+        model_cfg["version"] = model_version
+
+    return map_weights(externalize_weights(model_path, shared_weights_dir))
+
+
+class PreforkServer:
+    """Parent process of the pre-forked inference workers.
+
+    :param serving_cfg: `inference_api.serving` config
+    :param host: host to bind the socket to
+    :param port: port to bind the socket to
+    :param inference_threads: number of inference executor threads of every worker, each of them runs
+        the session with its own onnxruntime intra-op threads
+    """
+
+    def __init__(self, serving_cfg: Dict[str, Any], host: str, port: int, inference_threads: int = 1) -> None:
+        self.num_workers: int = serving_cfg["workers"]
+        self.inference_threads = inference_threads
+        self.threads_per_worker: int = serving_cfg["threads_per_worker"] or max(
+            1, (os.cpu_count() or 1) // (self.num_workers * inference_threads)
+        )
+        self.shared_weights_dir: str = serving_cfg["shared_weights_dir"]
+        self.stats_dir = Path(serving_cfg["stats_dir"])
+        self.report_interval_seconds: float = serving_cfg["report_interval_seconds"]
+        self.host = host
+        self.port = port
+
+        self.workers: Dict[int, int] = {}  # pid -> worker index
+        self._stopping = False
+        self._socket: Optional[socket.socket] = None
+        self._last_completed: Dict[int, int] = {}
+
+    def _worker_stats_path(self, pid: int) -> Path:
+        return self.stats_dir / f"worker-{pid}.json"
+
+    def _run_worker(self, index: int) -> None:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        def write_stats():
+            while True:
+                stats = {"index": index, "completed": api.inference_executor.stats()["completed"]}
+                write_json_atomically(self._worker_stats_path(os.getpid()), stats)
+                time.sleep(self.report_interval_seconds / 2)
+
+        threading.Thread(target=write_stats, name="worker-stats", daemon=True).start()
+
+        config = uvicorn.Config(api.app, host=self.host, port=self.port)
+        uvicorn.Server(config).run(sockets=[self._socket])
+
+    def _spawn_worker(self, index: int) -> None:
+        pid = os.fork()
+
+        if pid == 0:
+            try:
+                self._run_worker(index)
+            finally:
+                os._exit(0)
+
+        self.workers[pid] = index
+        logger.info(f"Started worker {index} with pid {pid}")
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    @staticmethod
+    def _forget_worker_metrics(pid: int) -> None:
+        """Drop the live gauges of an exited worker from the aggregated metrics."""
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            multiprocess.mark_process_dead(pid)
+
+    def _read_completed(self, pid: int) -> int:
+        """Read the number of requests a worker completed, the last known one if its stats can't be read."""
+        try:
+            return json.loads(self._worker_stats_path(pid).read_text())["completed"]
+        except FileNotFoundError:
+            return self._last_completed.get(pid, 0)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to read stats of worker with pid {pid}: {e}")
+            return self._last_completed.get(pid, 0)
+
+    def _reap_workers(self) -> None:
+        """Restart all workers that exited since the previous call."""
+        while True:
+            try:
+                pid, exit_status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            if pid in self.workers and not self._stopping:
+                index = self.workers.pop(pid)
+                self._forget_worker_metrics(pid)
+                self._last_completed.pop(pid, None)
+                self._worker_stats_path(pid).unlink(missing_ok=True)
+                logger.warning(f"Worker {index} with pid {pid} exited with status {exit_status}, restarting it")
+                self._spawn_worker(index)
+
+    def report(self, elapsed_seconds: float) -> Dict[str, Any]:
+        """Collect per-worker memory and throughput since the previous report, log and save them.
+
+        :param elapsed_seconds: time since the previous report
+        :return: report
+        """
+        workers = []
+        for pid, index in sorted(self.workers.items(), key=lambda item: item[1]):
+            completed = self._read_completed(pid)
+            throughput = (completed - self._last_completed.get(pid, 0)) / elapsed_seconds
+            self._last_completed[pid] = completed
+
+            workers.append(
+                {
+                    "index": index,
+                    "pid": pid,
+                    "completed": completed,
+                    "throughput": throughput,
+                    **read_process_memory(pid),
+                }
+            )
+
+        report = {
+            "workers": workers,
+            "threads_per_worker": self.threads_per_worker,
+            "throughput": sum(worker["throughput"] for worker in workers),
+            "total_pss_bytes": sum(worker.get("pss_bytes", 0) for worker in workers),
+            "reported_at": time.time(),
+        }
+        write_json_atomically(self.stats_dir / "serving.json", report)
+
+        per_worker = ", ".join(
+            f"#{worker['index']}: rss {worker.get('rss_bytes', 0) / 2**20:.0f} MB, "
+            f"pss {worker.get('pss_bytes', 0) / 2**20:.0f} MB, {worker['throughput']:.1f} req/s"
+            for worker in workers
+        )
+        logger.info(f"Throughput {report['throughput']:.1f} req/s; {per_worker}")
+
+        return report
+
+    def run(self) -> None:
+        """Prepare the model, bind the socket, fork the workers and supervise them until SIGTERM/SIGINT."""
+        weights = prepare_shared_model(api.params, self.threads_per_worker, self.shared_weights_dir)
+        self.stats_dir.mkdir(parents=True, exist_ok=True)
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.set_inheritable(True)
+
+        logger.info(
+            f"Serving on {self.host}:{self.port} with {self.num_workers} workers, "
+            f"{self.inference_threads} inference threads each running {self.threads_per_worker} onnxruntime threads"
+        )
+        for index in range(self.num_workers):
+            self._spawn_worker(index)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        last_report = time.monotonic()
+        while not self._stopping:
+            time.sleep(1)
+            self._reap_workers()
+
+            if time.monotonic() - last_report >= self.report_interval_seconds:
+                self.report(time.monotonic() - last_report)
+                last_report = time.monotonic()
+
+        logger.info("Stopping workers")
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in self.workers:
+            os.waitpid(pid, 0)
+            self._forget_worker_metrics(pid)
+            self._worker_stats_path(pid).unlink(missing_ok=True)
+
+        if weights is not None:
+            weights.close()
+
+
+def main():
+    inference_api_cfg = api.params["inference_api"]
+    server = PreforkServer(
+        inference_api_cfg["serving"],
+        inference_api_cfg["host_name"],
+        inference_api_cfg["port"],
+        inference_threads=inference_api_cfg["executor"]["max_workers"],
+    )
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
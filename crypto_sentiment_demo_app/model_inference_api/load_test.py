@@ -0,0 +1,492 @@
+"""Reproducible local load test of the model inference API.
+
+For every model, the API is started as a subprocess serving the onnx model exported to `static/models/prod`:
+MLflow is pointed at an empty local store and the artifact cache at an empty directory, so that the local
+model file is always the one served, and the prediction cache is disabled. /classify and /classify_batch
+are then loaded by closed-loop clients over a sweep of concurrency and batch sizes. Throughput, latency
+percentiles, CPU time and RSS of the server process are saved to a JSON report, and two reports can be
+compared to flag regressions.
+
+Run the sweep and compare it with a previous report with:
+
+    python -m crypto_sentiment_demo_app.model_inference_api.load_test run --output static/load_test/new.json
+    python -m crypto_sentiment_demo_app.model_inference_api.load_test compare \
+        static/load_test/baseline.json static/load_test/new.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from crypto_sentiment_demo_app.utils import (
+    get_logger,
+    get_project_root,
+    load_config_params,
+)
+
+logger = get_logger(Path(__file__).name)
+
+# metric name -> (path in a result, whether higher values are better)
+METRICS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "throughput": (("throughput",), True),
+    "latency_p50": (("latency_ms", "p50"), False),
+    "latency_p95": (("latency_ms", "p95"), False),
+    "latency_p99": (("latency_ms", "p99"), False),
+    "cpu_seconds_per_request": (("cpu_seconds_per_request",), False),
+    "rss_max_bytes": (("rss_max_bytes",), False),
+}
+
+
+def read_process_usage(pid: int) -> Tuple[float, int]:
+    """Read CPU time (user + system) and resident memory of a process.
+
+    :param pid: process id
+    :return: CPU seconds and RSS in bytes
+    """
+    with open(f"/proc/{pid}/stat") as f:
+        # the process name in parentheses may contain spaces, fields after it are space-separated
+        fields = f.read().rsplit(")", 1)[1].split()
+    with open(f"/proc/{pid}/statm") as f:
+        rss_pages = int(f.read().split()[1])
+
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    return cpu_seconds, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def summarize_latencies(latencies: Sequence[float]) -> Dict[str, float]:
+    """Compute latency percentiles in milliseconds.
+
+    :param latencies: request latencies in seconds
+    :return: p50, p95, p99, mean and max latency
+    """
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000
+    if not latencies_ms.size:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+
+    return {
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "mean": float(latencies_ms.mean()),
+        "max": float(latencies_ms.max()),
+    }
+
+
+def request_json(port: int, method: str, path: str, timeout: float = 5.0) -> Tuple[int, Any]:
+    """Send a request without body to the local API and parse the JSON response."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request(method, path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+
+@contextmanager
+def start_api(model_name: str, port: int, startup_timeout_seconds: float, overrides: Sequence[str]) -> Iterator[int]:
+    """Start the inference API serving the local onnx model in a subprocess and wait until it's ready.
+
+    :param model_name: model config name, e.g. "tf_idf"
+    :param port: port to serve on
+    :param startup_timeout_seconds: time to wait for the readiness probe
+    :param overrides: extra hydra overrides of the API config
+    :raises RuntimeError: if the API exits or doesn't become ready in time
+    :return: pid of the API process
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_overrides = [
+            f"model={model_name}",
+            "inference_api.prediction_cache.enabled=False",
+            f"model_artifact_cache.cache_dir={tmp_dir}/cache",
+            *overrides,
+        ]
+        env = {
+            **os.environ,
+            "HOST": os.environ.get("HOST", "http://localhost"),
+            "MLFLOW_TRACKING_URI": Path(tmp_dir, "mlruns").as_uri(),
+            "CONFIG_OVERRIDES": " ".join(config_overrides),
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "crypto_sentiment_demo_app.model_inference_api.api.model:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+        process = subprocess.Popen(command, cwd=get_project_root(), env=env)
+
+        try:
+            deadline = time.monotonic() + startup_timeout_seconds
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Inference API exited with code {process.returncode} on startup")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Inference API isn't ready after {startup_timeout_seconds} s")
+                try:
+                    if request_json(port, "GET", "/health/ready")[0] == 200:
+                        break
+                except OSError:
+                    pass
+                time.sleep(0.5)
+
+            yield process.pid
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+class LoadClient(threading.Thread):
+    """Closed-loop client sending requests back to back over a keep-alive connection.
+
+    Only requests started in the measurement window `[measure_from, measure_until)` are recorded.
+
+    :param port: API port
+    :param titles: titles to sample from
+    :param batch_size: titles per request, 1 calls /classify and larger batches call /classify_batch
+    :param seed: seed of the title sampling
+    :param measure_from: `time.perf_counter()` value the measurement starts at
+    :param measure_until: `time.perf_counter()` value the test stops at
+    """
+
+    def __init__(
+        self,
+        port: int,
+        titles: Sequence[str],
+        batch_size: int,
+        seed: int,
+        measure_from: float,
+        measure_until: float,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.port = port
+        self.titles = titles
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.measure_from = measure_from
+        self.measure_until = measure_until
+
+        self.latencies: List[float] = []
+        self.status_codes: Dict[str, int] = {}
+
+    def _next_request(self) -> Tuple[str, bytes]:
+        if self.batch_size == 1:
+            return "/classify", json.dumps({"title": self.rng.choice(self.titles)}).encode()
+
+        return "/classify_batch", json.dumps({"titles": self.rng.choices(self.titles, k=self.batch_size)}).encode()
+
+    def run(self) -> None:
+        headers = {"Content-Type": "application/json"}
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+
+        while True:
+            path, body = self._next_request()
+            started_at = time.perf_counter()
+            if started_at >= self.measure_until:
+                break
+
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                status_code = str(response.status)
+            except (OSError, http.client.HTTPException):
+                status_code = "connection_error"
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+
+            if started_at >= self.measure_from:
+                self.latencies.append(time.perf_counter() - started_at)
+                self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+        connection.close()
+
+
+def run_point(
+    port: int,
+    pid: int,
+    titles: Sequence[str],
+    concurrency: int,
+    batch_size: int,
+    duration_seconds: float,
+    warmup_seconds: float,
+    seed: int,
+) -> Dict[str, Any]:
+    """Load the API with the given number of concurrent clients and measure it.
+
+    :param port: API port
+    :param pid: API process id to measure CPU time and RSS of
+    :param titles: titles to sample from
+    :param concurrency: number of concurrent clients
+    :param batch_size: titles per request
+    :param duration_seconds: measurement window
+    :param warmup_seconds: time requests are sent before the measurement window
+    :param seed: seed of the title sampling
+    :return: throughput, latency percentiles, error rate and resource usage
+    """
+    measure_from = time.perf_counter() + warmup_seconds
+    measure_until = measure_from + duration_seconds
+    clients = [
+        LoadClient(port, titles, batch_size, seed + index, measure_from, measure_until) for index in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+
+    time.sleep(max(0.0, measure_from - time.perf_counter()))
+    cpu_seconds_start, rss_bytes = read_process_usage(pid)
+    rss_samples = [rss_bytes]
+    while time.perf_counter() < measure_until:
+        time.sleep(min(0.25, max(0.0, measure_until - time.perf_counter())))
+        rss_samples.append(read_process_usage(pid)[1])
+    cpu_seconds = read_process_usage(pid)[0] - cpu_seconds_start
+
+    for client in clients:
+        client.join()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    status_codes: Dict[str, int] = {}
+    for client in clients:
+        for status_code, count in client.status_codes.items():
+            status_codes[status_code] = status_codes.get(status_code, 0) + count
+
+    n_requests = len(latencies)
+    n_errors = n_requests - status_codes.get("200", 0)
+
+    return {
+        "endpoint": "/classify" if batch_size == 1 else "/classify_batch",
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "duration_seconds": duration_seconds,
+        "requests": n_requests,
+        "errors": n_errors,
+        "error_rate": n_errors / n_requests if n_requests else 0.0,
+        "status_codes": status_codes,
+        "throughput": n_requests / duration_seconds,
+        "titles_per_second": (n_requests - n_errors) * batch_size / duration_seconds,
+        "latency_ms": summarize_latencies(latencies),
+        "cpu_utilization": cpu_seconds / duration_seconds,
+        "cpu_seconds_per_request": cpu_seconds / n_requests if n_requests else 0.0,
+        "rss_max_bytes": max(rss_samples),
+        "rss_mean_bytes": float(np.mean(rss_samples)),
+    }
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=get_project_root(), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(
+    load_test_cfg: Dict[str, Any], titles: Sequence[str], overrides: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """Serve every model in turn and sweep concurrency and batch size against it.
+
+    :param load_test_cfg: `load_test` config
+    :param titles: titles to sample requests from
+    :param overrides: extra hydra overrides of the API config
+    :raises FileNotFoundError: if a model wasn't exported to its local path
+    :return: report with the environment, the config and a result per model, concurrency and batch size
+    """
+    from onnxruntime import __version__ as onnxruntime_version
+
+    results = []
+    models = {}
+    for model_name in load_test_cfg["models"]:
+        model_cfg = load_config_params(overrides=[f"model={model_name}", *overrides])["model"]
+        model_path = get_project_root() / model_cfg["path_to_model"]
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model '{model_name}' isn't exported to {model_path}, train and export it first")
+
+        port = load_test_cfg["port"]
+        with start_api(model_name, port, load_test_cfg["startup_timeout_seconds"], overrides) as pid:
+            models[model_name] = {"path": str(model_path), **request_json(port, "GET", "/")[1]}
+            for concurrency in load_test_cfg["concurrency"]:
+                for batch_size in load_test_cfg["batch_sizes"]:
+                    result = {
+                        "model": model_name,
+                        **run_point(
+                            port,
+                            pid,
+                            titles,
+                            concurrency,
+                            batch_size,
+                            load_test_cfg["duration_seconds"],
+                            load_test_cfg["warmup_seconds"],
+                            load_test_cfg["seed"],
+                        ),
+                    }
+                    results.append(result)
+                    logger.info(
+                        f"{model_name}, concurrency {concurrency}, batch size {batch_size}: "
+                        f"{result['throughput']:.1f} req/s, p50 {result['latency_ms']['p50']:.1f} ms, "
+                        f"p95 {result['latency_ms']['p95']:.1f} ms, p99 {result['latency_ms']['p99']:.1f} ms, "
+                        f"cpu {result['cpu_utilization']:.2f} cores, rss {result['rss_max_bytes'] / 2**20:.0f} MB, "
+                        f"errors {result['error_rate']:.1%}"
+                    )
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "git_commit": get_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "onnxruntime": onnxruntime_version,
+        },
+        "config": {**load_test_cfg, "overrides": list(overrides)},
+        "models": models,
+        "results": results,
+    }
+
+
+def get_metric(result: Dict[str, Any], metric: str) -> float:
+    path, _ = METRICS[metric]
+    value = result
+    for key in path:
+        value = value[key]
+
+    return float(value)
+
+
+def compare_reports(
+    baseline: Dict[str, Any], candidate: Dict[str, Any], thresholds: Dict[str, float]
+) -> List[Dict[str, Any]]:
+    """Find results of the candidate report that regressed compared to the baseline one.
+
+    Results are matched by model, concurrency and batch size. A metric regresses if it worsens
+    by more than its relative threshold, the error rate if it increases by more than its absolute one.
+
+    :param baseline: baseline report
+    :param candidate: candidate report
+    :param thresholds: `load_test.regression_thresholds` config
+    :return: regressions with the baseline and candidate values and the relative change
+    """
+    baseline_results = {(r["model"], r["concurrency"], r["batch_size"]): r for r in baseline["results"]}
+
+    regressions = []
+    for result in candidate["results"]:
+        key = (result["model"], result["concurrency"], result["batch_size"])
+        if key not in baseline_results:
+            continue
+        baseline_result = baseline_results[key]
+        point = {"model": key[0], "concurrency": key[1], "batch_size": key[2]}
+
+        for metric, (_, higher_is_better) in METRICS.items():
+            if metric not in thresholds:
+                continue
+            baseline_value, candidate_value = get_metric(baseline_result, metric), get_metric(result, metric)
+            if baseline_value == 0:
+                continue
+            change = (candidate_value - baseline_value) / baseline_value
+            if (-change if higher_is_better else change) > thresholds[metric]:
+                regressions.append(
+                    {
+                        **point,
+                        "metric": metric,
+                        "baseline": baseline_value,
+                        "candidate": candidate_value,
+                        "change": change,
+                    }
+                )
+
+        error_rate_increase = result["error_rate"] - baseline_result["error_rate"]
+        if "error_rate" in thresholds and error_rate_increase > thresholds["error_rate"]:
+            regressions.append(
+                {
+                    **point,
+                    "metric": "error_rate",
+                    "baseline": baseline_result["error_rate"],
+                    "candidate": result["error_rate"],
+                    "change": error_rate_increase,
+                }
+            )
+
+    return regressions
+
+
+def main():
+    params = load_config_params()
+    load_test_cfg = params["load_test"]
+
+    parser = argparse.ArgumentParser(description="Load test of the model inference API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Sweep concurrency and batch size and save a JSON report")
+    run_parser.add_argument("--models", nargs="+", default=load_test_cfg["models"])
+    run_parser.add_argument("--concurrency", nargs="+", type=int, default=load_test_cfg["concurrency"])
+    run_parser.add_argument("--batch_sizes", nargs="+", type=int, default=load_test_cfg["batch_sizes"])
+    run_parser.add_argument("--duration_seconds", type=float, default=load_test_cfg["duration_seconds"])
+    run_parser.add_argument("--path_to_titles", type=str, default=None, help="CSV file, defaults to the train data")
+    run_parser.add_argument("--output", type=str, default=None)
+    run_parser.add_argument("--overrides", nargs="*", default=[], help="hydra overrides of the API config")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions of a report compared to a baseline")
+    compare_parser.add_argument("baseline", type=str)
+    compare_parser.add_argument("candidate", type=str)
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        baseline, candidate = (json.loads(Path(path).read_text()) for path in (args.baseline, args.candidate))
+        regressions = compare_reports(baseline, candidate, load_test_cfg["regression_thresholds"])
+        for regression in regressions:
+            logger.warning(
+                f"{regression['model']}, concurrency {regression['concurrency']}, batch size "
+                f"{regression['batch_size']}: {regression['metric']} {regression['baseline']:.4g} -> "
+                f"{regression['candidate']:.4g} ({regression['change']:+.1%})"
+            )
+        logger.info(f"Found {len(regressions)} regressions")
+        sys.exit(1 if regressions else 0)
+
+    data_cfg = params["data"]
+    path_to_titles = args.path_to_titles or (
+        get_project_root() / data_cfg["path_to_data"] / data_cfg["train_filename"]
+    )
+    titles = pd.read_csv(path_to_titles)[data_cfg["text_field_name"]].astype(str).tolist()
+
+    load_test_cfg.update(
+        models=args.models,
+        concurrency=args.concurrency,
+        batch_sizes=args.batch_sizes,
+        duration_seconds=args.duration_seconds,
+    )
+    report = run_load_test(load_test_cfg, titles, args.overrides)
+
+    output_path = Path(args.output or get_project_root() / load_test_cfg["report_dir"] / f"{int(time.time())}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2))
+    logger.info(f"Saved the report to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
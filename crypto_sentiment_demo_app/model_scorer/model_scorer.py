@@ -1,13 +1,16 @@
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-import numpy as np
 import pandas as pd
 import requests
-from sqlalchemy import text
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.exc import IntegrityError
 
+from crypto_sentiment_demo_app.database.migrate import apply_migrations
+from crypto_sentiment_demo_app.database.rollups import refresh_rollups
+from crypto_sentiment_demo_app.database.schema import model_predictions, news_titles
 from crypto_sentiment_demo_app.utils import (
     get_db_connection_engine,
     get_logger,
@@ -17,6 +20,9 @@ from crypto_sentiment_demo_app.utils import (
 
 logger = get_logger(Path(__file__).name)
 
+# advisory lock serializing the scorer writes, so that scoring times increase in commit order
+SCORED_AT_LOCK = "model_predictions.scored_at"
+
 
 class ModelScorer:
     def __init__(
@@ -24,28 +30,25 @@ class ModelScorer:
         sqlalchemy_engine: Engine,
         model_api_endpoint: str,
         model_classes: List[str],
+        notify_channel: Optional[str] = None,
     ):
         #
         self.sqlalchemy_engine = sqlalchemy_engine
         # this assumes that the endpoint is up and running
         self.model_api_endpoint = model_api_endpoint
         self.model_classes = model_classes
+        # listeners of this channel, e.g. the data provider response cache, are notified of new predictions
+        self.notify_channel = notify_channel
 
     def get_data_to_run_model(self) -> pd.DataFrame:
-        query = """
-        SELECT title_id,
-               title
-        FROM   news_titles
-        WHERE  title_id IN (SELECT title_id
-                    FROM   model_predictions
-                    WHERE  predicted_class IS NULL);
-        """
+        unscored = select(model_predictions.c.title_id).where(model_predictions.c.predicted_class.is_(None))
+        query = select(news_titles.c.title_id, news_titles.c.title).where(news_titles.c.title_id.in_(unscored))
 
         df = pd.read_sql_query(query, con=self.sqlalchemy_engine).drop_duplicates(subset="title_id")
 
         return df
 
-    def run_model_on_single_text(self, id: int, text: str) -> Dict[str, float]:
+    def run_model_on_single_text(self, id: int, text: str) -> Dict[str, Any]:
         response = requests.post(
             self.model_api_endpoint,
             headers={"Content-Type": "application/json"},
@@ -62,33 +65,39 @@ class ModelScorer:
         for _, row in content_df.iterrows():
             pred_dict = self.run_model_on_single_text(text=row[text_field_name], id=row["title_id"])
             pred_dicts.append(pred_dict)
-        pred_df = pd.DataFrame(pred_dicts)
-
-        pred_df["predicted_class"] = np.argmax(pred_df[self.model_classes].values, axis=1)
+        # the API returns typed probabilities together with the predicted class index
+        pred_df = pd.DataFrame(pred_dicts, columns=["title_id", *self.model_classes, "predicted_class"])
 
         pred_df.set_index("title_id", inplace=True)
 
         return pred_df
 
-    def write_preds_to_db(self, pred_df: pd.DataFrame, table_name="model_predictions"):
-        # TODO read table name from configs
+    def write_preds_to_db(self, pred_df: pd.DataFrame):
         # Write predictions to the table
         pred_df.columns = [col.lower() for col in pred_df.columns]
 
         # TODO avoid hardcoded class names
-        query = text(
-            f"""
-            INSERT INTO {table_name} (title_id, negative, neutral, positive, predicted_class)
-            VALUES {','.join([str(i) for i in list(pred_df.to_records(index=True))])}
-            ON CONFLICT (title_id)
-            DO  UPDATE SET title_id=excluded.title_id,
-                            negative=excluded.negative,
-                            neutral=excluded.neutral,
-                            positive=excluded.positive,
-                            predicted_class=excluded.predicted_class
-            """
-        )
-        self.sqlalchemy_engine.execute(query)
+        records = pred_df.reset_index().astype(object).to_dict("records")
+        with self.sqlalchemy_engine.begin() as conn:
+            # readers fetch predictions scored after the latest scoring time they've seen, so a batch must not
+            # commit with an earlier time than one committed before it; now() is the transaction start time,
+            # so the time is read after taking the lock instead, and the lock is held until commit
+            conn.execute(select(func.pg_advisory_xact_lock(func.hashtext(SCORED_AT_LOCK))))
+            scored_at = conn.execute(select(func.timezone("UTC", func.clock_timestamp()))).scalar()
+
+            stmt = insert(model_predictions).values([{**record, "scored_at": scored_at} for record in records])
+            query = stmt.on_conflict_do_update(
+                index_elements=[model_predictions.c.title_id],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ("negative", "neutral", "positive", "predicted_class", "scored_at")
+                },
+            )
+            conn.execute(query)
+            refresh_rollups(conn, pred_df.index.tolist())
+            if self.notify_channel is not None:
+                # delivered on commit, so listeners never see the notification before the predictions and rollups
+                conn.execute(text("SELECT pg_notify(:channel, '')"), {"channel": self.notify_channel})
 
     def run(self):
         try:
@@ -109,11 +118,15 @@ def main():
     params: Dict[str, Any] = load_config_params()
 
     engine = get_db_connection_engine()
+    # the scorer writes to tables added by migrations, data_provider may not have been started to apply them
+    apply_migrations(engine)
+
     model_api_endpoint = get_model_inference_api_endpoint()
     model_scorer = ModelScorer(
         sqlalchemy_engine=engine,
         model_api_endpoint=model_api_endpoint,
         model_classes=params["data"]["class_names"],
+        notify_channel=params["database"]["predictions_notify_channel"],
     )
 
     model_scorer.run()
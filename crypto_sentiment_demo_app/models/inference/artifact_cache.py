@@ -0,0 +1,186 @@
+"""Content-addressed local cache of onnx models downloaded from MLflow models registry.
+
+Layout of the cache directory:
+
+    blobs/<sha256>.onnx              model files named by their checksum
+    models/<model_name>/<version>.json   manifest mapping a registry version to a blob
+    models/<model_name>/latest.json      last resolved "latest" version of the model
+
+Verify cached artifacts offline with:
+
+    python -m crypto_sentiment_demo_app.models.inference.artifact_cache
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from mlflow.exceptions import MlflowException
+from mlflow.tracking import MlflowClient
+
+from crypto_sentiment_demo_app.utils import (
+    get_logger,
+    get_project_root,
+    load_config_params,
+)
+
+logger = get_logger(Path(__file__).name)
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """Compute sha256 checksum of a file reading it by chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, delete=False, suffix=".tmp") as f:
+        json.dump(data, f, indent=2)
+    os.replace(f.name, path)
+
+
+class ModelArtifactCache:
+    """Local cache of onnx models keyed by model name, registry version and checksum.
+
+    :param cache_dir: cache directory, relative paths are resolved against the project root
+    :param latest_ttl_seconds: how long a resolved "latest" version is trusted without asking the registry
+    :param verify_checksum: whether to recompute the checksum of a cached model on every load,
+        otherwise only the file size is checked
+    """
+
+    def __init__(self, cache_dir: str, latest_ttl_seconds: float, verify_checksum: bool = False) -> None:
+        cache_path = Path(cache_dir)
+        self.cache_dir = cache_path if cache_path.is_absolute() else get_project_root() / cache_path
+        self.latest_ttl_seconds = latest_ttl_seconds
+        self.verify_checksum = verify_checksum
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.cache_dir / "blobs" / f"{sha256}.onnx"
+
+    def _manifest_path(self, model_name: str, model_version: str) -> Path:
+        return self.cache_dir / "models" / model_name / f"{model_version}.json"
+
+    def _latest_path(self, model_name: str) -> Path:
+        return self.cache_dir / "models" / model_name / "latest.json"
+
+    def resolve_version(self, model_name: str, model_version: Union[str, int], client: MlflowClient) -> str:
+        """Resolve "latest" to a concrete registry version.
+
+        A version resolved less than `latest_ttl_seconds` ago is reused without calling the registry.
+        If the registry is unreachable, the last resolved version is used whatever its age.
+
+        :raises MlflowException: if the registry is unreachable and "latest" was never resolved before
+        :return: registry version
+        """
+        if model_version != "latest":
+            return str(model_version)
+
+        latest_path = self._latest_path(model_name)
+        pointer = json.loads(latest_path.read_text()) if latest_path.exists() else None
+
+        if pointer is not None and time.time() - pointer["resolved_at"] < self.latest_ttl_seconds:
+            return pointer["version"]
+
+        try:
+            versions = client.get_latest_versions(model_name)
+        except MlflowException as exc:
+            if pointer is None:
+                raise
+            logger.warning(f"Couldn't resolve latest version of '{model_name}': {exc.message}")
+            logger.warning(f"Using the last resolved version {pointer['version']}")
+            return pointer["version"]
+
+        if not versions:
+            raise MlflowException(f"Registered model '{model_name}' has no versions")
+
+        version = str(max(int(registered_version.version) for registered_version in versions))
+        _write_json_atomic(latest_path, {"version": version, "resolved_at": time.time()})
+
+        return version
+
+    def get(self, model_name: str, model_version: str) -> Optional[Path]:
+        """Return path to the cached model or None if it's missing or corrupted."""
+        manifest_path = self._manifest_path(model_name, model_version)
+        if not manifest_path.exists():
+            return None
+
+        manifest = json.loads(manifest_path.read_text())
+        blob_path = self._blob_path(manifest["sha256"])
+
+        if not blob_path.exists() or blob_path.stat().st_size != manifest["size"]:
+            logger.warning(f"Cached model '{model_name}', version {model_version} is missing or truncated")
+            return None
+
+        if self.verify_checksum and file_sha256(blob_path) != manifest["sha256"]:
+            logger.warning(f"Cached model '{model_name}', version {model_version} doesn't match its checksum")
+            return None
+
+        return blob_path
+
+    def put(self, model_name: str, model_version: str, model_path: Union[str, Path], source_uri: str) -> Path:
+        """Copy a downloaded model into the cache and record its manifest.
+
+        :return: path to the cached model
+        """
+        sha256 = file_sha256(model_path)
+        blob_path = self._blob_path(sha256)
+
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_suffix(f".{os.getpid()}.tmp")
+            shutil.copyfile(model_path, tmp_path)
+            os.replace(tmp_path, blob_path)
+
+        manifest = {
+            "name": model_name,
+            "version": model_version,
+            "sha256": sha256,
+            "size": blob_path.stat().st_size,
+            "source_uri": source_uri,
+            "cached_at": time.time(),
+        }
+        _write_json_atomic(self._manifest_path(model_name, model_version), manifest)
+
+        return blob_path
+
+    def verify(self) -> List[Dict[str, Any]]:
+        """Recompute checksums of all cached models, doesn't need the registry.
+
+        :return: manifests extended with the "ok" verification flag
+        """
+        results = []
+        for manifest_path in sorted((self.cache_dir / "models").glob("*/*.json")):
+            if manifest_path.name == "latest.json":
+                continue
+
+            manifest = json.loads(manifest_path.read_text())
+            blob_path = self._blob_path(manifest["sha256"])
+            manifest["ok"] = blob_path.exists() and file_sha256(blob_path) == manifest["sha256"]
+            results.append(manifest)
+
+        return results
+
+
+def main():
+    params = load_config_params()
+    cache = ModelArtifactCache(**params["model_artifact_cache"])
+
+    results = cache.verify()
+    for manifest in results:
+        status = "OK" if manifest["ok"] else "CORRUPTED"
+        logger.info(f"{manifest['name']} version {manifest['version']} ({manifest['sha256'][:12]}): {status}")
+
+    if not all(manifest["ok"] for manifest in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
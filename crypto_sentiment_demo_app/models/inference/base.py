@@ -1,81 +1,164 @@
+import os
+import tempfile
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Callable, Dict, Union, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
-import mlflow
+from mlflow.artifacts import download_artifacts
 from mlflow.exceptions import MlflowException
 from mlflow.tracking import MlflowClient
-from onnxruntime import InferenceSession
 
 from crypto_sentiment_demo_app.utils import get_logger
 
+from .artifact_cache import ModelArtifactCache
+from .onnx_session import create_inference_session
+
 logger = get_logger(Path(__file__).name)
 
 
-def load_mlflow_model(model_name: str, model_version: Union[str, int]) -> Callable[..., Any]:
-    """Load model from MLflow models registry based on the passed params.
+def load_mlflow_model(
+    model_name: str, model_version: Union[str, int], artifact_cache: ModelArtifactCache
+) -> Tuple[Path, str]:
+    """Get onnx model from the local artifact cache, downloading it from MLflow models registry on a cache miss.
 
     :param model_name: Model name from MLflow registry – str
     :param model_version: Model version from MLflow registry – str or int
-    :return: Model with mlflow.pyfunc interface – Callable[..., Any]
+    :param artifact_cache: Local cache of downloaded models – ModelArtifactCache
+    :raises FileNotFoundError: if the registered model has no onnx file
+    :return: Path to the cached onnx model and its resolved registry version – Tuple[Path, str]
     """
     client = MlflowClient()
-    model = client.get_registered_model(model_name)
-    if model_version == "latest":
-        model_version = model.latest_versions[0].version
-    return mlflow.pyfunc.load_model(model_uri=f"models:/{model_name}/{model_version}")
+    model_version = artifact_cache.resolve_version(model_name, model_version, client)
 
+    model_path = artifact_cache.get(model_name, model_version)
+    if model_path is not None:
+        logger.info(f"Found model '{model_name}', version {model_version} in the local cache: {model_path}")
+        return model_path, model_version
 
-def load_model_pred_func(model_cfg: Dict[str, Any]) -> Callable[..., Any]:
-    """Create model inference session either from MLflow models registry or local onnx model.
+    model_uri = f"models:/{model_name}/{model_version}"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_dir = download_artifacts(artifact_uri=model_uri, dst_path=tmp_dir)
+        downloaded_path = next(Path(local_dir).glob("*.onnx"), None)
+        if downloaded_path is None:
+            raise FileNotFoundError(f"Model {model_uri} has no .onnx file among its artifacts")
+        model_path = artifact_cache.put(model_name, model_version, downloaded_path, model_uri)
+
+    return model_path, model_version
+
+
+def resolve_model_path(model_cfg: Dict[str, Any], artifact_cache_cfg: Dict[str, Any]) -> Tuple[Path, str]:
+    """Get onnx model either from MLflow models registry through the local artifact cache or from the local path.
+
+    The returned version is the resolved MLflow registry version, or a `local:<mtime>` tag
+    for the local fallback, so that it changes whenever a different model gets loaded.
 
     :param model_cfg: Model config – Dict[str, Any]
-    :return: Callable model inference function – Callable[..., Any]
+    :param artifact_cache_cfg: Local artifact cache config – Dict[str, Any]
+    :return: Path to the onnx model and its version – Tuple[Path, str]
     """
     model_name = model_cfg["name"]
-    model_version = model_cfg["version"]
 
     try:
-        session = load_mlflow_model(model_name=model_name, model_version=model_version)
-
-        def pred_func(input_data):
-            prediction = session.predict(input_data)
-            prediction = list(prediction.values())
-            return prediction
-
+        model_path, model_version = load_mlflow_model(
+            model_name=model_name,
+            model_version=model_cfg["version"],
+            artifact_cache=ModelArtifactCache(**artifact_cache_cfg),
+        )
         logger.info(f"Successfully loaded model '{model_name}', version {model_version} from MLflow")
-        return pred_func
 
     except MlflowException as exc:
-        local_path = model_cfg["path_to_model"]
+        model_path = Path(model_cfg["path_to_model"])
         logger.error(f"Coudn't load model from MLflow: {exc.message}")
-        logger.info(f"Loading model from local path: {local_path}")
+        logger.info(f"Loading model from local path: {model_path}")
+
+        model_version = f"local:{int(os.path.getmtime(model_path))}"
+
+    return model_path, model_version
+
+
+def load_model_pred_func(
+    model_cfg: Dict[str, Any], artifact_cache_cfg: Dict[str, Any]
+) -> Tuple[Callable[..., Any], str]:
+    """Create model inference session either from MLflow models registry or local onnx model.
+
+    Models from the registry are kept in a local artifact cache, so that restarts don't download
+    them again. The session is built with the options from `onnx_config.session_options`.
+
+    :param model_cfg: Model config – Dict[str, Any]
+    :param artifact_cache_cfg: Local artifact cache config – Dict[str, Any]
+    :return: Callable model inference function and the loaded model version – Tuple[Callable[..., Any], str]
+    """
+    onnx_cfg = model_cfg["onnx_config"]
+    output_names = onnx_cfg["output_names"] or None
 
-        session = InferenceSession(local_path)
-        output_names = model_cfg["onnx_config"]["output_names"]
+    model_path, model_version = resolve_model_path(model_cfg, artifact_cache_cfg)
+    session = create_inference_session(model_path, onnx_cfg.get("session_options"))
 
-        def pred_func(input_data):
-            return session.run(output_names=output_names, input_feed=input_data)
+    logger.info(f"Created inference session for model '{model_cfg['name']}', version {model_version}: {model_path}")
 
-        logger.info(f"Successfully loaded model '{model_name}', version {model_version} from local path: {local_path}")
-        return pred_func
+    def pred_func(input_data):
+        return session.run(output_names=output_names, input_feed=input_data)
+
+    return pred_func, model_version
 
 
 class IModelInference(ABC):
-    """Inference models interface."""
+    """Inference models interface.
+
+    Models report durations of their inference phases (tokenization, session run, post-processing)
+    to `phase_observer`, called as `phase_observer(model_name, phase, seconds)` once per phase and batch.
+    """
 
     def __init__(self, cfg: Dict[str, Any]) -> None:
         self.cfg = cfg
 
-    @abstractmethod
-    def predict(self, input_text: str) -> Dict[str, str]:
+        self.model_name: str = cfg["model"]["name"]
+        self.model_version: str = str(cfg["model"]["version"])
+        self.phase_observer: Optional[Callable[[str, str, float], None]] = None
+
+    def report_phases(self, **phase_seconds: float) -> None:
+        """Pass phase durations to the phase observer, if any."""
+        if self.phase_observer is None:
+            return
+
+        for phase, seconds in phase_seconds.items():
+            self.phase_observer(self.model_name, phase, seconds)
+
+    def predict(self, input_text: str) -> Dict[str, float]:
         """Predict sentiment probabilitites for the input text.
 
         :param input_text: input text
         :return: dictionary mapping class names to predicted probabilities
         """
+        return self.predict_batch([input_text])[0]
+
+    @abstractmethod
+    def predict_batch(self, input_texts: List[str]) -> List[Dict[str, float]]:
+        """Predict sentiment probabilitites for a batch of input texts with a single model run.
+
+        :param input_texts: list of input texts
+        :return: list of dictionaries mapping class names to predicted probabilities,
+            in the same order as the input texts
+        """
         pass
 
+    def warmup(self) -> None:
+        """Run a few batches through the model so that the first requests don't pay for lazy
+        graph initialization and allocator growth.
+
+        Configured with the `warmup` section of a model config.
+        """
+        warmup_cfg = self.cfg["model"].get("warmup") or {}
+
+        text: str = warmup_cfg.get("text", "")
+        batch_size: int = warmup_cfg.get("batch_size", 1)
+        # texts of different lengths to exercise various sequence shapes
+        texts = [text[: max(1, len(text) * (i + 1) // batch_size)] for i in range(batch_size)]
+
+        for _ in range(warmup_cfg.get("n_runs", 0)):
+            self.predict_batch(texts)
+
 
 class InferenceRegistry:
     """Inference models factory."""
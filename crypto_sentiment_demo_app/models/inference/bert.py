@@ -1,5 +1,6 @@
 from copy import deepcopy
-from typing import Any, Callable, Dict
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
 
 import numpy as np
 
@@ -8,10 +9,16 @@ from crypto_sentiment_demo_app.models.utils import build_object
 from .base import IModelInference, InferenceRegistry, load_model_pred_func
 
 
-def log_sum_exp_softmax(x: np.ndarray) -> np.ndarray:
-    c = np.max(x)
+def log_sum_exp_softmax(x: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Numerically stable softmax computed independently along the given axis.
 
-    return np.exp(x - np.log(np.exp(x - c).sum()) - c)
+    :param x: logits, either a single vector or a (batch_size, num_classes) matrix
+    :param axis: axis to normalize over, defaults to the last one
+    :return: probabilities with the same shape as x
+    """
+    c = np.max(x, axis=axis, keepdims=True)
+
+    return np.exp(x - np.log(np.exp(x - c).sum(axis=axis, keepdims=True)) - c)
 
 
 @InferenceRegistry.register("bert")
@@ -26,34 +33,76 @@ class BertInference(IModelInference):
         super().__init__(cfg)
 
         self.model_cfg = self.cfg["model"]
+        self.inference_cfg = self.model_cfg["inference"]
         self.class_names = cfg["data"]["class_names"]
-        self.tokenizer = self.load_tokenizer()
+        self.tokenizer, self.pad = self.load_tokenizer()
+
+        self.session, self.model_version = load_model_pred_func(self.model_cfg, self.cfg["model_artifact_cache"])
 
-        self.session = load_model_pred_func(self.model_cfg)
+    def predict_batch(self, input_texts: List[str]) -> List[Dict[str, float]]:
+        """Predict sentiment probabilitites for a batch of input texts.
 
-    def predict(self, input_text: str) -> Dict[str, str]:
-        """Predict sentiment probabilitites for the input text.
+        Texts are tokenized at once, sorted by token length and split into chunks of
+        `inference.batch_size` texts, each padded to its own longest sequence and scored
+        with a single model run. This way short headlines are not padded to the length
+        of the longest title in the request. Predictions are returned in the input order.
 
-        :param input_text: input text
-        :return: dictionary mapping class names to predicted probabilities
+        :param input_texts: list of input texts
+        :return: list of dictionaries mapping class names to predicted probabilities
         """
-        inputs = self.tokenizer(input_text)
+        if not input_texts:
+            return []
+
+        t0 = perf_counter()
+        encodings = self.tokenizer(list(input_texts))
+        order = np.argsort([len(input_ids) for input_ids in encodings["input_ids"]], kind="stable")
+        tokenization_seconds, session_run_seconds, postprocessing_seconds = perf_counter() - t0, 0.0, 0.0
+
+        batch_size = self.inference_cfg["batch_size"]
+        predicted_probs = np.empty((len(input_texts), len(self.class_names)), dtype=np.float32)
+
+        for start in range(0, len(order), batch_size):
+            t0 = perf_counter()
+            batch_idx = order[start : start + batch_size]
+            inputs = self.pad({key: [values[i] for i in batch_idx] for key, values in encodings.items()})
+            t1 = perf_counter()
 
-        outputs = self.session(input_data=dict(inputs))[0].squeeze()
+            outputs = self.session(input_data=dict(inputs))[0]
+            t2 = perf_counter()
 
-        predicted_probs = log_sum_exp_softmax(outputs)
+            predicted_probs[batch_idx] = log_sum_exp_softmax(outputs, axis=-1)
 
-        response_dict = dict(zip(self.class_names, map(str, predicted_probs.tolist())))
+            tokenization_seconds += t1 - t0
+            session_run_seconds += t2 - t1
+            postprocessing_seconds += perf_counter() - t2
 
-        return response_dict
+        t0 = perf_counter()
+        predictions = [dict(zip(self.class_names, probs)) for probs in predicted_probs.tolist()]
 
-    def load_tokenizer(self) -> Callable:
-        """Loads tokenizer."""
+        self.report_phases(
+            tokenization=tokenization_seconds,
+            session_run=session_run_seconds,
+            postprocessing=postprocessing_seconds + perf_counter() - t0,
+        )
+
+        return predictions
+
+    def load_tokenizer(self) -> Tuple[Callable, Callable]:
+        """Loads tokenizer.
+
+        :return: tokenize function truncating texts to `inference.max_length` tokens without padding,
+            and pad function padding a subset of the encodings to its longest sequence
+        """
         tokenizer = build_object(self.model_cfg["tokenizer"], is_hugging_face=True)
         tokenizer_call_params = deepcopy(self.model_cfg["tokenizer"]["call_params"])
-        tokenizer_call_params["return_tensors"] = "np"
+        tokenizer_call_params.update(
+            truncation=True, max_length=self.inference_cfg["max_length"], padding=False, return_tensors=None
+        )
+
+        def tokenize_func(input_texts):
+            return tokenizer(input_texts, **tokenizer_call_params)
 
-        def tokenize_func(input_text):
-            return tokenizer(input_text, **tokenizer_call_params)
+        def pad_func(encodings):
+            return tokenizer.pad(encodings, padding=True, return_tensors="np")
 
-        return tokenize_func
+        return tokenize_func, pad_func
@@ -0,0 +1,174 @@
+import json
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from onnxruntime import (
+    ExecutionMode,
+    GraphOptimizationLevel,
+    InferenceSession,
+    SessionOptions,
+)
+
+from crypto_sentiment_demo_app.utils import get_logger
+
+logger = get_logger(Path(__file__).name)
+
+EXECUTION_MODES = {
+    "sequential": ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ExecutionMode.ORT_PARALLEL,
+}
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def build_session_options(session_cfg: Optional[Dict[str, Any]]) -> SessionOptions:
+    """Build onnxruntime session options from the `onnx_config.session_options` section of a model config.
+
+    Missing keys keep onnxruntime defaults.
+
+    :param session_cfg: session options config
+    :raises ValueError: if execution mode or graph optimization level is unknown
+    :return: onnxruntime session options
+    """
+    options = SessionOptions()
+    session_cfg = session_cfg or {}
+
+    for key in ("intra_op_num_threads", "inter_op_num_threads", "enable_cpu_mem_arena", "enable_mem_pattern"):
+        if session_cfg.get(key) is not None:
+            setattr(options, key, session_cfg[key])
+
+    execution_mode = session_cfg.get("execution_mode")
+    if execution_mode is not None:
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {execution_mode}, available: {EXECUTION_MODES.keys()}")
+        options.execution_mode = EXECUTION_MODES[execution_mode]
+
+    optimization_level = session_cfg.get("graph_optimization_level")
+    if optimization_level is not None:
+        if optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(
+                f"Unknown graph optimization level: {optimization_level}, "
+                f"available: {GRAPH_OPTIMIZATION_LEVELS.keys()}"
+            )
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[optimization_level]
+
+    if session_cfg.get("disable_prepacking"):
+        options.add_session_config_entry("session.disable_prepacking", "1")
+
+    return options
+
+
+def _source_stamp(model_path: Union[str, Path]) -> Dict[str, Any]:
+    source_stat = Path(model_path).stat()
+    return {"path": str(Path(model_path).resolve()), "size": source_stat.st_size, "mtime": source_stat.st_mtime}
+
+
+def externalize_weights(model_path: Union[str, Path], weights_dir: Union[str, Path]) -> Path:
+    """Save a copy of the model with its weights moved to a separate external data file.
+
+    onnxruntime memory-maps external data files instead of copying the weights to the heap,
+    so processes loading the same copy share the weights through the page cache.
+    The copy is reused while the source model file is unchanged.
+
+    :param model_path: path to onnx model
+    :param weights_dir: directory to save the model copy and its weights file to
+    :return: path to the model copy
+    """
+    import onnx
+
+    weights_dir = Path(weights_dir)
+    shared_path = weights_dir / f"{Path(model_path).stem}.shared.onnx"
+    source_path = shared_path.with_suffix(".source.json")
+    source = _source_stamp(model_path)
+
+    if shared_path.exists() and source_path.exists() and json.loads(source_path.read_text()) == source:
+        return shared_path
+
+    logger.info(f"Moving weights of {model_path} to an external data file in {weights_dir}")
+    weights_dir.mkdir(parents=True, exist_ok=True)
+    onnx.save_model(
+        onnx.load(str(model_path)),
+        str(shared_path),
+        save_as_external_data=True,
+        all_tensors_to_one_file=True,
+        location=f"{shared_path.name}.data",
+        size_threshold=1024,
+    )
+    source_path.write_text(json.dumps(source))
+
+    return shared_path
+
+
+def map_weights(model_path: Union[str, Path]) -> Optional[mmap.mmap]:
+    """Memory-map the external data file of a model saved with `externalize_weights` and page it in.
+
+    :param model_path: path to the model copy
+    :return: read-only mapping to keep open while the weights should stay in the page cache,
+        None if the model has no external data file
+    """
+    weights_path = Path(f"{model_path}.data")
+    if not weights_path.exists():
+        return None
+
+    with open(weights_path, "rb") as f:
+        weights = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if hasattr(mmap, "MADV_WILLNEED"):
+        weights.madvise(mmap.MADV_WILLNEED)
+
+    return weights
+
+
+def create_inference_session(
+    model_path: Union[str, Path], session_cfg: Optional[Dict[str, Any]] = None
+) -> InferenceSession:
+    """Create onnxruntime inference session with the configured session options.
+
+    If `optimized_model_filepath` is set, the graph optimized by onnxruntime is saved there
+    on the first load and reused on the next ones while the source model file is unchanged,
+    so that graph optimization is paid once per model file.
+
+    If `shared_weights_dir` is set, the session is created from a copy of the model with its weights
+    in an external data file, which onnxruntime memory-maps, so that worker processes serving
+    the same model share one copy of the weights. Weight prepacking is disabled in this mode,
+    as it would copy the weights to the heap of every process, and the optimized graph isn't saved,
+    as it would inline the weights again.
+
+    :param model_path: path to onnx model
+    :param session_cfg: session options config
+    :return: onnxruntime inference session
+    """
+    session_cfg = session_cfg or {}
+    shared_weights_dir = session_cfg.get("shared_weights_dir")
+
+    if shared_weights_dir:
+        options = build_session_options({**session_cfg, "disable_prepacking": True})
+        return InferenceSession(str(externalize_weights(model_path, shared_weights_dir)), options)
+
+    options = build_session_options(session_cfg)
+    optimized_path = session_cfg.get("optimized_model_filepath")
+
+    if optimized_path:
+        optimized_path = Path(optimized_path)
+        source_path = optimized_path.with_suffix(".source.json")
+        source = _source_stamp(model_path)
+
+        if optimized_path.exists() and source_path.exists() and json.loads(source_path.read_text()) == source:
+            logger.info(f"Loading pre-optimized model from {optimized_path}")
+            options.graph_optimization_level = GraphOptimizationLevel.ORT_DISABLE_ALL
+            return InferenceSession(str(optimized_path), options)
+
+        optimized_path.parent.mkdir(parents=True, exist_ok=True)
+        options.optimized_model_filepath = str(optimized_path)
+
+        session = InferenceSession(str(model_path), options)
+        source_path.write_text(json.dumps(source))
+        return session
+
+    return InferenceSession(str(model_path), options)
@@ -1,7 +1,11 @@
-from typing import Any, Dict
+import os
+from time import perf_counter
+from typing import Any, Dict, List
 
 import numpy as np
 
+from crypto_sentiment_demo_app.models.sparse_tf_idf import SparseTfidfScorer
+
 from .base import IModelInference, InferenceRegistry, load_model_pred_func
 
 
@@ -9,6 +13,9 @@ from .base import IModelInference, InferenceRegistry, load_model_pred_func
 class TfidfLogisticRegressionInference(IModelInference):
     """Tf-idf logreg inference model.
 
+    Runs either the ONNX model or, with `inference.engine: sparse`, the native sparse scorer
+    loaded from `path_to_sparse_model`.
+
     :param cfg: model config.
     """
 
@@ -17,17 +24,39 @@ class TfidfLogisticRegressionInference(IModelInference):
         super().__init__(cfg)
 
         self.model_cfg = self.cfg["model"]
+        self.engine = self.model_cfg["inference"]["engine"]
+
+        if self.engine == "sparse":
+            sparse_model_path = self.model_cfg["path_to_sparse_model"]
+            self.scorer = SparseTfidfScorer(sparse_model_path)
+            self.model_version = f"local:{int(os.path.getmtime(sparse_model_path))}"
+        elif self.engine == "onnx":
+            self.session, self.model_version = load_model_pred_func(self.model_cfg, self.cfg["model_artifact_cache"])
+        else:
+            raise ValueError(f"Unknown tf-idf inference engine: {self.engine}, available: ('onnx', 'sparse')")
+
+    def predict_batch(self, input_texts: List[str]) -> List[Dict[str, float]]:
+        """Predict sentiment probabilitites for a batch of input texts with a single model run.
+
+        :param input_texts: list of input texts
+        :return: list of dictionaries mapping class names to predicted probabilities
+        """
+        if not input_texts:
+            return []
 
-        self.session = load_model_pred_func(self.model_cfg)
-
-    def predict(self, input_text: str) -> Dict[str, str]:
-        """Predict sentiment probabilitites for the input text.
+        round_prob = self.model_cfg["inference"]["round_prob"]
 
-        :param input_text: input text
-        :return: dictionary mapping class names to predicted probabilities
-        """
-        pred_onnx = self.session({"X": np.asarray([input_text])})[1][0]
+        t0 = perf_counter()
+        # tf-idf vectorization is a part of the model run, so there is no separate tokenization phase
+        if self.engine == "sparse":
+            probs = self.scorer.predict_proba(input_texts).round(round_prob).tolist()
+            t1 = perf_counter()
+            predictions = [dict(zip(self.scorer.classes, pred)) for pred in probs]
+        else:
+            pred_onnx = self.session({"X": np.asarray(input_texts)})[1]
+            t1 = perf_counter()
+            predictions = [{k: round(v, round_prob) for k, v in pred.items()} for pred in pred_onnx]
 
-        response_dict = {k: round(v, self.model_cfg["inference"]["round_prob"]) for k, v in pred_onnx.items()}
+        self.report_phases(session_run=t1 - t0, postprocessing=perf_counter() - t1)
 
-        return response_dict
+        return predictions
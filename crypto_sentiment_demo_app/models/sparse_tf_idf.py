@@ -0,0 +1,264 @@
+"""Compact export and native sparse scoring of the tf-idf + logistic regression pipeline.
+
+The vocabulary, IDF vector and coefficient matrix of a fitted sklearn pipeline are saved to a single `.npz` file,
+and batches are scored as one sparse matrix product with numpy, without sklearn or onnxruntime.
+
+Benchmark the sparse engine against the ONNX model on the training data with:
+
+    python -m crypto_sentiment_demo_app.models.sparse_tf_idf
+"""
+import json
+import pickle
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from crypto_sentiment_demo_app.utils import (
+    get_logger,
+    get_project_root,
+    load_config_params,
+)
+
+logger = get_logger(Path(__file__).name)
+
+WHITE_SPACES = re.compile(r"\s\s+")
+
+
+def export_sparse_tfidf(pipeline: Any, path: Union[str, Path]) -> Path:
+    """Save vocabulary, IDF vector and coefficients of a fitted tf-idf + logistic regression pipeline.
+
+    :param pipeline: fitted sklearn Pipeline with "tfidf" and "logreg" steps
+    :param path: path to the `.npz` file
+    :raises ValueError: if the vectorizer isn't a char n-gram one
+    :return: path to the saved file
+    """
+    vectorizer, logreg = pipeline.named_steps["tfidf"], pipeline.named_steps["logreg"]
+
+    if vectorizer.analyzer != "char" or vectorizer.preprocessor is not None or vectorizer.strip_accents is not None:
+        raise ValueError("Only char n-gram vectorizers without custom preprocessing can be exported")
+
+    vocabulary = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, index in vectorizer.vocabulary_.items():
+        vocabulary[index] = term
+
+    # the same rule sklearn LogisticRegression.predict_proba uses to choose between softmax and one-vs-rest
+    multi_class = getattr(logreg, "multi_class", "auto")
+    if multi_class == "auto":
+        multi_class = "ovr" if len(logreg.classes_) <= 2 or logreg.solver == "liblinear" else "multinomial"
+
+    params = {
+        "ngram_range": list(vectorizer.ngram_range),
+        "lowercase": vectorizer.lowercase,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "use_idf": vectorizer.use_idf,
+        "norm": vectorizer.norm,
+        "multi_class": multi_class,
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            vocabulary=vocabulary.astype(str),
+            idf=vectorizer.idf_.astype(np.float32) if vectorizer.use_idf else np.ones(len(vocabulary), np.float32),
+            coef=logreg.coef_.astype(np.float32),
+            intercept=logreg.intercept_.astype(np.float32),
+            classes=np.asarray(logreg.classes_).astype(str),
+            params=np.asarray(json.dumps(params)),
+        )
+
+    return path
+
+
+class SparseTfidfScorer:
+    """Scores texts with the exported tf-idf + logistic regression pipeline.
+
+    Char n-grams of the whole batch are extracted with numpy: characters are mapped to a compact
+    alphabet of the vocabulary, every n-gram is packed into a single uint64 key and looked up
+    in the sorted vocabulary keys with one `searchsorted` call per n. The resulting sparse COO matrix
+    of n-gram counts is multiplied by the coefficient matrix with IDF weights folded in, and row
+    normalization is applied to the scores, since the model is linear in the tf-idf features.
+    Plain numpy is used instead of scipy.sparse, whose per-call overhead dominates for small batches.
+
+    :param path: path to the `.npz` file saved with `export_sparse_tfidf`
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        with np.load(path, allow_pickle=False) as exported:
+            terms: List[str] = exported["vocabulary"].tolist()
+            self.idf: np.ndarray = exported["idf"]
+            coef, self.intercept = exported["coef"], exported["intercept"]
+            self.classes: List[str] = exported["classes"].tolist()
+            self.params: Dict[str, Any] = json.loads(exported["params"].item())
+
+        self.n_features = len(terms)
+        self.min_n, self.max_n = self.params["ngram_range"]
+        # (n_features, n_scores) weights of raw counts, or of log-counts if sublinear_tf is set
+        self.weights = np.ascontiguousarray((coef * self.idf).T)
+
+        # code 0 is left for characters missing in the vocabulary, n-grams with them never match
+        self.alphabet = np.array(sorted({ord(char) for term in terms for char in term}), dtype=np.uint32)
+        self.bits_per_char = int(len(self.alphabet)).bit_length()
+        if self.bits_per_char * self.max_n + self.max_n.bit_length() > 64:
+            raise ValueError(f"Alphabet of {len(self.alphabet)} characters is too large to pack n-grams into uint64")
+
+        char_codes = {chr(codepoint): code for code, codepoint in enumerate(self.alphabet.tolist(), start=1)}
+        term_keys = np.array(
+            [
+                sum(char_codes[char] << (self.bits_per_char * i) for i, char in enumerate(term))
+                | len(term) << (self.bits_per_char * self.max_n)
+                for term in terms
+            ],
+            dtype=np.uint64,
+        )
+        self.key_order = np.argsort(term_keys)
+        self.sorted_keys = term_keys[self.key_order]
+
+    def _preprocess(self, text: str) -> str:
+        if self.params["lowercase"]:
+            text = text.lower()
+        return WHITE_SPACES.sub(" ", text)
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Map characters of the concatenated texts to alphabet codes."""
+        codepoints = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+        positions = np.searchsorted(self.alphabet, codepoints)
+        known = positions < len(self.alphabet)
+        known[known] = self.alphabet[positions[known]] == codepoints[known]
+
+        return np.where(known, positions + 1, 0).astype(np.uint64)
+
+    def _pack_all(self, codes: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+        """Pack n-grams for every n of the n-gram range, extending (n - 1)-grams by one code."""
+        untagged = np.zeros(len(codes), dtype=np.uint64)
+        for n in range(1, min(self.max_n, len(codes)) + 1):
+            untagged = untagged[:-1] if n > 1 else untagged
+            untagged |= codes[n - 1 :] << np.uint64(self.bits_per_char * (n - 1))
+            if n >= self.min_n:
+                yield n, untagged | np.uint64(n << (self.bits_per_char * self.max_n))
+
+    def count_ngrams(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Count char n-grams of the texts split the same way sklearn TfidfVectorizer with analyzer="char" does.
+
+        :param texts: input texts
+        :return: (n_texts, n_features) sparse matrix of counts in the COO format: rows, features and counts,
+            sorted by rows
+        """
+        texts = [self._preprocess(text) for text in texts]
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        codes = self._encode(texts)
+
+        text_ends = np.repeat(np.cumsum(lengths), lengths)
+        text_rows = np.repeat(np.arange(len(texts)), lengths)
+
+        keys, rows = [np.empty(0, dtype=np.uint64)], [np.empty(0, dtype=np.int64)]
+        for n, n_keys in self._pack_all(codes):
+            # n-grams must not cross text boundaries
+            valid = np.arange(len(n_keys)) + n <= text_ends[: len(n_keys)]
+            keys.append(n_keys[valid])
+            rows.append(text_rows[: len(n_keys)][valid])
+
+        keys_array, rows_array = np.concatenate(keys), np.concatenate(rows)
+        positions = np.minimum(np.searchsorted(self.sorted_keys, keys_array), len(self.sorted_keys) - 1)
+        found = self.sorted_keys[positions] == keys_array
+        entries = rows_array[found] * self.n_features + self.key_order[positions[found]]
+
+        entries_array, counts = np.unique(entries, return_counts=True)
+
+        return entries_array // self.n_features, entries_array % self.n_features, counts.astype(np.float32)
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        """Compute logistic regression scores of the texts as a product of the sparse tf matrix and the weights."""
+        rows, features, tf = self.count_ngrams(texts)
+        if self.params["sublinear_tf"]:
+            tf = np.log(tf) + 1
+
+        contributions = tf[:, None] * self.weights[features]
+        scores = np.zeros((len(texts), self.weights.shape[1]))
+        for i in range(self.weights.shape[1]):
+            scores[:, i] = np.bincount(rows, weights=contributions[:, i], minlength=len(texts))
+
+        norm = self.params["norm"]
+        if norm is not None:
+            tfidf = tf * self.idf[features]
+            if norm == "l1":
+                row_norms = np.bincount(rows, weights=np.abs(tfidf), minlength=len(texts))
+            else:
+                row_norms = np.sqrt(np.bincount(rows, weights=tfidf**2, minlength=len(texts)))
+            row_norms[row_norms == 0] = 1
+            scores /= row_norms[:, None]
+
+        return scores + self.intercept
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Predict class probabilities the same way sklearn LogisticRegression.predict_proba does.
+
+        :param texts: input texts
+        :return: (n_texts, n_classes) probabilities in the order of `classes`
+        """
+        scores = self.decision_function(texts)
+
+        if self.params["multi_class"] == "ovr":
+            probs = 1 / (1 + np.exp(-scores))
+            if probs.shape[1] == 1:
+                return np.hstack([1 - probs, probs])
+            return probs / probs.sum(axis=1, keepdims=True)
+
+        if scores.shape[1] == 1:
+            scores = np.hstack([-scores, scores])
+        scores = scores - scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+def benchmark(predict: Any, texts: Sequence[str], batch_size: int, n_repeats: int = 3) -> float:
+    """Return the best time of scoring all texts in batches of the given size, in seconds."""
+    best = float("inf")
+    for _ in range(n_repeats):
+        t0 = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            predict(texts[start : start + batch_size])
+        best = min(best, time.perf_counter() - t0)
+
+    return best
+
+
+def main():
+    from onnxruntime import InferenceSession
+
+    params = load_config_params(overrides=["model=tf_idf"])
+    model_cfg, data_cfg = params["model"], params["data"]
+
+    train_df = pd.read_csv(get_project_root() / data_cfg["path_to_data"] / data_cfg["train_filename"])
+    texts = train_df[data_cfg["text_field_name"]].astype(str).tolist()
+
+    scorer = SparseTfidfScorer(model_cfg["path_to_sparse_model"])
+    session = InferenceSession(model_cfg["path_to_model"])
+
+    def predict_onnx(batch):
+        return session.run(None, {"X": np.asarray(batch)})[1]
+
+    checkpoint_path = Path(model_cfg["checkpoint_path"])
+    if checkpoint_path.exists():
+        with open(checkpoint_path, "rb") as f:
+            pipeline = pickle.load(f)
+        max_diff = np.abs(scorer.predict_proba(texts) - pipeline.predict_proba(texts)).max()
+        logger.info(f"Max absolute difference with sklearn probabilities: {max_diff:.2e}")
+
+    for batch_size in (1, 32, 256):
+        onnx_seconds = benchmark(predict_onnx, texts, batch_size)
+        sparse_seconds = benchmark(scorer.predict_proba, texts, batch_size)
+        logger.info(
+            f"Batch size {batch_size}: onnx {len(texts) / onnx_seconds:.0f} texts/s, "
+            f"sparse {len(texts) / sparse_seconds:.0f} texts/s, speedup {onnx_seconds / sparse_seconds:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import gc
+import json
 import os
+from copy import deepcopy
 from pathlib import Path
 from typing import Any, Dict, cast
 
@@ -14,14 +16,18 @@ from transformers.modeling_utils import PreTrainedModel
 from transformers.onnx import FeaturesManager, export, validate_model_outputs
 
 from crypto_sentiment_demo_app.models.train.base import IModelTrain, TrainRegistry
+from crypto_sentiment_demo_app.utils import get_logger, timer
 
 from .dataset import build_dataloaders, split_train_val
 from .pipeline import MetricTracker, SentimentPipeline
+from .quantization import build_quantization_report, quantize_onnx_model
 
 transformers.logging.set_verbosity_error()
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+logger = get_logger(Path(__file__).name)
+
 
 @TrainRegistry.register("bert")
 class Bert(IModelTrain):
@@ -51,6 +57,7 @@ class Bert(IModelTrain):
         seed_everything(self.model_cfg["seed"])
 
         train_data, val_data, train_labels, val_labels = split_train_val(X, y)
+        self.val_data, self.val_labels = val_data, val_labels
 
         train_dataloader, val_dataloader = build_dataloaders(
             self.model_cfg, train_data, train_labels, val_data, val_labels
@@ -102,6 +109,9 @@ class Bert(IModelTrain):
         del onnx_model
         gc.collect()
 
+        if self.model_cfg["quantization"]["enabled"]:
+            self._quantize(onnx_path)
+
         self.model = SentimentPipeline.load_from_checkpoint(self.model_cfg["checkpoint_path"], cfg=self.model_cfg)
         cast(PreTrainedModel, self.model.model).eval()
         cast(PreTrainedModel, self.model.tokenizer).save_pretrained(pt_path)
@@ -123,6 +133,56 @@ class Bert(IModelTrain):
             onnx_config, self.model.tokenizer, self.model.model, path, onnx_outputs, onnx_config.atol_for_validation
         )
 
+    def _quantize(self, onnx_path: Path) -> None:
+        """Write a dynamically quantized INT8 model next to the exported one, register it in MLflow
+        and log the report comparing it to the full-precision model on the validation split.
+        """
+        quant_cfg = self.model_cfg["quantization"]
+        quantized_path = Path(quant_cfg["path_to_model"])
+
+        with timer("INT8 dynamic quantization", logger=logger):
+            quantize_onnx_model(onnx_path, quantized_path, quant_cfg)
+
+        quantized_model = onnx.load_model(quantized_path)
+        mlflow.onnx.log_model(
+            onnx_model=quantized_model,
+            artifact_path=quant_cfg["registered_model_name"],
+            registered_model_name=quant_cfg["registered_model_name"],
+        )
+        del quantized_model
+        gc.collect()
+
+        if not hasattr(self, "val_data"):
+            logger.warning("No validation split available, call fit() before save() to get the quantization report")
+            return
+
+        tokenizer = self.model.tokenizer
+        tokenizer_call_params = deepcopy(self.model_cfg["tokenizer"]["call_params"])
+        tokenizer_call_params["return_tensors"] = "np"
+
+        def tokenize_func(texts):
+            return tokenizer(texts, **tokenizer_call_params)
+
+        with timer("Quantization report", logger=logger):
+            report = build_quantization_report(
+                onnx_path,
+                quantized_path,
+                tokenize_func,
+                self.val_data,
+                self.val_labels,
+                batch_size=self.model_cfg["val_batch_size"],
+                n_latency_samples=quant_cfg["n_latency_samples"],
+            )
+
+        with open(quant_cfg["report_path"], "w") as f:
+            json.dump(report, f, indent=2)
+        mlflow.log_dict(report, Path(quant_cfg["report_path"]).name)
+        mlflow.log_metrics(
+            {f"{model}_{key}": val for model, metrics in report.items() for key, val in metrics.items()}
+        )
+
+        logger.info(f"Quantization report: {json.dumps(report)}")
+
     def enable_mlflow_logging(self) -> None:
         mlflow.set_experiment("bert")
         mlflow.pytorch.autolog()
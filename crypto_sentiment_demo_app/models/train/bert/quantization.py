@@ -0,0 +1,99 @@
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from onnxruntime import InferenceSession
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+
+def quantize_onnx_model(onnx_path: Path, quantized_path: Path, cfg: Dict[str, Any]) -> None:
+    """Write a dynamically quantized INT8 copy of the onnx model.
+
+    Weights are quantized ahead of time, activations are quantized on the fly,
+    so no calibration data is needed.
+
+    :param onnx_path: path to the full-precision onnx model
+    :param quantized_path: path to save the quantized model to
+    :param cfg: quantization config
+    """
+    quantize_dynamic(
+        model_input=onnx_path,
+        model_output=quantized_path,
+        weight_type=QuantType.QInt8,
+        per_channel=cfg["per_channel"],
+        reduce_range=cfg["reduce_range"],
+    )
+
+
+def evaluate_onnx_model(
+    model_path: Path,
+    tokenize_func: Callable,
+    texts: List[str],
+    labels: List[int],
+    batch_size: int,
+    n_latency_samples: int,
+) -> Dict[str, float]:
+    """Compute accuracy, latency and size of an onnx classification model.
+
+    :param model_path: path to the onnx model
+    :param tokenize_func: function returning numpy model inputs for a list of texts
+    :param texts: validation texts
+    :param labels: validation labels
+    :param batch_size: batch size to compute accuracy and batch latency with
+    :param n_latency_samples: number of texts to measure single-text latency on
+    :return: dictionary with metrics
+    """
+    session = InferenceSession(str(model_path))
+
+    predictions, batch_latencies = [], []
+    for start in range(0, len(texts), batch_size):
+        inputs = dict(tokenize_func(texts[start : start + batch_size]))
+
+        t0 = time.perf_counter()
+        logits = session.run(output_names=None, input_feed=inputs)[0]
+        batch_latencies.append(time.perf_counter() - t0)
+
+        predictions.extend(np.argmax(logits, axis=-1).tolist())
+
+    single_latencies = []
+    for text in texts[:n_latency_samples]:
+        inputs = dict(tokenize_func([text]))
+
+        t0 = time.perf_counter()
+        session.run(output_names=None, input_feed=inputs)
+        single_latencies.append(time.perf_counter() - t0)
+
+    return {
+        "accuracy": float(np.mean(np.asarray(predictions) == np.asarray(labels))),
+        "batch_latency_ms_mean": 1000 * float(np.mean(batch_latencies)),
+        "single_latency_ms_p50": 1000 * float(np.percentile(single_latencies, 50)),
+        "single_latency_ms_p95": 1000 * float(np.percentile(single_latencies, 95)),
+        "size_mb": Path(model_path).stat().st_size / 1024**2,
+    }
+
+
+def build_quantization_report(
+    onnx_path: Path,
+    quantized_path: Path,
+    tokenize_func: Callable,
+    texts: List[str],
+    labels: List[int],
+    batch_size: int,
+    n_latency_samples: int,
+) -> Dict[str, Dict[str, float]]:
+    """Compare full-precision and quantized models on the validation split.
+
+    :return: dictionary with "fp32", "int8" metrics and their "int8_vs_fp32" differences/ratios
+    """
+    fp32 = evaluate_onnx_model(onnx_path, tokenize_func, texts, labels, batch_size, n_latency_samples)
+    int8 = evaluate_onnx_model(quantized_path, tokenize_func, texts, labels, batch_size, n_latency_samples)
+
+    comparison = {
+        "accuracy_diff": int8["accuracy"] - fp32["accuracy"],
+        "batch_speedup": fp32["batch_latency_ms_mean"] / int8["batch_latency_ms_mean"],
+        "single_speedup_p50": fp32["single_latency_ms_p50"] / int8["single_latency_ms_p50"],
+        "size_ratio": int8["size_mb"] / fp32["size_mb"],
+    }
+
+    return {"fp32": fp32, "int8": int8, "int8_vs_fp32": comparison}
@@ -10,6 +10,7 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import StratifiedKFold, cross_val_score
 from sklearn.pipeline import Pipeline
 
+from crypto_sentiment_demo_app.models.sparse_tf_idf import export_sparse_tfidf
 from crypto_sentiment_demo_app.utils import get_logger, timer
 
 from .base import IModelTrain, TrainRegistry
@@ -74,6 +75,9 @@ class TfidfLogisticRegression(IModelTrain):
             mlflow.onnx.log_model(onnx_model=model_onnx, artifact_path="tf_idf", registered_model_name="tf_idf")
             with open(self.model_cfg["path_to_model"], "wb") as f:
                 f.write(model_onnx.SerializeToString())
+
+            sparse_model_path = export_sparse_tfidf(self.model, self.model_cfg["path_to_sparse_model"])
+            mlflow.log_artifact(str(sparse_model_path), artifact_path="tf_idf_sparse")
         else:
             raise ValueError(f"Unknown env passed: expected one of ('dev', 'prod'), given: {env}")
 
@@ -3,10 +3,11 @@ import logging
 import logging.config
 import os
 import re
+import resource
 import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, cast
+from typing import Any, Dict, List, Optional, cast
 
 import numpy as np
 import pytz
@@ -30,13 +31,15 @@ def get_project_root() -> Path:
     return Path(__file__).parent.parent
 
 
-def load_config_params(return_hydra_config: bool = False) -> Dict[str, Any]:
+def load_config_params(return_hydra_config: bool = False, overrides: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Loads global project configuration params defined in the `config.yaml` file.
 
+    :param return_hydra_config: whether to add the `hydra` section with runtime choices
+    :param overrides: hydra overrides, e.g. ["model=tf_idf", "model.version=3"]
     :return: a nested dictionary corresponding to the `config.yaml` file.
     """
-    cfg = compose(config_name="config", return_hydra_config=return_hydra_config)
+    cfg = compose(config_name="config", overrides=overrides or [], return_hydra_config=return_hydra_config)
 
     return cast(Dict[str, Any], OmegaConf.to_container(cfg))
 
@@ -73,15 +76,34 @@ def timer(name, logger):
     logger.info(f"[{name}] done in {time.time() - t0:.0f} s")
 
 
+def get_rss_bytes() -> int:
+    """
+    Returns resident set size of the current process.
+    Falls back to the peak RSS where /proc is not available.
+    :return: RSS in bytes
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
 def get_db_connection_engine(
     user: str = os.getenv("POSTGRES_USER"),
     pwd: str = os.getenv("POSTGRES_PASSWORD"),
     database: str = os.getenv("POSTGRES_DB"),
     host: str = os.getenv("POSTGRES_HOST"),
+    **engine_kwargs: Any,
 ) -> Engine:
+    """
+    Creates SQLAlchemy engine of the project Postgres database.
+    :param engine_kwargs: extra `create_engine` arguments, e.g. pool size or connect_args
+    :return: sqlalchemy.engine.base.Engine
+    """
     conn_string = f"postgresql://{user}:{pwd}@{host}/{database}"
 
-    engine = create_engine(conn_string)
+    engine = create_engine(conn_string, **engine_kwargs)
 
     return engine
 
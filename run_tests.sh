@@ -4,8 +4,9 @@ docker compose -f docker-compose.test.yml build --no-cache
 
 docker run -v $PWD:/root image_model_fast_api_test pytest tests/model_inference_api; output_model_inference=$?
 docker run -v $PWD:/root image_model_scorer_test pytest tests/model_scorer; output_model_scorer=$?
+docker run -v $PWD:/root image_data_provider_test pytest tests/data_provider; output_data_provider=$?
 
-if ! (( $output_model_inference || $output_model_scorer )); then
+if ! (( $output_model_inference || $output_model_scorer || $output_data_provider )); then
    exit 0
 else
    exit 1
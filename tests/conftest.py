@@ -0,0 +1,39 @@
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from crypto_sentiment_demo_app.database.migrate import apply_migrations
+from crypto_sentiment_demo_app.utils import get_project_root
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    """Engine bound to a fresh database with the base tables and all migrations applied.
+
+    Tests using it are skipped unless TEST_DATABASE_URL points to a Postgres database
+    the user may create databases from, e.g. postgresql://postgres@localhost:5432/postgres
+    """
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if database_url is None:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    database = f"test_{uuid.uuid4().hex[:12]}"
+    admin_engine = create_engine(database_url, isolation_level="AUTOCOMMIT")
+    with admin_engine.connect() as conn:
+        conn.exec_driver_sql(f"CREATE DATABASE {database}")
+
+    engine = create_engine(make_url(database_url).set(database=database))
+    init_sql = get_project_root() / "crypto_sentiment_demo_app" / "database" / "docker_postgres_init.sql"
+    with engine.begin() as conn:
+        conn.exec_driver_sql(init_sql.read_text())
+    apply_migrations(engine)
+
+    yield engine
+
+    engine.dispose()
+    with admin_engine.connect() as conn:
+        conn.exec_driver_sql(f"DROP DATABASE {database} WITH (FORCE)")
+    admin_engine.dispose()
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import create_engine
+
+from crypto_sentiment_demo_app.data_provider import db_connector
+from crypto_sentiment_demo_app.data_provider.db_connector import DBConnection
+from crypto_sentiment_demo_app.utils import load_config_params
+
+
+@pytest.fixture(scope="module")
+def db_connection(pg_engine):
+    """DBConnection with the data provider pool settings bound to the test database."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            db_connector, "get_db_connection_engine", lambda **kwargs: create_engine(pg_engine.url, **kwargs)
+        )
+        db = DBConnection(load_config_params()["data_provider"]["database"])
+        # the engine is created on the first query
+        yield db
+
+    db.close_connection()
@@ -0,0 +1,130 @@
+import asyncio
+import importlib
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from crypto_sentiment_demo_app.data_provider import db_connector
+from crypto_sentiment_demo_app.data_provider.db_connector import DBConnection
+from crypto_sentiment_demo_app.utils import load_config_params
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """DBConnection whose engine never connects, these tests don't need Postgres."""
+    monkeypatch.setattr(
+        db_connector,
+        "get_db_connection_engine",
+        lambda **kwargs: create_engine("postgresql://user@localhost/unused", **kwargs),
+    )
+    db = DBConnection(load_config_params()["data_provider"]["database"])
+    yield db
+    db.close_connection()
+
+
+@pytest.fixture(scope="module")
+def api():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("HOST", "http://localhost")
+        return importlib.import_module("crypto_sentiment_demo_app.data_provider.api")
+
+
+@pytest.fixture
+def client(api, db, monkeypatch):
+    monkeypatch.setattr(api, "db", db)
+    # the startup event isn't run, so that nothing connects to the database
+    return TestClient(api.app)
+
+
+def test_pool_stats(db):
+    database_cfg = db.database_cfg
+
+    assert db.pool_stats() == {
+        "pool_size": database_cfg["pool_size"],
+        "checked_out": 0,
+        "checked_in": 0,
+        "overflow": -database_cfg["pool_size"],
+        "max_workers": database_cfg["pool_size"] + database_cfg["max_overflow"],
+        "reserved_connections": 0,
+        "queries_in_flight": 0,
+    }
+
+
+def test_pool_stats_endpoint(client, db):
+    response = client.get("/db/pool/stats")
+
+    assert response.status_code == 200
+    assert response.json() == db.pool_stats()
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        PoolTimeoutError("QueuePool limit of size 5 overflow 5 reached"),
+        OperationalError("SELECT 1", {}, Exception("server closed the connection unexpectedly")),
+    ],
+)
+def test_database_errors_respond_with_503(client, db, monkeypatch, exc):
+    def fail():
+        raise exc
+
+    monkeypatch.setattr(db, "pool_stats", fail)
+
+    response = client.get("/db/pool/stats")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"detail": "Database is unavailable or overloaded"}
+
+
+def test_run_keeps_event_loop_free_and_counts_queries_in_flight(db):
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def blocking_query(result):
+        started.release()
+        release.wait(timeout=5)
+        return result
+
+    def failing_query():
+        raise OperationalError("SELECT 1", {}, Exception("statement timeout"))
+
+    async def scenario():
+        queries = [asyncio.ensure_future(db.run(blocking_query, n)) for n in range(2)]
+        # both queries block their executor threads at the same time, while the event loop keeps running
+        for _ in queries:
+            assert await asyncio.get_running_loop().run_in_executor(None, started.acquire, True, 5)
+        assert not any(query.done() for query in queries)
+        assert db.pool_stats()["queries_in_flight"] == 2
+
+        release.set()
+        assert await asyncio.gather(*queries) == [0, 1]
+        assert db.pool_stats()["queries_in_flight"] == 0
+
+        with pytest.raises(OperationalError):
+            await db.run(failing_query)
+        assert db.pool_stats()["queries_in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_reserved_connections_are_added_to_the_pool_only(monkeypatch):
+    engines = []
+    monkeypatch.setattr(
+        db_connector,
+        "get_db_connection_engine",
+        lambda **kwargs: engines.append(kwargs) or create_engine("postgresql://user@localhost/unused", **kwargs),
+    )
+    database_cfg = load_config_params()["data_provider"]["database"]
+    db = DBConnection(database_cfg, reserved_connections=2)
+
+    stats = db.pool_stats()
+
+    assert engines[0]["max_overflow"] == database_cfg["max_overflow"] + 2
+    assert stats["max_workers"] == database_cfg["pool_size"] + database_cfg["max_overflow"]
+    assert stats["reserved_connections"] == 2
+    db.close_connection()
@@ -0,0 +1,142 @@
+import datetime
+import importlib
+import io
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from crypto_sentiment_demo_app.data_provider.export import (  # noqa: E402
+    EXPORT_SCHEMA,
+    ExportStream,
+    encode_export,
+)
+
+START = datetime.datetime(2022, 5, 1)
+ROWS = [
+    (i, f"title {i}", None if i % 4 == 0 else "src", START + datetime.timedelta(hours=i), 0.1, 0.2, 0.7, i % 3)
+    for i in range(10)
+]
+
+
+def read_export(data, export_format):
+    if export_format == "arrow":
+        return pa.ipc.open_stream(data).read_all()
+    return pq.read_table(io.BytesIO(data))
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+def test_encoded_chunks_round_trip(export_format):
+    encoded = list(encode_export([ROWS[:4], ROWS[4:8], ROWS[8:]], export_format))
+
+    table = read_export(b"".join(encoded), export_format)
+
+    assert len(encoded) == 4  # one piece per chunk, then the end of stream marker or footer
+    assert table.schema == EXPORT_SCHEMA
+    assert [tuple(row.values()) for row in table.to_pylist()] == ROWS
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+def test_empty_export_has_schema(export_format):
+    table = read_export(b"".join(encode_export([], export_format)), export_format)
+
+    assert table.schema == EXPORT_SCHEMA
+    assert table.num_rows == 0
+
+
+def test_export_reads_period_in_chunks_with_server_side_cursor(pg_engine, db_connection):
+    with pg_engine.begin() as conn:
+        for title_id, title, source, pub_time, negative, neutral, positive, predicted_class in ROWS:
+            conn.execute(
+                text("INSERT INTO news_titles VALUES (:id, :title, :source, :pub_time)"),
+                {"id": title_id, "title": title, "source": source, "pub_time": pub_time},
+            )
+            conn.execute(
+                text("INSERT INTO model_predictions VALUES (:id, :negative, :neutral, :positive, :cls)"),
+                {
+                    "id": title_id,
+                    "negative": negative,
+                    "neutral": neutral,
+                    "positive": positive,
+                    "cls": predicted_class,
+                },
+            )
+        conn.execute(text("INSERT INTO news_titles VALUES (10, 'next day', 'src', '2022-05-02 00:00')"))
+        conn.execute(text("INSERT INTO model_predictions (title_id) VALUES (10)"))  # not scored yet
+
+    chunks = list(db_connection.iter_news_export("2022-05-01", "2022-05-02", None, chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [tuple(row) for chunk in chunks for row in chunk] == ROWS
+    assert db_connection.pool_stats()["checked_out"] == 0
+
+    positive = list(db_connection.iter_news_export("2022-05-01", "2022-05-01", "positive", chunk_size=3))
+    assert [row[0] for chunk in positive for row in chunk] == [2, 5, 8]
+
+    with pytest.raises(ValueError):
+        db_connection.iter_news_export("2022-05-01", "yesterday", None, chunk_size=3)
+
+
+@pytest.fixture(scope="module")
+def api():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("HOST", "http://localhost")
+        return importlib.import_module("crypto_sentiment_demo_app.data_provider.api")
+
+
+class BrokenCursorChunks:
+    """Chunks of an export whose server-side cursor fails to close."""
+
+    def __iter__(self):
+        yield ROWS
+
+    def close(self):
+        raise OperationalError("CLOSE partitions", {}, Exception("server closed the connection unexpectedly"))
+
+
+def test_export_slot_is_released_when_closing_the_cursor_fails(api, monkeypatch):
+    monkeypatch.setattr(api.db, "iter_news_export", lambda *args: BrokenCursorChunks())
+    # the startup event isn't run, so that nothing connects to the database
+    client = TestClient(api.app, raise_server_exceptions=False)
+
+    for _ in range(api.max_concurrent_exports + 1):
+        response = client.get("/news/export", params={"format": "parquet"})
+        assert response.status_code == 200
+        assert response.headers["content-disposition"].endswith('.parquet"')
+        assert [tuple(row.values()) for row in read_export(response.content, "parquet").to_pylist()] == ROWS
+
+
+def test_export_stream_closed_while_reading_is_closed_by_the_reading_thread():
+    reading, release = threading.Event(), threading.Event()
+    closed_by = []
+
+    def read_chunks():
+        yield b"first"
+        reading.set()
+        release.wait(timeout=5)
+        yield b"second"
+        yield b"third"
+
+    body = read_chunks()
+    stream = ExportStream(body, on_close=lambda: closed_by.append(threading.current_thread()) or body.close())
+    assert next(stream) == b"first"
+    reader = threading.Thread(target=next, args=(stream,))
+    reader.start()
+    assert reading.wait(timeout=5)
+
+    # the client is gone while the next chunk is read, the generator can't be closed from here
+    stream.close()
+    assert closed_by == []
+
+    release.set()
+    reader.join(timeout=5)
+    assert closed_by == [reader]
+    assert list(stream) == []
+
+    stream.close()
+    assert closed_by == [reader]
@@ -0,0 +1,213 @@
+import asyncio
+import datetime
+import threading
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from crypto_sentiment_demo_app.data_provider.cache import ResponseCache
+from crypto_sentiment_demo_app.data_provider.hot_window import HotWindow
+from crypto_sentiment_demo_app.database.rollups import rebuild_rollups
+from crypto_sentiment_demo_app.model_scorer.model_scorer import ModelScorer
+
+NOW = datetime.datetime.now().replace(microsecond=0)
+N_TITLES = 480  # a title every 30 minutes over the last 10 days
+
+
+def score(pg_engine, title_ids, positive, predicted_class):
+    scorer = ModelScorer(sqlalchemy_engine=pg_engine, model_api_endpoint="", model_classes=[])
+    scorer.write_preds_to_db(
+        pd.DataFrame(
+            {"negative": 0.1, "neutral": 0.9 - positive, "positive": positive, "predicted_class": predicted_class},
+            index=pd.Index(title_ids, name="title_id"),
+        )
+    )
+
+
+@pytest.fixture(scope="module")
+def window(pg_engine, db_connection):
+    with pg_engine.begin() as conn:
+        for title_id in range(N_TITLES + 10):
+            conn.execute(
+                text("INSERT INTO news_titles VALUES (:id, :title, :source, :pub_time)"),
+                {
+                    "id": title_id,
+                    "title": f"title {title_id}",
+                    "source": f"source {title_id % 5}",
+                    "pub_time": NOW - datetime.timedelta(minutes=30 * title_id),
+                },
+            )
+            conn.execute(text("INSERT INTO model_predictions (title_id) VALUES (:id)"), {"id": title_id})
+        # scored before scoring times were recorded
+        conn.execute(text("UPDATE model_predictions SET positive = 0.3, predicted_class = 1 WHERE title_id % 7 = 0"))
+        rebuild_rollups(conn)
+
+    for predicted_class in range(3):
+        title_ids = [i for i in range(N_TITLES) if i % 7 and i % 3 == predicted_class]
+        score(pg_engine, title_ids, positive=0.15 + 0.3 * predicted_class, predicted_class=predicted_class)
+
+    return HotWindow(db_connection, days=3, refresh_seconds=60)
+
+
+def as_tuples(titles):
+    return [(title["title"], title["source"], title["pub_time"], pytest.approx(title["positive"])) for title in titles]
+
+
+@pytest.mark.parametrize("class_name", [None, "positive", "unknown"])
+def test_top_k_is_answered_from_memory_inside_window(window, class_name):
+    hits = window.hits
+    titles = window.get_top_k_news_titles(20, class_name)
+
+    expected = [dict(row._mapping) for row in window.db.get_top_k_news_titles(20, class_name)]
+    assert window.hits == hits + 1
+    assert as_tuples(titles) == as_tuples(expected)
+
+
+def test_last_hours_and_per_day_averages_match_sql(window):
+    for n_hours in (1, 24, 48):
+        assert window.calc_avg_positive_last_n_hours_model_predictions(n_hours) == pytest.approx(
+            window.db.calc_avg_positive_last_n_hours_model_predictions(n_hours)
+        )
+
+    start_date, end_date = (NOW - datetime.timedelta(days=2)).date().isoformat(), NOW.date().isoformat()
+    per_day = window.calc_avg_per_day_positive_model_predictions(start_date, end_date)
+    expected = window.db.calc_avg_per_day_positive_model_predictions(start_date, end_date)
+    assert [(day["pub_date"], pytest.approx(day["avg_positive"])) for day in per_day] == [
+        tuple(row) for row in expected
+    ]
+
+
+def test_queries_reaching_past_window_fall_through_to_sql(window):
+    fallbacks = window.fallbacks
+    old_date = (NOW - datetime.timedelta(days=8)).date().isoformat()
+
+    assert window.get_top_k_news_titles(N_TITLES) == window.db.get_top_k_news_titles(N_TITLES)
+    assert window.calc_avg_positive_last_n_hours_model_predictions(24 * 5) == pytest.approx(
+        window.db.calc_avg_positive_last_n_hours_model_predictions(24 * 5)
+    )
+    assert window.calc_avg_per_day_positive_model_predictions(old_date, old_date) == (
+        window.db.calc_avg_per_day_positive_model_predictions(old_date, old_date)
+    )
+    assert window.fallbacks == fallbacks + 3
+
+
+def test_refresh_merges_newly_scored_and_rescored_titles(pg_engine, window):
+    window.get_top_k_news_titles(1)
+    rows = window.stats()["rows"]
+
+    score(pg_engine, [N_TITLES + 1], positive=0.99, predicted_class=2)  # published before the window
+    score(pg_engine, [1, 2], positive=0.01, predicted_class=0)  # re-scored
+    window.notify()
+
+    negative = window.get_top_k_news_titles(3, "negative")
+    assert [title["title"] for title in negative] == ["title 1", "title 2", "title 3"]
+    assert negative[0]["positive"] == pytest.approx(0.01)
+    assert window.stats()["rows"] == rows
+
+
+class SlowDB:
+    """Serves the window rows from a list, holding refreshes until `release` is set once `block` is."""
+
+    def __init__(self):
+        self.rows = []
+        self.block = threading.Event()
+        self.release = threading.Event()
+        self.refreshing = threading.Event()
+        self.fail = False
+
+    def get_last_scored_at(self):
+        return None
+
+    def get_recent_predictions(self, start, scored_after=None):
+        if self.fail:
+            raise OperationalError("SELECT", {}, Exception("server closed the connection unexpectedly"))
+        if self.block.is_set():
+            self.refreshing.set()
+            self.release.wait(timeout=5)
+        return list(self.rows)
+
+    def get_top_k_news_titles(self, k, class_name=None):
+        return ["from sql"]
+
+
+def add_title(db, title_id):
+    pub_time = NOW - datetime.timedelta(minutes=title_id)
+    db.rows.append((title_id, f"title {title_id}", "src", pub_time, 0.1, 0.2, 0.7, 2))
+
+
+def test_queries_dont_wait_for_a_refresh_in_progress():
+    db = SlowDB()
+    add_title(db, 2)
+    window = HotWindow(db, days=3, refresh_seconds=60)
+
+    # the window is being loaded, queries meanwhile are answered from SQL
+    db.block.set()
+    loading = threading.Thread(target=window.warm_up)
+    loading.start()
+    assert db.refreshing.wait(timeout=5)
+    assert window.get_top_k_news_titles(1) == ["from sql"]
+    db.release.set()
+    loading.join(timeout=5)
+
+    # the window is being refreshed, queries meanwhile are answered from the previous snapshot
+    db.block.clear()
+    assert window.get_top_k_news_titles(1)[0]["title"] == "title 2"
+    add_title(db, 1)
+    window.notify()
+    db.block.set()
+    db.release.clear()
+    db.refreshing.clear()
+    refreshing = threading.Thread(target=window.get_top_k_news_titles, args=(1,))
+    refreshing.start()
+    assert db.refreshing.wait(timeout=5)
+    assert window.get_top_k_news_titles(1)[0]["title"] == "title 2"
+    db.release.set()
+    refreshing.join(timeout=5)
+
+    assert window.get_top_k_news_titles(1)[0]["title"] == "title 1"
+    assert window.stats()["hits"] == 4 and window.stats()["fallbacks"] == 1
+
+
+def test_answers_from_the_previous_snapshot_are_not_cached():
+    db = SlowDB()
+    add_title(db, 2)
+    cache = ResponseCache(ttl_seconds=60, max_entries=10)
+    window = HotWindow(db, days=3, refresh_seconds=60, on_stale_reads=cache.invalidate)
+
+    @cache.cached
+    async def latest_title(k):
+        return window.get_top_k_news_titles(k)[0]["title"]
+
+    assert asyncio.run(latest_title(k=1)) == "title 2"
+    # the scorer commits a newer title, the listener invalidates the cache and marks the window stale
+    add_title(db, 1)
+    cache.invalidate()
+    window.notify()
+    db.block.set()
+    refreshing = threading.Thread(target=window.get_top_k_news_titles, args=(1,))
+    refreshing.start()
+    assert db.refreshing.wait(timeout=5)
+
+    assert asyncio.run(latest_title(k=1)) == "title 2"
+    db.release.set()
+    refreshing.join(timeout=5)
+
+    assert asyncio.run(latest_title(k=1)) == "title 1"
+
+
+def test_failed_refresh_is_retried_by_the_next_query():
+    db = SlowDB()
+    add_title(db, 2)
+    window = HotWindow(db, days=3, refresh_seconds=60)
+    window.get_top_k_news_titles(1)
+
+    add_title(db, 1)
+    window.notify()
+    db.fail = True
+    with pytest.raises(OperationalError):
+        window.get_top_k_news_titles(1)
+
+    db.fail = False
+    assert window.get_top_k_news_titles(1)[0]["title"] == "title 1"
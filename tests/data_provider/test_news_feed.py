@@ -0,0 +1,22 @@
+import datetime
+
+import pytest
+
+from crypto_sentiment_demo_app.data_provider.db_connector import (
+    decode_feed_cursor,
+    encode_feed_cursor,
+)
+
+
+def test_feed_cursor_round_trip():
+    pub_time = datetime.datetime(2022, 5, 1, 12, 30, 15, 123456)
+    cursor = encode_feed_cursor(pub_time, 42)
+
+    assert "=" not in cursor
+    assert decode_feed_cursor(cursor) == (pub_time, 42)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_feed_cursor(datetime.datetime(2022, 5, 1), 1)[:-3], "W10"])
+def test_malformed_feed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_feed_cursor(cursor)
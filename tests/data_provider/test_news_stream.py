@@ -0,0 +1,179 @@
+import asyncio
+import datetime
+import json
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from crypto_sentiment_demo_app.data_provider.news_stream import PredictionsBroadcaster
+from crypto_sentiment_demo_app.model_scorer.model_scorer import (
+    SCORED_AT_LOCK,
+    ModelScorer,
+)
+
+SCORED_AT = datetime.datetime(2022, 5, 1, 12)
+
+
+class FakeDB:
+    """Serves titles scored after the given time from a list, counting the queries."""
+
+    def __init__(self):
+        self.scored = []
+        self.n_queries = 0
+
+    async def run(self, func, *args):
+        self.n_queries += 1
+        return func(*args)
+
+    def get_last_scored_at(self):
+        return max((scored_at for scored_at, _ in self.scored), default=None)
+
+    def get_news_scored_after(self, scored_after, limit):
+        new = sorted((item for item in self.scored if scored_after is None or item[0] > scored_after), reverse=True)
+        return [title for _, title in new[:limit]], new[0][0] if new else scored_after
+
+    def calc_avg_positive_last_n_hours_model_predictions(self, n_hours):
+        return 0.5
+
+
+def make_broadcaster(db, max_queued_events=16):
+    return PredictionsBroadcaster(
+        db,
+        max_titles_per_event=2,
+        rolling_index_hours=24,
+        max_queued_events=max_queued_events,
+        max_subscribers=2,
+        keepalive_seconds=0.01,
+        retry_ms=1000,
+    )
+
+
+def decode(message):
+    event, data = message.strip().split("\n")
+    return event, json.loads(data[len("data: ") :])
+
+
+def test_new_predictions_are_fetched_once_and_fanned_out_to_every_subscriber():
+    async def scenario():
+        db = FakeDB()
+        db.scored.append((SCORED_AT, {"title": "old"}))
+        broadcaster = make_broadcaster(db)
+        subscriptions = [broadcaster.subscribe(), broadcaster.subscribe()]
+        assert broadcaster.subscribe() is None
+
+        await broadcaster.refresh()  # the first refresh only syncs the time of the latest scored title
+        for minutes in (1, 2, 3):
+            db.scored.append((SCORED_AT + datetime.timedelta(minutes=minutes), {"title": f"new {minutes}"}))
+        n_queries = db.n_queries
+        await broadcaster.refresh()
+        await broadcaster.refresh()  # nothing new, nothing published
+
+        assert db.n_queries - n_queries == 3
+        messages = [subscription.queue.get_nowait() for subscription in subscriptions]
+        assert all(subscription.queue.empty() for subscription in subscriptions)
+        assert messages[0] == messages[1]
+        assert decode(messages[0]) == (
+            "event: predictions",
+            {
+                "titles": [{"title": "new 3"}, {"title": "new 2"}],
+                "truncated": True,
+                "avg_positive_last_hours": 0.5,
+                "n_hours": 24,
+            },
+        )
+
+        db.scored.append((SCORED_AT + datetime.timedelta(minutes=4), {"title": "new 4"}))
+        await broadcaster.refresh()
+        event, data = decode(subscriptions[0].queue.get_nowait())
+        assert data["titles"] == [{"title": "new 4"}] and not data["truncated"]
+
+    asyncio.run(scenario())
+
+
+def test_lagging_subscriber_is_disconnected_after_draining_its_queue():
+    async def scenario():
+        broadcaster = make_broadcaster(FakeDB(), max_queued_events=1)
+        subscription = broadcaster.subscribe()
+        broadcaster.publish("predictions", {"n": 1})
+        broadcaster.publish("predictions", {"n": 2})
+
+        messages = [message async for message in broadcaster.stream(subscription)]
+
+        assert messages[0] == "retry: 1000\n\n"
+        assert [decode(message)[1] for message in messages[1:]] == [{"n": 1}]
+        assert broadcaster.stats()["subscribers"] == 0
+        assert broadcaster.stats()["lagging_disconnects"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_news_scored_after_follows_scorer_commits(pg_engine, db_connection):
+    with pg_engine.begin() as conn:
+        for title_id in range(3):
+            conn.execute(
+                text("INSERT INTO news_titles VALUES (:id, :title, 'src', :pub_time)"),
+                {"id": title_id, "title": f"title {title_id}", "pub_time": SCORED_AT},
+            )
+            conn.execute(text("INSERT INTO model_predictions (title_id) VALUES (:id)"), {"id": title_id})
+
+    scorer = ModelScorer(sqlalchemy_engine=pg_engine, model_api_endpoint="", model_classes=[])
+
+    def score(title_ids):
+        scorer.write_preds_to_db(
+            pd.DataFrame(
+                {"negative": 0.1, "neutral": 0.2, "positive": 0.7, "predicted_class": 2},
+                index=pd.Index(title_ids, name="title_id"),
+            )
+        )
+
+    assert db_connection.get_last_scored_at() is None
+    score([0])
+    last_scored_at = db_connection.get_last_scored_at()
+
+    score([1, 2])
+    titles, new_last_scored_at = db_connection.get_news_scored_after(last_scored_at, 10)
+
+    assert [title["title_id"] for title in titles] == [2, 1]
+    assert new_last_scored_at > last_scored_at
+    assert db_connection.get_news_scored_after(new_last_scored_at, 10) == ([], new_last_scored_at)
+
+
+def test_batch_waiting_for_a_slower_writer_is_scored_after_its_commit(pg_engine, db_connection):
+    with pg_engine.begin() as conn:
+        for title_id in range(10, 12):
+            conn.execute(
+                text("INSERT INTO news_titles VALUES (:id, :title, 'src', :pub_time)"),
+                {"id": title_id, "title": f"title {title_id}", "pub_time": SCORED_AT},
+            )
+            conn.execute(text("INSERT INTO model_predictions (title_id) VALUES (:id)"), {"id": title_id})
+
+    scorer = ModelScorer(sqlalchemy_engine=pg_engine, model_api_endpoint="", model_classes=[])
+    predictions = pd.DataFrame(
+        {"negative": 0.1, "neutral": 0.2, "positive": 0.7, "predicted_class": 2},
+        index=pd.Index([11], name="title_id"),
+    )
+
+    with pg_engine.connect() as slow_writer:
+        transaction = slow_writer.begin()
+        slow_writer.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {"lock": SCORED_AT_LOCK})
+        scorer_thread = threading.Thread(target=scorer.write_preds_to_db, args=(predictions,))
+        scorer_thread.start()
+        # the scorer transaction starts before the slow writer stamps and commits its prediction
+        deadline = time.monotonic() + 5
+        while not slow_writer.execute(text("SELECT count(*) FROM pg_locks WHERE NOT granted")).scalar():
+            assert time.monotonic() < deadline, "the scorer didn't wait for the slow writer"
+            time.sleep(0.01)
+        slow_scored_at = slow_writer.execute(
+            text(
+                "UPDATE model_predictions SET scored_at = timezone('UTC', clock_timestamp()) "
+                "WHERE title_id = 10 RETURNING scored_at"
+            )
+        ).scalar()
+        transaction.commit()
+    scorer_thread.join(timeout=5)
+
+    # a reader that saw the slow writer commit must still get the scorer batch committed after it
+    titles, _ = db_connection.get_news_scored_after(slow_scored_at, 10)
+    assert [title["title_id"] for title in titles] == [11]
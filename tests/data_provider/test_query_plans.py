@@ -0,0 +1,76 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+N_TITLES = 1_000_000
+
+SEED_QUERIES = [
+    f"""
+    INSERT INTO news_titles
+    SELECT i, 'title ' || i, 'source ' || i % 50, timestamp '2020-01-01' + i * interval '1 minute'
+    FROM   generate_series(1, {N_TITLES}) i
+    """,
+    f"""
+    INSERT INTO model_predictions (title_id, negative, neutral, positive, predicted_class)
+    SELECT i, 0.2, 0.3, 0.5, CASE WHEN i % 1000 = 0 THEN NULL ELSE i % 3 END
+    FROM   generate_series(1, {N_TITLES}) i
+    """,
+    "ANALYZE",
+]
+
+
+@pytest.fixture(scope="module")
+def seeded_db(pg_engine, db_connection):
+    with pg_engine.begin() as conn:
+        for query in SEED_QUERIES:
+            conn.execute(text(query))
+
+    return db_connection
+
+
+def explain(db, query):
+    """Return (node type, index name, scan direction) of every node of the query plan."""
+    compiled = query.compile(dialect=db.engine.dialect) if not isinstance(query, str) else None
+    with db.engine.connect() as conn:
+        if compiled is None:
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}").scalar()
+        else:
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+
+    nodes, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append((node["Node Type"], node.get("Index Name"), node.get("Scan Direction")))
+        stack.extend(node.get("Plans", []))
+
+    return nodes
+
+
+@pytest.mark.parametrize("class_name", [None, "positive"])
+def test_top_k_news_titles_scans_pub_time_index_without_sorting(seeded_db, class_name):
+    nodes = explain(seeded_db, seeded_db.top_k_news_titles_query(10, class_name))
+
+    assert ("Index Scan", "news_titles_pub_time_idx", "Backward") in nodes
+    assert all(node_type not in ("Sort", "Seq Scan") for node_type, _, _ in nodes)
+
+
+def test_last_n_hours_filter_uses_pub_time_index(seeded_db):
+    nodes = explain(seeded_db, seeded_db.avg_positive_last_n_hours_query(24))
+
+    assert any(index_name == "news_titles_pub_time_idx" for _, index_name, _ in nodes)
+    assert all(node_type != "Seq Scan" for node_type, _, _ in nodes)
+
+
+def test_unscored_titles_lookup_uses_predicted_class_index(seeded_db):
+    nodes = explain(seeded_db, "SELECT title_id FROM model_predictions WHERE predicted_class IS NULL")
+
+    assert any(index_name == "model_predictions_predicted_class_idx" for _, index_name, _ in nodes)
+
+
+def test_deep_news_feed_page_seeks_pub_time_index(seeded_db):
+    deep_cursor = (datetime.datetime(2020, 1, 2), 1440)
+    nodes = explain(seeded_db, seeded_db.news_feed_query(21, "neutral", deep_cursor))
+
+    assert ("Index Scan", "news_titles_pub_time_idx", "Backward") in nodes
+    assert all(node_type not in ("Sort", "Seq Scan") for node_type, _, _ in nodes)
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from crypto_sentiment_demo_app.data_provider.cache import ResponseCache
+
+
+class TestResponseCache:
+    def test_caches_responses_by_endpoint_parameters(self):
+        cache = ResponseCache(ttl_seconds=60, max_entries=10)
+        app = FastAPI()
+        calls = []
+
+        @app.get("/average")
+        @cache.cached
+        async def average(n: int = 24):
+            calls.append(n)
+            return n / 2
+
+        with TestClient(app) as client:
+            assert client.get("/average", params={"n": 4}).json() == 2
+            assert client.get("/average", params={"n": 4}).json() == 2
+            assert client.get("/average").json() == 12
+            assert client.get("/average", params={"n": "x"}).status_code == 422
+
+        assert calls == [4, 24]
+        assert cache.stats()["hits"] == 1
+
+    def test_invalidation_and_ttl(self):
+        cache = ResponseCache(ttl_seconds=0.05, max_entries=10)
+        cache.put("key", None, cache.version)
+        assert cache.get("key") == (True, None)
+
+        cache.invalidate()
+        assert cache.get("key") == (False, None)
+
+        cache.put("key", 1, cache.version)
+        time.sleep(0.1)
+        assert cache.get("key") == (False, None)
+        assert cache.stats()["expirations"] == 1
+
+    def test_response_computed_during_invalidation_is_not_stored(self):
+        cache = ResponseCache(ttl_seconds=60, max_entries=10)
+
+        @cache.cached
+        async def top_k_news_titles(k: int):
+            cache.invalidate()  # new predictions committed while the query runs
+            return ["stale"]
+
+        assert asyncio.run(top_k_news_titles(k=10)) == ["stale"]
+        assert cache.stats()["entries"] == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(ttl_seconds=60, max_entries=2)
+        for key in ("a", "b"):
+            cache.put(key, key, cache.version)
+        cache.get("a")
+        cache.put("c", "c", cache.version)
+
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, "a")
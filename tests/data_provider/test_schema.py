@@ -0,0 +1,37 @@
+from sqlalchemy import MetaData, inspect
+
+from crypto_sentiment_demo_app.data_provider import db_connector
+from crypto_sentiment_demo_app.data_provider.db_connector import DBConnection
+from crypto_sentiment_demo_app.database import schema
+from crypto_sentiment_demo_app.utils import load_config_params
+
+
+def test_db_connection_connects_on_first_use(monkeypatch):
+    engines = []
+    monkeypatch.setattr(db_connector, "get_db_connection_engine", lambda **kwargs: engines.append(kwargs) or object())
+
+    db = DBConnection(load_config_params()["data_provider"]["database"])
+    assert engines == []
+    assert db.rollup_tables[24 * 60 * 60] is schema.sentiment_rollup_daily
+
+    assert db.engine is db.engine
+    assert len(engines) == 1 and engines[0]["pool_size"] == db.database_cfg["pool_size"]
+    db.executor.shutdown()
+
+
+def test_schema_matches_migrated_database(pg_engine):
+    reflected = MetaData()
+    reflected.reflect(bind=pg_engine)
+    inspector = inspect(pg_engine)
+
+    assert set(reflected.tables) - {"schema_migrations"} == set(schema.metadata.tables)
+    for name, table in schema.metadata.tables.items():
+        db_table = reflected.tables[name]
+        assert [column.name for column in table.columns] == [column.name for column in db_table.columns]
+        for column in table.columns:
+            db_column = db_table.columns[column.name]
+            assert column.type.compile(pg_engine.dialect) == db_column.type.compile(pg_engine.dialect), column
+            assert column.nullable == db_column.nullable, column
+            assert column.primary_key == db_column.primary_key, column
+        indexes = {index["name"]: index["column_names"] for index in inspector.get_indexes(name)}
+        assert {index.name: [column.name for column in index.columns] for index in table.indexes} == indexes
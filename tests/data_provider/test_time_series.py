@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+from crypto_sentiment_demo_app.data_provider.db_connector import parse_bucket_size
+from crypto_sentiment_demo_app.database.rollups import rebuild_rollups
+
+START = datetime.datetime(2022, 5, 1)
+# a title every 7 minutes over 3 days, every 10th one not scored yet
+TITLES = [
+    (i, START + datetime.timedelta(minutes=7 * i), None if i % 10 == 0 else (i % 7) / 7, i % 3) for i in range(620)
+]
+
+
+@pytest.fixture(scope="module")
+def seeded_db(pg_engine, db_connection):
+    with pg_engine.begin() as conn:
+        for title_id, pub_time, positive, predicted_class in TITLES:
+            conn.execute(
+                text("INSERT INTO news_titles VALUES (:id, 'title', 'src', :pub_time)"),
+                {"id": title_id, "pub_time": pub_time},
+            )
+            conn.execute(
+                text("INSERT INTO model_predictions (title_id, positive, predicted_class) VALUES (:id, :pos, :cls)"),
+                {"id": title_id, "pos": positive, "cls": None if positive is None else predicted_class},
+            )
+        rebuild_rollups(conn)
+
+    return db_connection
+
+
+def floor_to_bucket(timestamp, bucket_seconds):
+    epoch = int(timestamp.replace(tzinfo=datetime.timezone.utc).timestamp())
+    return datetime.datetime.utcfromtimestamp(epoch - epoch % bucket_seconds)
+
+
+def expected_series(bucket_seconds, start, end):
+    """Aggregate the titles directly into the buckets overlapping the [start, end) range."""
+    buckets = {}
+    for _, pub_time, positive, predicted_class in TITLES:
+        bucket_start = floor_to_bucket(pub_time, bucket_seconds)
+        if positive is None or not floor_to_bucket(start, bucket_seconds) <= bucket_start < end:
+            continue
+        buckets.setdefault(bucket_start, []).append((positive, predicted_class))
+
+    return [
+        (
+            bucket_start,
+            len(scores),
+            pytest.approx(sum(positive for positive, _ in scores) / len(scores)),
+            pytest.approx([sum(cls == i for _, cls in scores) / len(scores) for i in range(3)]),
+        )
+        for bucket_start, scores in sorted(buckets.items())
+    ]
+
+
+@pytest.mark.parametrize("bucket", ["5m", "15m", "1h", "6h", "1d"])
+def test_time_series_merged_from_rollups_matches_direct_aggregation(seeded_db, bucket):
+    bucket_seconds = parse_bucket_size(bucket)
+    start, end = datetime.datetime(2022, 5, 1, 6), datetime.datetime(2022, 5, 3, 18)
+
+    series = seeded_db.get_sentiment_time_series(bucket, start, end, max_buckets=10000)
+
+    assert [
+        (
+            item["bucket_start"],
+            item["n_scored"],
+            item["avg_positive"],
+            [item["class_distribution"][name] for name in ("negative", "neutral", "positive")],
+        )
+        for item in series
+    ] == expected_series(bucket_seconds, start, end)
+
+
+def test_time_series_reads_coarsest_rollup_dividing_bucket_size(seeded_db):
+    def rollup_table(bucket):
+        query = seeded_db.sentiment_time_series_query(parse_bucket_size(bucket), START, START)
+        return {table.name for table in query.get_final_froms()}
+
+    assert rollup_table("15m") == {"sentiment_rollup_5min"}
+    assert rollup_table("2h") == {"sentiment_rollup_hourly"}
+    assert rollup_table("7d") == {"sentiment_rollup_daily"}
+
+
+def test_time_series_widens_range_to_whole_buckets_and_limits_their_number(seeded_db):
+    minutes = datetime.timedelta(minutes=1)
+    series = seeded_db.get_sentiment_time_series("1h", START + 10 * minutes, START + 30 * minutes, 10)
+    assert [item["bucket_start"] for item in series] == [START]
+    assert series[0]["n_scored"] == len([title for title in TITLES[:9] if title[2] is not None])
+
+    aware_start = datetime.datetime(2022, 5, 1, 2, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+    assert seeded_db.get_sentiment_time_series("1h", aware_start, START + 60 * minutes, 10) == series
+
+    with pytest.raises(ValueError):
+        seeded_db.get_sentiment_time_series("5m", START, START + datetime.timedelta(days=1), 100)
+
+
+@pytest.mark.parametrize("bucket", ["", "m", "0m", "7m", "1.5h", "-5m", "1w"])
+def test_invalid_bucket_size_raises_value_error(bucket):
+    with pytest.raises(ValueError):
+        parse_bucket_size(bucket)
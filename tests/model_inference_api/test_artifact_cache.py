@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+from mlflow.exceptions import MlflowException
+
+from crypto_sentiment_demo_app.models.inference import base
+from crypto_sentiment_demo_app.models.inference.artifact_cache import ModelArtifactCache
+
+
+class FakeClient:
+    def __init__(self, versions):
+        self.versions = versions
+        self.calls = 0
+
+    def get_latest_versions(self, name):
+        self.calls += 1
+        if self.versions is None:
+            raise MlflowException("registry is unreachable")
+        return [SimpleNamespace(version=version) for version in self.versions]
+
+
+class TestModelArtifactCache:
+    def test_put_get_and_verify(self, tmp_path):
+        model_path = tmp_path / "model.onnx"
+        model_path.write_bytes(b"onnx bytes")
+        cache = ModelArtifactCache(str(tmp_path / "cache"), latest_ttl_seconds=60)
+
+        assert cache.get("bert", "3") is None
+        cached_path = cache.put("bert", "3", model_path, "models:/bert/3")
+
+        assert cache.get("bert", "3") == cached_path
+        assert cached_path.read_bytes() == b"onnx bytes"
+        assert [manifest["ok"] for manifest in cache.verify()] == [True]
+
+        cached_path.write_bytes(b"corrupted")
+        assert cache.get("bert", "3") is None
+        assert [manifest["ok"] for manifest in cache.verify()] == [False]
+
+    def test_latest_is_resolved_once_per_ttl_and_survives_registry_outage(self, tmp_path):
+        cache = ModelArtifactCache(str(tmp_path), latest_ttl_seconds=60)
+        client = FakeClient(["2", "10"])
+
+        assert cache.resolve_version("bert", "latest", client) == "10"
+        assert cache.resolve_version("bert", "latest", client) == "10"
+        assert client.calls == 1
+        assert cache.resolve_version("bert", 7, client) == "7"
+
+        expired_cache = ModelArtifactCache(str(tmp_path), latest_ttl_seconds=0)
+        assert expired_cache.resolve_version("bert", "latest", FakeClient(None)) == "10"
+
+        with pytest.raises(MlflowException):
+            expired_cache.resolve_version("tf_idf", "latest", FakeClient(None))
+
+
+def test_registered_model_without_onnx_file_fails_clearly(tmp_path, monkeypatch):
+    def download_artifacts(artifact_uri, dst_path):
+        (tmp_path / "artifacts").mkdir()
+        (tmp_path / "artifacts" / "MLmodel").write_text("flavors: {}")
+        return str(tmp_path / "artifacts")
+
+    monkeypatch.setattr(base, "MlflowClient", lambda: FakeClient(["1"]))
+    monkeypatch.setattr(base, "download_artifacts", download_artifacts)
+    cache = ModelArtifactCache(str(tmp_path / "cache"), latest_ttl_seconds=60)
+
+    with pytest.raises(FileNotFoundError, match="models:/bert/1 has no .onnx file"):
+        base.load_mlflow_model("bert", "1", cache)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from crypto_sentiment_demo_app.models.inference.bert import BertInference
+
+CLASS_NAMES = ["Negative", "Neutral", "Positive"]
+
+
+def tokenize(input_texts):
+    input_ids = [[ord(char) for char in text] for text in input_texts]
+    return {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]}
+
+
+def pad(encodings):
+    max_length = max(len(ids) for ids in encodings["input_ids"])
+    return {
+        key: np.array([values + [0] * (max_length - len(values)) for values in rows])
+        for key, rows in encodings.items()
+    }
+
+
+class FakeSession:
+    """Logits depend on the unpadded tokens only, so padding a title to a longer one doesn't change them."""
+
+    def __init__(self):
+        self.batch_lengths = []
+
+    def __call__(self, input_data):
+        ids, mask = input_data["input_ids"], input_data["attention_mask"]
+        self.batch_lengths.append(mask.sum(axis=1).tolist())
+        n_tokens = mask.sum(axis=1)
+        logits = np.stack([(ids * mask).sum(axis=1) / n_tokens / 50, n_tokens / 10, np.ones(len(ids))], axis=1)
+        return [logits.astype(np.float32)]
+
+
+def make_model(batch_size):
+    model = BertInference.__new__(BertInference)
+    model.phase_observer = None
+    model.model_name = "bert"
+    model.class_names = CLASS_NAMES
+    model.inference_cfg = {"batch_size": batch_size, "max_length": 64}
+    model.tokenizer, model.pad = tokenize, pad
+    model.session = FakeSession()
+    return model
+
+
+def test_length_sorted_batches_keep_input_order():
+    titles = ["Bitcoin " * (n % 7 + 1) + chr(ord("a") + n) for n in range(11)]
+    model = make_model(batch_size=4)
+
+    predictions = model.predict_batch(titles)
+
+    batches = model.session.batch_lengths
+    assert [len(lengths) for lengths in batches] == [4, 4, 3]
+    flat_lengths = [length for lengths in batches for length in lengths]
+    assert flat_lengths == sorted(len(title) for title in titles)
+
+    for title, prediction in zip(titles, predictions):
+        assert list(prediction) == CLASS_NAMES
+        np.testing.assert_allclose(list(prediction.values()), list(model.predict(title).values()), rtol=1e-6)
+    assert len({tuple(prediction.values()) for prediction in predictions}) == len(titles)
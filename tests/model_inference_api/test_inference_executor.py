@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from crypto_sentiment_demo_app.model_inference_api.api.executor import (
+    InferenceExecutor,
+    InferenceQueueFull,
+    InferenceQueueTimeout,
+)
+
+
+def run_concurrently(executor, func, n_requests):
+    async def main():
+        return await asyncio.gather(*(executor.run(func) for _ in range(n_requests)), return_exceptions=True)
+
+    return asyncio.run(main())
+
+
+class TestInferenceExecutor:
+    def test_rejects_requests_above_queue_size(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, queue_timeout_seconds=10)
+        release = threading.Event()
+
+        def predict():
+            release.wait(1)
+            return "ok"
+
+        threading.Timer(0.2, release.set).start()
+        results = run_concurrently(executor, predict, 3)
+
+        assert results[:2] == ["ok", "ok"]
+        assert isinstance(results[2], InferenceQueueFull)
+
+        stats = executor.stats()
+        assert (stats["completed"], stats["rejected"], stats["in_flight"]) == (2, 1, 0)
+        assert stats["wait_seconds"]["max"] > 0.1
+
+    def test_drops_requests_waiting_too_long(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=4, queue_timeout_seconds=0.05)
+
+        results = run_concurrently(executor, lambda: threading.Event().wait(0.1), 2)
+
+        assert results[0] is False
+        assert isinstance(results[1], InferenceQueueTimeout)
+        assert executor.stats()["timed_out"] == 1
+
+    def test_propagates_model_errors(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, queue_timeout_seconds=1)
+
+        def predict():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(executor.run(predict))
+        assert executor.stats()["failed"] == 1
+
+    def test_cancelled_requests_count_until_their_work_is_done(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=0, queue_timeout_seconds=10)
+        release = threading.Event()
+
+        async def main():
+            request = asyncio.ensure_future(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            request.cancel()
+            await asyncio.gather(request, return_exceptions=True)
+
+            # the worker is still busy with the cancelled request, so there's no room for another one
+            assert executor.stats()["in_flight"] == 1
+            with pytest.raises(InferenceQueueFull):
+                await executor.run(lambda: "ok")
+
+            release.set()
+            while executor.stats()["in_flight"]:
+                await asyncio.sleep(0.01)
+            return await executor.run(lambda: "ok")
+
+        assert asyncio.run(main()) == "ok"
+        assert executor.stats()["in_flight"] == 0
@@ -0,0 +1,48 @@
+import pytest
+
+from crypto_sentiment_demo_app.model_inference_api.load_test import (
+    compare_reports,
+    summarize_latencies,
+)
+
+THRESHOLDS = {"throughput": 0.1, "latency_p95": 0.2, "error_rate": 0.01}
+
+
+def make_result(throughput, p95, error_rate=0.0, batch_size=1):
+    return {
+        "model": "tf_idf",
+        "concurrency": 4,
+        "batch_size": batch_size,
+        "throughput": throughput,
+        "latency_ms": {"p50": 1.0, "p95": p95, "p99": p95},
+        "error_rate": error_rate,
+    }
+
+
+class TestLoadTest:
+    def test_summarize_latencies(self):
+        summary = summarize_latencies([i / 1000 for i in range(1, 101)])
+
+        assert summary["p50"] == pytest.approx(50.5)
+        assert summary["p99"] == pytest.approx(99.01)
+        assert summary["max"] == pytest.approx(100.0)
+        assert summarize_latencies([])["p95"] == 0.0
+
+    def test_compare_reports_flags_regressions_above_thresholds(self):
+        baseline = {"results": [make_result(100.0, 10.0), make_result(50.0, 20.0, batch_size=8)]}
+        candidate = {
+            "results": [
+                make_result(95.0, 11.0),  # within thresholds
+                make_result(40.0, 30.0, error_rate=0.05, batch_size=8),
+                make_result(1.0, 1000.0, batch_size=32),  # not in the baseline
+            ]
+        }
+
+        regressions = compare_reports(baseline, candidate, THRESHOLDS)
+
+        assert {(r["batch_size"], r["metric"]) for r in regressions} == {
+            (8, "throughput"),
+            (8, "latency_p95"),
+            (8, "error_rate"),
+        }
+        assert compare_reports(baseline, baseline, THRESHOLDS) == []
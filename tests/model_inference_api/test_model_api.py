@@ -0,0 +1,129 @@
+import asyncio
+import importlib
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+CLASS_NAMES = ["Negative", "Neutral", "Positive"]
+
+
+class FakeModel:
+    model_name = "fake"
+    model_version = "1"
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, input_texts):
+        self.batches.append(list(input_texts))
+        return [{"Negative": 0.1, "Neutral": 0.2, "Positive": 0.7} for _ in input_texts]
+
+
+@pytest.fixture(scope="module")
+def api():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("HOST", "http://localhost")
+        return importlib.import_module("crypto_sentiment_demo_app.model_inference_api.api.model")
+
+
+@pytest.fixture
+def client(api):
+    # the startup event isn't run, so that no model gets loaded
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def ready_model(api, monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(api.model_manager.primary, "model", model)
+    monkeypatch.setattr(api.model_manager.primary, "state", "ready")
+    monkeypatch.setattr(api, "prediction_cache", None)
+    return model
+
+
+def test_probes_and_classify_before_model_is_ready(client):
+    assert client.get("/health/live").status_code == 200
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["state"] == "pending"
+
+    response = client.post("/classify", json={"title": "BTC drops by 10% this Friday"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+def test_probes_and_classify_once_model_is_ready(client, ready_model):
+    assert client.get("/health/ready").status_code == 200
+
+    response = client.post("/classify", json={"title": "BTC drops by 10% this Friday"})
+    assert response.status_code == 200
+    assert response.json()["predicted_class"] == 2
+    assert ready_model.batches == [["BTC drops by 10% this Friday"]]
+
+
+def test_parse_stream_line(api):
+    assert api.parse_stream_line(b'"BTC is up"\n', "title") == {"title": "BTC is up"}
+    assert api.parse_stream_line(b'{"title": "BTC is up", "id": 7}', "title") == {"title": "BTC is up", "id": 7}
+
+    for line in [b"{not json", b"42", b'{"id": 1}', b'{"title": null}']:
+        with pytest.raises(ValueError):
+            api.parse_stream_line(line, "title")
+
+
+def test_predict_stream_batch_skips_errors(api, ready_model):
+    items = [{"line": 1, "title": "a", "id": 1}, {"line": 2, "error": "bad line"}, {"line": 3, "title": "b"}]
+
+    records = [json.loads(line) for line in asyncio.run(api.predict_stream_batch(ready_model, items)).splitlines()]
+
+    assert ready_model.batches == [["a", "b"]]
+    assert [record["line"] for record in records] == [1, 2, 3]
+    assert records[0]["id"] == 1 and records[0]["predicted_class"] == 2 and records[0]["model_version"] == "1"
+    assert records[1] == {"line": 2, "error": "bad line"}
+    assert records[2]["id"] is None
+
+
+def test_classify_stream_round_trip(api, client, ready_model, monkeypatch):
+    monkeypatch.setitem(api.params["inference_api"]["stream"], "micro_batch_size", 2)
+    lines = ['{"title": "t1", "id": "a"}', '"t2"', "", "{not json", '{"title": "t3"}', '"t4"', '"t5"']
+    body = "\n".join(lines) + "\n"
+
+    response = client.post("/classify_stream", data=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["line"] for record in records] == [1, 2, 4, 5, 6, 7]
+    assert [record.get("id") for record in records] == ["a", None, None, None, None, None]
+    assert "error" in records[2] and "predicted_class" not in records[2]
+    assert all(record["predicted_class"] == 2 for record in records if "error" not in record)
+    # the malformed line fills a micro-batch slot without being scored
+    assert ready_model.batches == [["t1", "t2"], ["t3"], ["t4", "t5"]]
+
+
+def test_classify_stream_before_model_is_ready(client):
+    response = client.post("/classify_stream", data='"BTC is up"\n')
+    assert response.status_code == 503
+
+
+def test_admin_endpoints_are_disabled_without_admin_token(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+    response = client.get("/admin/models", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.get("/admin/models", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/models", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_admin_load_rejects_invalid_model_version(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+
+    response = client.post(
+        "/admin/models",
+        json={"model": "bert", "version": "latest hydra.run.dir=/tmp"},
+        headers={"X-Admin-Token": "secret"},
+    )
+    assert response.status_code == 422
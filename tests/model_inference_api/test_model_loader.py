@@ -0,0 +1,58 @@
+import threading
+
+from crypto_sentiment_demo_app.model_inference_api.api import loader as loader_module
+from crypto_sentiment_demo_app.model_inference_api.api.loader import ModelLoader
+
+PARAMS = {"hydra": {"runtime": {"choices": {"model": "bert"}}}}
+
+
+class FakeModel:
+    model_name = "fake"
+    model_version = "1"
+    phase_observer = None
+
+    def __init__(self):
+        self.warmed_up = False
+
+    def warmup(self):
+        self.warmed_up = True
+
+
+def test_background_load_goes_from_loading_to_ready(monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+    model = FakeModel()
+
+    def load_model(params):
+        entered.set()
+        release.wait(5)
+        return model
+
+    monkeypatch.setattr(loader_module, "load_model", load_model)
+    loader = ModelLoader(PARAMS)
+    assert loader.state == "pending"
+
+    loader.start()
+    try:
+        assert entered.wait(5)
+        assert loader.state == "loading" and not loader.is_ready
+    finally:
+        release.set()
+    loader.join(5)
+
+    assert loader.is_ready and loader.model is model and model.warmed_up
+    status = loader.status()
+    assert status["state"] == "ready" and status["model_version"] == "1" and status["error"] is None
+    assert set(status["timings"]) == {"load_seconds", "warmup_seconds", "total_seconds"}
+
+
+def test_background_load_failure_is_reported(monkeypatch):
+    def load_model(params):
+        raise FileNotFoundError("no model file")
+
+    monkeypatch.setattr(loader_module, "load_model", load_model)
+    loader = ModelLoader(PARAMS)
+    loader.start()
+    loader.join(5)
+
+    assert loader.state == "failed" and loader.model is None
+    assert "no model file" in loader.status()["error"]
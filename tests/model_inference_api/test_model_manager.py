@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from crypto_sentiment_demo_app.model_inference_api.api.executor import InferenceExecutor
+from crypto_sentiment_demo_app.model_inference_api.api.loader import ModelLoader
+from crypto_sentiment_demo_app.model_inference_api.api.manager import ModelManager
+
+CLASS_NAMES = ["Negative", "Neutral", "Positive"]
+
+
+class FakeModel:
+    model_name = "fake"
+    model_version = "1"
+
+    def __init__(self, predicted_class):
+        self.predicted_class = predicted_class
+
+    def predict_batch(self, input_texts):
+        return [{name: float(name == self.predicted_class) for name in CLASS_NAMES} for _ in input_texts]
+
+
+def make_params(model_choice):
+    return {
+        "hydra": {"runtime": {"choices": {"model": model_choice}}},
+        "model": {"version": "latest"},
+        "data": {"class_names": CLASS_NAMES},
+        "inference_api": {"hosting": {"preload_models": [], "shadow_queue_size": 4}},
+    }
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=4, queue_timeout_seconds=10)
+    yield executor
+    executor.shutdown()
+
+
+def host_ready_model(manager, model_choice, predicted_class):
+    loader = ModelLoader(make_params(model_choice), key=f"{model_choice}:latest")
+    loader.model, loader.state = FakeModel(predicted_class), "ready"
+    manager._loaders[loader.key] = loader
+    return loader
+
+
+class TestModelManager:
+    def test_swap_requires_ready_model(self, executor):
+        manager = ModelManager(make_params("bert"), executor)
+        assert manager.primary.key == "bert:latest"
+
+        with pytest.raises(KeyError):
+            manager.set_primary("tf_idf:latest")
+
+        loader = host_ready_model(manager, "tf_idf", "Positive")
+        loader.state = "loading"
+        with pytest.raises(ValueError):
+            manager.set_primary("tf_idf:latest")
+
+        loader.state = "ready"
+        manager.set_primary("tf_idf:latest")
+        assert manager.primary is loader
+
+        with pytest.raises(ValueError):
+            manager.unload("tf_idf:latest")
+        manager.unload("bert:latest")
+        assert [model["key"] for model in manager.status()["models"]] == ["tf_idf:latest"]
+
+    @pytest.mark.parametrize(
+        "model_choice, model_version",
+        [("gpt", "latest"), ("bert", "1,2"), ("bert", "latest model=tf_idf"), ("bert", "0"), ("bert", "x=y")],
+    )
+    def test_load_rejects_unknown_models_and_versions(self, executor, model_choice, model_version):
+        manager = ModelManager(make_params("bert"), executor)
+
+        with pytest.raises(ValueError):
+            manager.load(model_choice, model_version)
+        assert [model["key"] for model in manager.status()["models"]] == ["bert:latest"]
+
+    def test_shadow_scoring_counts_disagreement(self, executor, caplog):
+        manager = ModelManager(make_params("bert"), executor)
+        host_ready_model(manager, "tf_idf", "Positive")
+        manager.set_shadow("tf_idf:latest", fraction=1.0)
+
+        # hold the shadow worker, so that the primary model is swapped before the comparison is logged
+        release = threading.Event()
+        executor.submit(release.wait, 5)
+
+        primary_predictions = FakeModel("Positive").predict_batch(["a"]) + FakeModel("Negative").predict_batch(["b"])
+        manager.maybe_shadow_score(["a", "b"], primary_predictions, "bert:latest")
+        # the request handler goes on formatting its predictions in place
+        for prediction in primary_predictions:
+            prediction.clear()
+        loader = ModelLoader(make_params("bert"), key="bert:3")
+        loader.model, loader.state = FakeModel("Neutral"), "ready"
+        manager._loaders[loader.key] = loader
+        manager.set_primary("bert:3")
+        release.set()
+        executor.submit(lambda: None).result(timeout=5)
+
+        shadow = manager.status()["shadow"]
+        assert (shadow["compared"], shadow["disagreed"], shadow["failed"]) == (2, 1, 0)
+        assert shadow["disagreement_rate"] == 0.5
+        assert "disagreed with bert:latest on 1/2 titles" in caplog.text
+
+    def test_shadow_scoring_is_skipped_when_executor_is_full(self, caplog):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, queue_timeout_seconds=10)
+        manager = ModelManager(make_params("bert"), executor)
+        host_ready_model(manager, "tf_idf", "Positive")
+        manager.set_shadow("tf_idf:latest", fraction=1.0)
+
+        release = threading.Event()
+        executor.submit(release.wait, 5)
+        executor.submit(lambda: None)
+
+        manager.maybe_shadow_score(["a"], FakeModel("Negative").predict_batch(["a"]), "bert:latest")
+        release.set()
+        executor.shutdown()
+
+        shadow = manager.status()["shadow"]
+        assert (shadow["compared"], shadow["skipped"], shadow["failed"]) == (0, 1, 0)
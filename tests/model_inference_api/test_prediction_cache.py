@@ -0,0 +1,77 @@
+from crypto_sentiment_demo_app.model_inference_api.api.cache import (
+    PredictionCache,
+    predict_with_cache,
+)
+
+
+class FakeModel:
+    model_name = "fake"
+    model_version = "1"
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_batch(self, input_texts):
+        self.calls.append(list(input_texts))
+        return [{"Positive": float(len(text))} for text in input_texts]
+
+
+class TestPredictionCache:
+    def test_hits_skip_model_and_keep_order(self):
+        model = FakeModel()
+        cache = PredictionCache(max_entries=10, max_memory_mb=1, ttl_seconds=60)
+
+        predict_with_cache(model, cache, ["a", "bb"])
+        preds = predict_with_cache(model, cache, ["bb", "a", "ccc", "ccc"])
+
+        assert model.calls == [["a", "bb"], ["ccc"]]
+        assert [pred["Positive"] for pred in preds] == [2.0, 1.0, 3.0, 3.0]
+        assert cache.stats()["hits"] == 2
+
+    def test_texts_differing_in_case_or_whitespace_are_scored_separately(self):
+        model = FakeModel()
+        cache = PredictionCache(max_entries=10, max_memory_mb=1, ttl_seconds=60)
+
+        predict_with_cache(model, cache, ["a"])
+        preds = predict_with_cache(model, cache, ["  A ", "A", "a"])
+
+        assert model.calls == [["a"], ["  A ", "A"]]
+        assert [pred["Positive"] for pred in preds] == [4.0, 1.0, 1.0]
+
+    def test_texts_with_lone_surrogates_are_cached(self):
+        model = FakeModel()
+        cache = PredictionCache(max_entries=10, max_memory_mb=1, ttl_seconds=60)
+
+        # json.loads('"\\ud83d"') gives such texts, they can't be encoded to UTF-8
+        predict_with_cache(model, cache, ["\ud83d", "\ud83d\ude80"])
+        preds = predict_with_cache(model, cache, ["\ud83d", "\ud83d\ude80"])
+
+        assert model.calls == [["\ud83d", "\ud83d\ude80"]]
+        assert [pred["Positive"] for pred in preds] == [1.0, 2.0]
+        assert cache.make_key("\ud83d", "fake", "1") != cache.make_key("\ud83e", "fake", "1")
+
+    def test_lru_eviction_and_ttl(self):
+        cache = PredictionCache(max_entries=2, max_memory_mb=1, ttl_seconds=60)
+        keys = [cache.make_key(text, "fake", "1") for text in ("a", "b", "c")]
+        for key in keys:
+            cache.put(key, {"Positive": 0.5})
+
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) is not None
+        assert cache.stats()["evictions"] == 1
+
+        expired_cache = PredictionCache(max_entries=2, max_memory_mb=1, ttl_seconds=-1)
+        expired_cache.put(keys[0], {"Positive": 0.5})
+        assert expired_cache.get(keys[0]) is None
+
+    def test_model_change_invalidates(self):
+        model = FakeModel()
+        cache = PredictionCache(max_entries=10, max_memory_mb=1, ttl_seconds=60)
+
+        predict_with_cache(model, cache, ["a"])
+        model.model_version = "2"
+        predict_with_cache(model, cache, ["a"])
+
+        assert model.calls == [["a"], ["a"]]
+        assert cache.stats()["invalidations"] == 1
+        assert cache.stats()["entries"] == 1
@@ -0,0 +1,55 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def serve():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("HOST", "http://localhost")
+        return importlib.import_module("crypto_sentiment_demo_app.model_inference_api.api.serve")
+
+
+@pytest.fixture
+def server(serve, tmp_path):
+    serving_cfg = {
+        "workers": 2,
+        "threads_per_worker": 1,
+        "shared_weights_dir": str(tmp_path / "weights"),
+        "stats_dir": str(tmp_path),
+        "report_interval_seconds": 10,
+    }
+    return serve.PreforkServer(serving_cfg, "127.0.0.1", 0)
+
+
+def test_report_survives_partial_worker_stats(serve, server):
+    server.workers = {101: 0, 102: 1}
+    serve.write_json_atomically(server._worker_stats_path(101), {"index": 0, "completed": 20})
+    serve.write_json_atomically(server._worker_stats_path(102), {"index": 1, "completed": 10})
+    server.report(elapsed_seconds=1.0)
+
+    server._worker_stats_path(102).write_text('{"index": 1, "compl')
+    report = server.report(elapsed_seconds=2.0)
+
+    assert [(worker["completed"], worker["throughput"]) for worker in report["workers"]] == [(20, 0.0), (10, 0.0)]
+    assert not list(server.stats_dir.glob(".*.tmp"))
+
+
+def test_all_exited_workers_are_restarted(server, monkeypatch):
+    for index in range(2):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        server.workers[pid] = index
+    for pid in server.workers:
+        # wait until both children exit, without reaping them
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+
+    restarted = []
+    monkeypatch.setattr(server, "_spawn_worker", restarted.append)
+    server._reap_workers()
+
+    assert sorted(restarted) == [0, 1]
+    assert server.workers == {}
+    server._reap_workers()  # no children left
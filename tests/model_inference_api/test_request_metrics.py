@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from crypto_sentiment_demo_app.model_inference_api.api.metrics import (
+    RequestMetricsMiddleware,
+    metrics_response,
+)
+
+
+def get_sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_middleware_counts_tracked_endpoints_only():
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, endpoints=["/tracked"])
+
+    @app.get("/tracked")
+    def tracked(request: Request):
+        return {"has_received_at": hasattr(request.state, "received_at")}
+
+    @app.get("/untracked")
+    def untracked():
+        return {}
+
+    @app.get("/metrics")
+    def metrics():
+        return metrics_response()
+
+    labels = {"endpoint": "/tracked", "status_code": "200"}
+    before = get_sample("inference_requests_total", labels)
+
+    client = TestClient(app)
+    assert client.get("/tracked").json() == {"has_received_at": True}
+    client.get("/untracked")
+    client.get("/tracked")
+
+    assert get_sample("inference_requests_total", labels) == before + 2
+    assert get_sample("inference_requests_total", {"endpoint": "/untracked", "status_code": "200"}) == 0
+    assert 'inference_request_seconds_count{endpoint="/tracked"}' in client.get("/metrics").text
+
+
+def test_gauges_are_aggregated_across_workers(tmp_path):
+    # prometheus_client picks its multiprocess storage on import, hence fresh interpreters
+    script = """
+import sys
+from crypto_sentiment_demo_app.model_inference_api.api.metrics import refresh_gauges, register_gauges
+
+register_gauges("worker", lambda: {"in_flight": int(sys.argv[1])}, in_flight="Requests in flight")
+refresh_gauges()
+"""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for in_flight in (2, 3):
+        subprocess.run([sys.executable, "-c", script, str(in_flight)], env=env, check=True)
+
+    # values of exited workers count until the workers are marked dead, which the pre-fork server does
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    assert registry.get_sample_value("worker_in_flight") == 5
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from crypto_sentiment_demo_app.models.inference.onnx_session import (
+    create_inference_session,
+    externalize_weights,
+    map_weights,
+)
+
+onnx = pytest.importorskip("onnx")
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = numpy_helper.from_array(np.arange(64 * 8, dtype=np.float32).reshape(64, 8), "W")
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "W"], ["y"])],
+        "matmul",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 64])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 8])],
+        [weights],
+    )
+    path = tmp_path / "model.onnx"
+    onnx.save_model(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), str(path))
+    return path
+
+
+def test_shared_weights_session_matches_original(model_path, tmp_path):
+    x = {"x": np.ones((2, 64), dtype=np.float32)}
+    expected = create_inference_session(model_path).run(None, x)[0]
+
+    shared_dir = tmp_path / "shared"
+    actual = create_inference_session(model_path, {"shared_weights_dir": str(shared_dir)}).run(None, x)[0]
+    np.testing.assert_allclose(actual, expected)
+
+    shared_path = externalize_weights(model_path, shared_dir)
+    weights = map_weights(shared_path)
+    assert shared_path.stat().st_size < 1024
+    assert weights is not None and len(weights) == 64 * 8 * 4
+    weights.close()
+
+
+def read_mapping_memory(pid, path):
+    """Rss and Pss of the mappings of a file in a process, in bytes."""
+    memory, in_mapping = {"Rss": 0, "Pss": 0}, False
+    with open(f"/proc/{pid}/smaps") as f:
+        for line in f:
+            fields = line.split()
+            if not fields[0].endswith(":"):
+                in_mapping = fields[-1] == str(path)
+            elif in_mapping and fields[0][:-1] in memory:
+                memory[fields[0][:-1]] += int(fields[1]) * 1024
+    return memory
+
+
+def read_anonymous_memory():
+    with open("/proc/self/smaps_rollup") as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith("Anonymous:"))
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads process memory from /proc")
+def test_second_worker_shares_weights_memory(tmp_path):
+    from onnx import TensorProto, helper, numpy_helper
+
+    # MatMul + Add is fused into Gemm with graph optimizations on, which mustn't copy the weights
+    n_weight_bytes = 1024 * 4096 * 4
+    weights = numpy_helper.from_array(np.random.default_rng(0).normal(size=(1024, 4096)).astype(np.float32), "W")
+    bias = numpy_helper.from_array(np.ones(4096, dtype=np.float32), "B")
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "W"], ["h"]), helper.make_node("Add", ["h", "B"], ["y"])],
+        "dense",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 1024])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 4096])],
+        [weights, bias],
+    )
+    model_path = tmp_path / "dense.onnx"
+    onnx.save_model(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), str(model_path))
+
+    shared_dir = tmp_path / "shared"
+    session_cfg = {"shared_weights_dir": str(shared_dir), "graph_optimization_level": "all"}
+    weights_path = Path(f"{externalize_weights(model_path, shared_dir)}.data").resolve()
+
+    def run_worker(report_fd):
+        anonymous_before = read_anonymous_memory()
+        session = create_inference_session(model_path, session_cfg)
+        session.run(None, {"x": np.ones((2, 1024), dtype=np.float32)})
+        memory = read_mapping_memory(os.getpid(), weights_path)
+        os.write(report_fd, f"{memory['Rss']} {memory['Pss']} {read_anonymous_memory() - anonymous_before}".encode())
+        time.sleep(2)
+
+    reports, pids = [], []
+    for _ in range(2):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(write_fd)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+        reports.append([int(value) for value in os.read(read_fd, 100).split()])
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    for rss, pss, anonymous_growth in reports:
+        # weights are paged in from the shared file rather than copied to the heap of the worker
+        assert rss >= 0.9 * n_weight_bytes
+        assert anonymous_growth < 0.25 * n_weight_bytes
+    # while the first worker is alive, the second one is charged half of the weights pages
+    assert reports[1][1] < 0.6 * n_weight_bytes
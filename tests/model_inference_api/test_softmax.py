@@ -0,0 +1,21 @@
+import numpy as np
+
+from crypto_sentiment_demo_app.models.inference.bert import log_sum_exp_softmax
+
+
+class TestLogSumExpSoftmax:
+    def test_rows_are_normalized_independently(self):
+        logits = np.array([[1.0, 2.0, 3.0], [1000.0, 1000.0, 1000.0], [-5.0, 0.0, 5.0]])
+
+        probs = log_sum_exp_softmax(logits)
+
+        np.testing.assert_allclose(probs.sum(axis=1), np.ones(3), rtol=1e-6)
+        np.testing.assert_allclose(probs[1], np.full(3, 1 / 3), rtol=1e-6)
+
+    def test_batch_matches_single_rows(self):
+        logits = np.array([[0.5, -1.0, 2.0], [30.0, 10.0, -20.0]])
+
+        probs = log_sum_exp_softmax(logits)
+
+        for row, row_probs in zip(logits, probs):
+            np.testing.assert_allclose(log_sum_exp_softmax(row), row_probs, rtol=1e-6)
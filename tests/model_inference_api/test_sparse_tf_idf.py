@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from crypto_sentiment_demo_app.models.sparse_tf_idf import (
+    SparseTfidfScorer,
+    export_sparse_tfidf,
+)
+
+WORDS = "Bitcoin surges crashes price market bull bear rally drop ETF SEC ban adoption whale $BTC".split()
+
+
+def make_texts(n_texts, seed):
+    rng = np.random.RandomState(seed)
+    return [" ".join(rng.choice(WORDS, rng.randint(1, 10))) for _ in range(n_texts)]
+
+
+@pytest.mark.parametrize(
+    "tfidf_params",
+    [{"ngram_range": (1, 5), "min_df": 2}, {"ngram_range": (2, 4), "sublinear_tf": True, "norm": "l1"}],
+)
+def test_sparse_scorer_matches_sklearn(tmp_path, tfidf_params):
+    train_texts = make_texts(300, seed=0)
+    labels = np.array(["Negative", "Neutral", "Positive"])[np.random.RandomState(1).randint(0, 3, len(train_texts))]
+
+    pipeline = Pipeline(
+        [("tfidf", TfidfVectorizer(analyzer="char", **tfidf_params)), ("logreg", LogisticRegression(max_iter=500))]
+    )
+    pipeline.fit(train_texts, labels)
+
+    scorer = SparseTfidfScorer(export_sparse_tfidf(pipeline, tmp_path / "tf_idf.npz"))
+
+    texts = make_texts(50, seed=2) + ["", "a", "  Bitcoin\t\tETF  ", "ÉTF 🚀 whale", "unseen characters: ☃"]
+    np.testing.assert_allclose(scorer.predict_proba(texts), pipeline.predict_proba(texts), atol=1e-6)
+    assert scorer.classes == ["Negative", "Neutral", "Positive"]
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from crypto_sentiment_demo_app.model_scorer.model_scorer import ModelScorer
+
+CLASS_NAMES = ["Negative", "Neutral", "Positive"]
+
+
+def test_predictions_keep_typed_probabilities_and_predicted_class(monkeypatch):
+    scorer = ModelScorer(sqlalchemy_engine=None, model_api_endpoint="", model_classes=CLASS_NAMES)
+
+    def run_model_on_single_text(id, text):
+        return {
+            "Negative": 0.1,
+            "Neutral": 0.2,
+            "Positive": 0.7,
+            "predicted_class": 2,
+            "model_version": "3",
+            "title_id": id,
+        }
+
+    monkeypatch.setattr(scorer, "run_model_on_single_text", run_model_on_single_text)
+    pred_df = scorer.run_model_on_dataframe(pd.DataFrame({"title_id": [1, 2], "title": ["a", "b"]}))
+
+    assert list(pred_df.columns) == [*CLASS_NAMES, "predicted_class"]
+    assert pred_df["predicted_class"].tolist() == [2, 2]
+    assert pred_df["Positive"].dtype == float
@@ -0,0 +1,70 @@
+import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from crypto_sentiment_demo_app.database.rollups import rebuild_rollups
+from crypto_sentiment_demo_app.model_scorer.model_scorer import ModelScorer
+
+PUB_TIMES = [
+    datetime.datetime(2022, 5, 1, 10, 15),
+    datetime.datetime(2022, 5, 1, 10, 45),
+    datetime.datetime(2022, 5, 1, 23, 59),
+    datetime.datetime(2022, 5, 2, 0, 0),
+]
+
+
+def read_rollup(engine, table_name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT * FROM {table_name} ORDER BY bucket_start")).fetchall()
+
+
+def without_sums(row):
+    return {column: value for column, value in row._mapping.items() if column != "positive_sum"}
+
+
+def make_predictions(title_ids, positive, predicted_class):
+    return pd.DataFrame(
+        {"negative": 0.0, "neutral": 1 - positive, "positive": positive, "predicted_class": predicted_class},
+        index=pd.Index(title_ids, name="title_id"),
+    )
+
+
+def test_scorer_keeps_rollups_consistent_with_predictions(pg_engine):
+    with pg_engine.begin() as conn:
+        for title_id, pub_time in enumerate(PUB_TIMES):
+            conn.execute(
+                text("INSERT INTO news_titles VALUES (:id, :title, 'src', :pub_time)"),
+                {"id": title_id, "title": f"title {title_id}", "pub_time": pub_time},
+            )
+
+    scorer = ModelScorer(sqlalchemy_engine=pg_engine, model_api_endpoint="", model_classes=[])
+    scorer.write_preds_to_db(make_predictions([0, 1, 3], positive=0.5, predicted_class=1))
+    # re-scoring a title and scoring another one in the same bucket must not double count
+    scorer.write_preds_to_db(make_predictions([1, 2], positive=0.9, predicted_class=2))
+
+    daily = read_rollup(pg_engine, "sentiment_rollup_daily")
+    assert [(row.bucket_start.day, row.n_scored, row.n_neutral, row.n_positive) for row in daily] == [
+        (1, 3, 1, 2),
+        (2, 1, 1, 0),
+    ]
+    assert daily[0].positive_sum == pytest.approx(0.5 + 0.9 + 0.9)
+
+    hourly = read_rollup(pg_engine, "sentiment_rollup_hourly")
+    assert [(row.bucket_start.hour, row.n_scored) for row in hourly] == [(10, 2), (23, 1), (0, 1)]
+
+    five_min = read_rollup(pg_engine, "sentiment_rollup_5min")
+    assert [row.bucket_start.strftime("%H:%M") for row in five_min] == ["10:15", "10:45", "23:55", "00:00"]
+
+    with pg_engine.begin() as conn:
+        rebuild_rollups(conn)
+    # incremental updates add and subtract probabilities in a different order than the rebuild sums them
+    for table_name, rows in [
+        ("sentiment_rollup_daily", daily),
+        ("sentiment_rollup_hourly", hourly),
+        ("sentiment_rollup_5min", five_min),
+    ]:
+        rebuilt = read_rollup(pg_engine, table_name)
+        assert [without_sums(row) for row in rebuilt] == [without_sums(row) for row in rows]
+        assert [row.positive_sum for row in rebuilt] == pytest.approx([row.positive_sum for row in rows])
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from onnxruntime import InferenceSession
+
+onnx = pytest.importorskip("onnx")
+# the training package imports the BERT training stack
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from crypto_sentiment_demo_app.models.train.bert.quantization import (  # noqa: E402
+    quantize_onnx_model,
+)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(17)
+    weights = numpy_helper.from_array(rng.normal(size=(256, 3)).astype(np.float32), "W")
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "W"], ["logits"])],
+        "classifier",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 256])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [None, 3])],
+        [weights],
+    )
+    path = tmp_path / "model.onnx"
+    onnx.save_model(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), str(path))
+    return path
+
+
+def test_quantized_model_outputs_stay_close(model_path, tmp_path):
+    quantized_path = tmp_path / "model_int8.onnx"
+    quantize_onnx_model(model_path, quantized_path, {"per_channel": False, "reduce_range": False})
+
+    x = {"x": np.random.default_rng(0).normal(size=(16, 256)).astype(np.float32)}
+    expected = InferenceSession(str(model_path)).run(None, x)[0]
+    actual = InferenceSession(str(quantized_path)).run(None, x)[0]
+
+    assert quantized_path.stat().st_size < model_path.stat().st_size
+    np.testing.assert_allclose(actual, expected, atol=0.05 * np.abs(expected).max())
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).mean() >= 0.9